@@ -1,15 +1,41 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from services.yfinance_service import get_fund_data
+from services.yfinance_service import get_fund_data, get_funds_data, yf_session
 from services.db_service import db_service
+from services.fund_cache import fund_cache
+from services.holdings_index import holdings_index
+from services.screening_engine import screening_engine, ScreenError
+from services.typeahead_index import typeahead_index
+from services.trending_cache import trending_cache, TRENDING_WINDOWS, TRENDING_CACHE_SIZE, DEFAULT_TRENDING_WINDOW
 from services.sec_service import sec_service, map_master_fund_to_ticker
 from services.sec_db_service import sec_db_service
+from services.thai_fund_service import thai_fund_service
 from services.analytics_service import analytics_service
 from dataclasses import asdict
 
 app = Flask(__name__)
 CORS(app)
 
+# Upper bound on tickers accepted by the batch fund endpoint
+MAX_BATCH_TICKERS = 50
+
+# Screener limits
+MAX_SCREEN_CRITERIA = 5
+MAX_SCREEN_RESULTS = 500
+
+# /api/search/all page size cap and ?type= values as stored in the fund catalog
+MAX_SEARCH_PAGE_SIZE = 100
+CATALOG_TYPES = {"etf": "ETF", "mutual": "Mutual Fund"}
+
+# Load screening data in the background (the snapshot load also builds the
+# holding -> funds index); screens use the DB until it is ready
+holdings_index.start()
+screening_engine.start()
+typeahead_index.start()
+trending_cache.start()
+# Drop cached funds after full-holdings imports made by other processes
+fund_cache.start()
+
 @app.route("/")
 def root():
     return jsonify({"message": "Welcome to WhatTheyHold API"})
@@ -18,6 +44,22 @@ def root():
 def health_check():
     return jsonify({"status": "ok"})
 
+@app.route("/api/cache/stats")
+def cache_stats():
+    """Hit/miss/eviction counters for this worker's in-memory fund cache and yfinance session."""
+    return jsonify({
+        **fund_cache.stats(),
+        "yfinance_session": yf_session.stats(),
+        "holdings_index": holdings_index.stats(),
+        "screening_snapshot": screening_engine.stats(),
+        "typeahead_index": typeahead_index.stats(),
+        "trending": trending_cache.stats(),
+        "view_buffers": {
+            "funds": db_service.fund_views.stats(),
+            "thai_funds": sec_db_service.fund_views.stats(),
+        },
+    })
+
 @app.route("/api/fund/<ticker>")
 def get_fund(ticker):
     try:
@@ -25,33 +67,123 @@ def get_fund(ticker):
         if not data:
             return jsonify({"error": "Fund not found"}), 404
         
+        db_service.record_fund_view(data.fund.ticker)
+
         # Serialize Dataclass to dict
         return jsonify(asdict(data))
     except Exception as e:
         print(f"Error processing request: {e}")
         return jsonify({"error": "Internal Server Error"}), 500
 
+@app.route("/api/funds", methods=["GET", "POST"])
+def get_funds():
+    """Batch fund lookup: GET ?tickers=VOO,QQQ or POST {"tickers": [...]}."""
+    if request.method == "POST":
+        tickers = (request.json or {}).get("tickers") or []
+    else:
+        tickers = request.args.get("tickers", "").split(",")
+
+    tickers = [str(t).strip().upper() for t in tickers if str(t).strip()]
+    if not tickers:
+        return jsonify({"error": "Missing 'tickers' parameter"}), 400
+    if len(tickers) > MAX_BATCH_TICKERS:
+        return jsonify({"error": f"At most {MAX_BATCH_TICKERS} tickers per request"}), 400
+
+    try:
+        data = get_funds_data(tickers)
+        for ticker in data:
+            db_service.record_fund_view(ticker)
+
+        return jsonify({
+            "results": {ticker: asdict(fund) for ticker, fund in data.items()},
+            "not_found": [t for t in dict.fromkeys(tickers) if t not in data],
+        })
+    except Exception as e:
+        print(f"Error processing batch request: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
 @app.route("/api/screen")
 def screen_funds():
+    """
+    Funds holding given tickers above minimum weights.
+    Single holding: ?holding=NVDA&min_weight=5
+    Several (all must match): ?holdings=NVDA:5,MSFT:3
+    Optional: limit (default 100).
+    """
+    criteria = {}
+    for part in request.args.get("holdings", "").split(","):
+        ticker, _, weight = part.partition(":")
+        ticker = ticker.strip().upper()
+        if not ticker:
+            continue
+        try:
+            min_weight = float(weight) if weight.strip() else 0.0
+        except ValueError:
+            return jsonify({"error": f"Invalid weight for {ticker}: '{weight}'"}), 400
+        criteria[ticker] = max(min_weight, criteria.get(ticker, min_weight))
+
     holding = request.args.get("holding", "").upper()
-    min_weight = request.args.get("min_weight", type=float, default=0.0)
-    
-    if not holding:
+    if holding and holding not in criteria:
+        criteria = {holding: request.args.get("min_weight", type=float, default=0.0), **criteria}
+
+    if not criteria:
         return jsonify({"error": "Missing 'holding' parameter"}), 400
+    if len(criteria) > MAX_SCREEN_CRITERIA:
+        return jsonify({"error": f"At most {MAX_SCREEN_CRITERIA} holdings per screen"}), 400
+
+    criteria_list = list(criteria.items())
+    limit = max(1, min(request.args.get("limit", type=int, default=100), MAX_SCREEN_RESULTS))
         
     try:
-        results = db_service.screen_funds(holding, min_weight)
+        if holdings_index.ready:
+            results = holdings_index.screen(criteria_list, limit=limit)
+        elif len(criteria_list) == 1:
+            results = db_service.screen_funds(*criteria_list[0])[:limit]
+        else:
+            results = db_service.screen_funds_multi(criteria_list, limit=limit)
         return jsonify({"results": results})
     except Exception as e:
         print(f"Error screening funds: {e}")
         return jsonify({"error": "Internal Server Error"}), 500
 
+@app.route("/api/screen/query", methods=["POST"])
+def screen_funds_query():
+    """
+    Compound screen over holdings, country and sector exposure.
+    Body: {"where": {"all"|"any": [...]} or a single condition,
+           "sort": {"type", "key", "order"}, "page": 1, "page_size": 20}
+    Conditions: {"type": "holding"|"country"|"sector", "key": ..., "min": %, "max": %}
+    """
+    body = request.get_json(silent=True) or {}
+    if "where" not in body:
+        return jsonify({"error": "Missing 'where' predicate"}), 400
+    if not screening_engine.ready:
+        return jsonify({"error": "Screening data is still loading, try again shortly"}), 503
+
+    try:
+        result = screening_engine.screen(
+            body["where"],
+            sort=body.get("sort"),
+            page=int(body.get("page", 1)),
+            page_size=int(body.get("page_size", 20)),
+        )
+        return jsonify(result)
+    except (ScreenError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error running screen: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
 @app.route("/api/trending")
 def trending_funds():
+    """Most viewed funds over ?window=24h|7d, view_count being views in that window."""
+    window = request.args.get("window", DEFAULT_TRENDING_WINDOW)
+    if window not in TRENDING_WINDOWS:
+        return jsonify({"error": f"window must be one of {', '.join(TRENDING_WINDOWS)}"}), 400
     try:
-        limit = request.args.get("limit", default=5, type=int)
-        results = db_service.get_trending_funds(limit)
-        return jsonify({"results": results})
+        limit = max(1, min(request.args.get("limit", default=5, type=int), TRENDING_CACHE_SIZE))
+        results = trending_cache.get(window, limit)
+        return jsonify({"results": results, "window": window})
     except Exception as e:
         print(f"Error fetching trending funds: {e}")
         return jsonify({"error": "Internal Server Error"}), 500
@@ -64,6 +196,13 @@ def search_funds():
         
     try:
         limit = request.args.get("limit", default=5, type=int)
+
+        # In-process prefix index first; the ranked search RPCs cover the warm-up
+        # window and queries with no prefix match (typos, mid-word substrings)
+        if typeahead_index.ready:
+            results = typeahead_index.search(query, limit * 2)
+            if results:
+                return jsonify({"results": results})
         
         # Search existing yfinance funds
         yf_results = db_service.search_funds(query, limit)
@@ -80,10 +219,11 @@ def search_funds():
                 "is_feeder_fund": tf.get("is_feeder_fund", False),
                 "master_fund": tf.get("feederfund_master_fund"),
                 "master_ticker": tf.get("master_fund_ticker"),
+                "score": tf.get("score", 0),
             })
         
-        # Merge results: yfinance first, then Thai funds
-        combined = yf_results + thai_results
+        # Merge both sources by relevance (stable sort keeps yfinance first on ties)
+        combined = sorted(yf_results + thai_results, key=lambda r: r.get("score") or 0, reverse=True)
         return jsonify({"results": combined[:limit * 2]})
     except Exception as e:
         print(f"Error searching funds: {e}")
@@ -91,77 +231,56 @@ def search_funds():
 
 @app.route("/api/search/all")
 def search_all_funds():
-    """Extended search with pagination and filters."""
-    query = request.args.get("q", "")
+    """
+    Extended search over both sources with filters and keyset pagination.
+    Pass the returned next_cursor as ?cursor= to fetch the following page.
+    """
+    query = request.args.get("q", "").strip()
     limit = request.args.get("limit", default=20, type=int)
     fund_type = request.args.get("type", "")   # "etf" | "mutual" | ""
     source = request.args.get("source", "")     # "yf" | "sec" | ""
     issuer = request.args.get("issuer", "")     # exact AMC name
+    cursor = request.args.get("cursor", "")
+
+    if fund_type and fund_type not in CATALOG_TYPES:
+        return jsonify({"error": "type must be 'etf' or 'mutual'"}), 400
+    if source and source not in ("yf", "sec"):
+        return jsonify({"error": "source must be 'yf' or 'sec'"}), 400
+    limit = max(1, min(limit, MAX_SEARCH_PAGE_SIZE))
 
-    results = []
     try:
-        # 1. Search YFinance funds (source="yf") — skip if issuer filter active
-        if source in ["", "yf"] and not issuer:
-            yf_query = db_service.supabase.table('funds').select('ticker, name')
-            if query:
-                yf_query = yf_query.or_(f"ticker.ilike.%{query}%,name.ilike.%{query}%")
-            
-            yf_data = yf_query.limit(limit).execute().data or []
-            
-            for f in yf_data:
-                # filter by type if specified (assuming mostly ETFs in YF for now)
-                if fund_type == "mutual": continue
-                results.append({
-                    "ticker": f.get("ticker"),
-                    "name": f.get("name"),
-                    "source": "yf",
-                    "type": "ETF"
-                })
-                
-        # 2. Search Thai funds (source="sec")
-        if source in ["", "sec"]:
-            sec_query = sec_db_service.supabase.table('thai_funds').select(
-                "proj_id, proj_name_th, proj_name_en, proj_abbr_name, is_feeder_fund, amc_name_en, fund_type"
-            )
-            if query:
-                sec_query = sec_query.or_(
-                    f"proj_name_en.ilike.%{query}%,proj_name_th.ilike.%{query}%,proj_abbr_name.ilike.%{query}%,proj_id.ilike.%{query}%,amc_name_en.ilike.%{query}%"
-                )
-            if issuer:
-                sec_query = sec_query.eq("amc_name_en", issuer)
-
-            sec_data = sec_query.limit(limit * 2).execute().data or []
-            
-            for tf in sec_data:
-                t_type = str(tf.get("fund_type") or "").upper()
-                is_etf = "ETF" in t_type
-                
-                if fund_type == "etf" and not is_etf:
-                    continue
-                if fund_type == "mutual" and is_etf:
-                    continue
-                    
-                t_abbrev = tf.get("proj_abbr_name") or tf.get("proj_id", "")
-                
-                results.append({
-                    "ticker": t_abbrev,
-                    "name": tf.get("proj_name_en") or tf.get("proj_name_th", ""),
-                    "proj_id": tf.get("proj_id", ""),
-                    "source": "sec",
-                    "is_feeder_fund": tf.get("is_feeder_fund", False),
-                    "type": "ETF" if is_etf else "Mutual Fund",
-                    "amc": tf.get("amc_name_en")
-                })
-                
-        # Return merged results
-        return jsonify({
-            "results": results[:limit],
-            "has_more": len(results) > limit
-        })
+        rows, next_cursor = db_service.search_catalog(
+            query=query, fund_type=CATALOG_TYPES.get(fund_type), source=source,
+            issuer=issuer, cursor=cursor or None, limit=limit,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error searching all funds: {e}")
         return jsonify({"error": "Internal Server Error"}), 500
 
+    results = []
+    for row in rows:
+        result = {
+            "ticker": row.get("ticker"),
+            "name": row.get("name") or row.get("ticker"),
+            "source": row.get("source"),
+            "type": row.get("fund_type"),
+        }
+        if row.get("source") == "sec":
+            result.update({
+                "proj_id": row.get("proj_id", ""),
+                "is_feeder_fund": row.get("is_feeder_fund", False),
+                "amc": row.get("amc"),
+            })
+        results.append(result)
+
+    return jsonify({
+        "results": results,
+        "has_more": next_cursor is not None,
+        "next_cursor": next_cursor,
+    })
+
 # ─── Thai Fund Routes (SEC Open Data) ────────────────────────────
 
 @app.route("/api/thai-funds/search")
@@ -205,24 +324,17 @@ def get_thai_fund_by_ticker(ticker):
         fund = results[0]
         proj_id = fund.get("proj_id")
         
-        # 2. Get Top 5 holdings from SEC API directly
-        # Since this is a direct pass-through, we don't store top 5 in DB right now
-        top5 = []
+        # 2. Get Top 5 holdings from the persisted cache (refreshed in the background,
+        # never fetched from the SEC API on the request path)
+        top5 = {"as_of": None, "holdings": [], "fetched_at": None}
         if proj_id:
-            raw_top5 = sec_service.get_top5_holdings(proj_id)
-            if raw_top5:
-                # The SEC API returns historical top 5 holdings. We only want the latest period.
-                # Find the maximum date string in either end_date or last_upd_date
-                latest_date = max(item.get("end_date", "") or item.get("start_date", "") for item in raw_top5)
-                # Filter down to just the items that belong to the latest_date
-                top5 = [item for item in raw_top5 if (item.get("end_date") == latest_date or item.get("start_date") == latest_date)]
-                
-                # Sort by asset_ratio descending
-                top5 = sorted(top5, key=lambda x: x.get("asset_ratio", 0), reverse=True)
+            top5 = thai_fund_service.get_top5_holdings(proj_id)
             
         return jsonify({
             "fund_info": fund,
-            "top5_holdings": top5[:5]
+            "top5_holdings": top5["holdings"][:5],
+            "top5_as_of": top5["as_of"],
+            "top5_updated_at": top5["fetched_at"],
         })
     except Exception as e:
         print(f"Error fetching Thai fund info for {ticker}: {e}")
@@ -267,6 +379,9 @@ def get_thai_fund_holdings(proj_id):
                 "message": f"Could not fetch holdings for master fund {master_ticker}"
             })
 
+        # Feeder pages count toward the master fund's views
+        db_service.record_fund_view(master_data.fund.ticker)
+
         return jsonify({
             "thai_fund": fund,
             "master_fund": asdict(master_data.fund),
@@ -279,6 +394,27 @@ def get_thai_fund_holdings(proj_id):
         print(f"Error fetching Thai fund holdings {proj_id}: {e}")
         return jsonify({"error": "Internal Server Error"}), 500
 
+@app.route("/api/thai-fund/<proj_id>/nav")
+def get_thai_fund_nav(proj_id):
+    """
+    Daily NAV history for charts.
+    Query params: from / to (YYYY-MM-DD, default last 12 months),
+    resolution = day | week | month | auto (default auto).
+    """
+    try:
+        series = thai_fund_service.get_nav_series(
+            proj_id,
+            start=request.args.get("from"),
+            end=request.args.get("to"),
+            resolution=request.args.get("resolution", "auto"),
+        )
+        return jsonify(series)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error fetching NAV for Thai fund {proj_id}: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
 @app.route("/api/thai-funds/amcs")
 def list_amcs():
     """List distinct AMC (asset management company) names from Thai funds."""
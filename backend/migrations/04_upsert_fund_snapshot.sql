@@ -0,0 +1,131 @@
+-- Transactional, diff-based fund upsert
+-- Replaces the upsert + delete-all + re-insert sequence in DBService.upsert_fund
+-- with one RPC that runs in a single transaction and only writes child rows
+-- that were added, removed or changed.
+
+-- Children are keyed by (fund_id, natural key) so they can be upserted.
+-- Drop any duplicates left by the old delete/insert path before adding the constraints.
+delete from holdings a using holdings b
+    where a.fund_id = b.fund_id and a.ticker = b.ticker and a.id < b.id;
+delete from country_weights a using country_weights b
+    where a.fund_id = b.fund_id and a.country_code = b.country_code and a.id < b.id;
+delete from sector_weights a using sector_weights b
+    where a.fund_id = b.fund_id and a.sector = b.sector and a.id < b.id;
+
+create unique index if not exists uq_holdings_fund_ticker on holdings(fund_id, ticker);
+create unique index if not exists uq_country_weights_fund_country on country_weights(fund_id, country_code);
+create unique index if not exists uq_sector_weights_fund_sector on sector_weights(fund_id, sector);
+
+-- Upserts now update children in place
+create policy "Allow anon update holdings" on holdings for update using (true);
+create policy "Allow anon delete holdings" on holdings for delete using (true);
+create policy "Allow anon update country_weights" on country_weights for update using (true);
+create policy "Allow anon delete country_weights" on country_weights for delete using (true);
+create policy "Allow anon update sector_weights" on sector_weights for update using (true);
+create policy "Allow anon delete sector_weights" on sector_weights for delete using (true);
+
+-- p_fund is a serialized FundResponse:
+-- {"fund": {"ticker", "name", "price", "currency"}, "holdings": [...],
+--  "country_weights": [...], "sector_weights": [...]}
+create or replace function upsert_fund_snapshot(p_fund jsonb)
+returns jsonb as $$
+declare
+    v_fund_id uuid;
+    v_holdings_changed integer;
+    v_countries_changed integer;
+    v_sectors_changed integer;
+begin
+    insert into funds (ticker, name, price, currency, updated_at)
+    values (
+        p_fund->'fund'->>'ticker',
+        p_fund->'fund'->>'name',
+        (p_fund->'fund'->>'price')::numeric,
+        coalesce(p_fund->'fund'->>'currency', 'USD'),
+        now()
+    )
+    on conflict (ticker) do update
+        set name = excluded.name,
+            price = excluded.price,
+            currency = excluded.currency,
+            updated_at = excluded.updated_at
+    returning id into v_fund_id;
+
+    -- Holdings
+    with incoming as (
+        select distinct on (h->>'ticker')
+            h->>'ticker' as ticker,
+            h->>'name' as name,
+            round((h->>'pct')::numeric, 4) as pct
+        from jsonb_array_elements(coalesce(p_fund->'holdings', '[]'::jsonb)) h
+        order by h->>'ticker', (h->>'pct')::numeric desc
+    ), removed as (
+        delete from holdings t
+        where t.fund_id = v_fund_id
+          and not exists (select 1 from incoming i where i.ticker = t.ticker)
+        returning 1
+    ), written as (
+        insert into holdings (fund_id, ticker, name, pct, updated_at)
+        select v_fund_id, i.ticker, i.name, i.pct, now() from incoming i
+        on conflict (fund_id, ticker) do update
+            set name = excluded.name, pct = excluded.pct, updated_at = excluded.updated_at
+            where holdings.name is distinct from excluded.name
+               or holdings.pct is distinct from excluded.pct
+        returning 1
+    )
+    select (select count(*) from removed) + (select count(*) from written)
+    into v_holdings_changed;
+
+    -- Country weights
+    with incoming as (
+        select
+            c->>'country_code' as country_code,
+            round(sum((c->>'weight_pct')::numeric), 4) as weight_pct
+        from jsonb_array_elements(coalesce(p_fund->'country_weights', '[]'::jsonb)) c
+        group by c->>'country_code'
+    ), removed as (
+        delete from country_weights t
+        where t.fund_id = v_fund_id
+          and not exists (select 1 from incoming i where i.country_code = t.country_code)
+        returning 1
+    ), written as (
+        insert into country_weights (fund_id, country_code, weight_pct, updated_at)
+        select v_fund_id, i.country_code, i.weight_pct, now() from incoming i
+        on conflict (fund_id, country_code) do update
+            set weight_pct = excluded.weight_pct, updated_at = excluded.updated_at
+            where country_weights.weight_pct is distinct from excluded.weight_pct
+        returning 1
+    )
+    select (select count(*) from removed) + (select count(*) from written)
+    into v_countries_changed;
+
+    -- Sector weights
+    with incoming as (
+        select
+            s->>'sector' as sector,
+            round(sum((s->>'weight_pct')::numeric), 4) as weight_pct
+        from jsonb_array_elements(coalesce(p_fund->'sector_weights', '[]'::jsonb)) s
+        group by s->>'sector'
+    ), removed as (
+        delete from sector_weights t
+        where t.fund_id = v_fund_id
+          and not exists (select 1 from incoming i where i.sector = t.sector)
+        returning 1
+    ), written as (
+        insert into sector_weights (fund_id, sector, weight_pct, updated_at)
+        select v_fund_id, i.sector, i.weight_pct, now() from incoming i
+        on conflict (fund_id, sector) do update
+            set weight_pct = excluded.weight_pct, updated_at = excluded.updated_at
+            where sector_weights.weight_pct is distinct from excluded.weight_pct
+        returning 1
+    )
+    select (select count(*) from removed) + (select count(*) from written)
+    into v_sectors_changed;
+
+    return jsonb_build_object(
+        'fund_id', v_fund_id,
+        'holdings_changed', v_holdings_changed,
+        'country_weights_changed', v_countries_changed,
+        'sector_weights_changed', v_sectors_changed
+    );
+end;
+$$ language plpgsql;
@@ -0,0 +1,14 @@
+-- One feeder → master mapping per Thai fund, so the importer can batch real upserts
+-- instead of a delete + insert per fund.
+
+-- Keep only the most recent mapping for each fund before adding the constraint
+DELETE FROM feeder_master_mapping a
+    USING feeder_master_mapping b
+    WHERE a.thai_fund_proj_id = b.thai_fund_proj_id
+      AND (a.updated_at < b.updated_at OR (a.updated_at = b.updated_at AND a.id < b.id));
+
+ALTER TABLE feeder_master_mapping
+    ADD CONSTRAINT uq_feeder_mapping_proj UNIQUE (thai_fund_proj_id);
+
+-- The unique constraint's index replaces the plain lookup index
+DROP INDEX IF EXISTS idx_feeder_mapping_proj;
@@ -0,0 +1,23 @@
+-- Incremental SEC sync
+-- content_hash fingerprints the normalized profile record so unchanged funds can be
+-- skipped; sec_sync_runs records each sync as a checkpoint for the next run.
+
+ALTER TABLE thai_funds ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+CREATE TABLE IF NOT EXISTS sec_sync_runs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    mode TEXT NOT NULL,                 -- 'full' | 'incremental'
+    status TEXT NOT NULL DEFAULT 'running',
+    started_at TIMESTAMPTZ DEFAULT NOW(),
+    finished_at TIMESTAMPTZ,
+    profiles_seen INTEGER DEFAULT 0,
+    profiles_changed INTEGER DEFAULT 0,
+    rows_written INTEGER DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_sec_sync_runs_finished ON sec_sync_runs(status, finished_at DESC);
+
+ALTER TABLE sec_sync_runs ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow anon read sec_sync_runs" ON sec_sync_runs FOR SELECT USING (true);
+CREATE POLICY "Allow anon insert sec_sync_runs" ON sec_sync_runs FOR INSERT WITH CHECK (true);
+CREATE POLICY "Allow anon update sec_sync_runs" ON sec_sync_runs FOR UPDATE USING (true);
@@ -0,0 +1,25 @@
+-- Idempotent quarterly holdings import
+-- Each holding is identified within a fund's period by holding_key
+-- (ISIN, falling back to issue code, then issuer), so re-running an import
+-- upserts instead of duplicating rows.
+
+ALTER TABLE thai_fund_holdings ADD COLUMN IF NOT EXISTS holding_key TEXT;
+
+UPDATE thai_fund_holdings
+    SET holding_key = COALESCE(NULLIF(isin_code, ''), NULLIF(issue_code, ''), NULLIF(issuer, ''), id::text)
+    WHERE holding_key IS NULL;
+
+-- Drop duplicates created by earlier re-runs, keeping the newest row
+DELETE FROM thai_fund_holdings a
+    USING thai_fund_holdings b
+    WHERE a.thai_fund_proj_id = b.thai_fund_proj_id
+      AND a.period = b.period
+      AND a.holding_key = b.holding_key
+      AND (a.updated_at < b.updated_at OR (a.updated_at = b.updated_at AND a.id < b.id));
+
+ALTER TABLE thai_fund_holdings ALTER COLUMN holding_key SET NOT NULL;
+ALTER TABLE thai_fund_holdings
+    ADD CONSTRAINT uq_thai_holdings_key UNIQUE (thai_fund_proj_id, period, holding_key);
+
+CREATE POLICY "Allow anon update thai_fund_holdings" ON thai_fund_holdings FOR UPDATE USING (true);
+CREATE POLICY "Allow anon delete thai_fund_holdings" ON thai_fund_holdings FOR DELETE USING (true);
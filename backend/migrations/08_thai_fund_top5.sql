@@ -0,0 +1,17 @@
+-- Persisted SEC top-5 holdings per Thai fund
+-- /api/thai-fund-info reads from here instead of calling the SEC API on every
+-- page view; rows are refreshed in the background once older than the TTL.
+
+CREATE TABLE IF NOT EXISTS thai_fund_top5 (
+    proj_id TEXT PRIMARY KEY REFERENCES thai_funds(proj_id) ON DELETE CASCADE,
+    as_of TEXT,                              -- period the holdings belong to
+    holdings JSONB NOT NULL DEFAULT '[]',    -- latest period only, sorted by asset_ratio
+    fetched_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_thai_fund_top5_fetched ON thai_fund_top5(fetched_at);
+
+ALTER TABLE thai_fund_top5 ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow public read thai_fund_top5" ON thai_fund_top5 FOR SELECT USING (true);
+CREATE POLICY "Allow anon insert thai_fund_top5" ON thai_fund_top5 FOR INSERT WITH CHECK (true);
+CREATE POLICY "Allow anon update thai_fund_top5" ON thai_fund_top5 FOR UPDATE USING (true);
@@ -0,0 +1,47 @@
+-- Daily NAV time series for Thai funds (from SEC daily-info/nav)
+-- One compact row per fund per trading day; range reads go through
+-- get_thai_fund_nav, which downsamples server-side.
+
+CREATE TABLE IF NOT EXISTS thai_fund_nav (
+    proj_id TEXT NOT NULL REFERENCES thai_funds(proj_id) ON DELETE CASCADE,
+    nav_date DATE NOT NULL,
+    nav_per_unit NUMERIC(14, 4),
+    total_nav NUMERIC(20, 2),
+    PRIMARY KEY (proj_id, nav_date)
+);
+
+ALTER TABLE thai_fund_nav ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow public read thai_fund_nav" ON thai_fund_nav FOR SELECT USING (true);
+CREATE POLICY "Allow anon insert thai_fund_nav" ON thai_fund_nav FOR INSERT WITH CHECK (true);
+CREATE POLICY "Allow anon update thai_fund_nav" ON thai_fund_nav FOR UPDATE USING (true);
+
+-- Range query with downsampling: 'day' returns every row, 'week' / 'month'
+-- return the last NAV of each bucket (the close), using the primary key index.
+CREATE OR REPLACE FUNCTION get_thai_fund_nav(
+    p_proj_id TEXT,
+    p_from DATE,
+    p_to DATE,
+    p_resolution TEXT DEFAULT 'day'
+)
+RETURNS TABLE (nav_date DATE, nav_per_unit NUMERIC, total_nav NUMERIC) AS $$
+BEGIN
+    IF p_resolution = 'day' THEN
+        RETURN QUERY
+            SELECT n.nav_date, n.nav_per_unit, n.total_nav
+            FROM thai_fund_nav n
+            WHERE n.proj_id = p_proj_id AND n.nav_date BETWEEN p_from AND p_to
+            ORDER BY n.nav_date;
+    ELSE
+        RETURN QUERY
+            SELECT b.nav_date, b.nav_per_unit, b.total_nav
+            FROM (
+                SELECT DISTINCT ON (date_trunc(p_resolution, n.nav_date))
+                    n.nav_date, n.nav_per_unit, n.total_nav
+                FROM thai_fund_nav n
+                WHERE n.proj_id = p_proj_id AND n.nav_date BETWEEN p_from AND p_to
+                ORDER BY date_trunc(p_resolution, n.nav_date), n.nav_date DESC
+            ) b
+            ORDER BY b.nav_date;
+    END IF;
+END;
+$$ LANGUAGE plpgsql STABLE;
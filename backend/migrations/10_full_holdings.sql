@@ -0,0 +1,229 @@
+-- Full-holdings ingestion from issuer constituent files
+-- yfinance only exposes a fund's top ~10 positions. Issuer files list every
+-- position; they are streamed into holdings_staging in batches and swapped
+-- into holdings in one transaction by apply_holdings_load.
+
+alter table funds add column if not exists holdings_source text not null default 'yfinance';
+alter table funds add column if not exists holdings_count integer;
+alter table funds add column if not exists holdings_as_of date;
+-- Set by every load; web workers poll it to drop cached copies of the fund
+alter table funds add column if not exists holdings_loaded_at timestamptz;
+create index if not exists idx_funds_holdings_loaded_at on funds (holdings_loaded_at)
+    where holdings_loaded_at is not null;
+
+-- Rows of in-progress loads, keyed by a client-generated load id
+create table if not exists holdings_staging (
+    load_id uuid not null,
+    ticker text not null,
+    name text not null,
+    pct numeric(8, 4) not null,
+    country_code text,
+    created_at timestamptz default now()
+);
+create index if not exists idx_holdings_staging_load on holdings_staging(load_id);
+
+alter table holdings_staging enable row level security;
+create policy "Allow anon read holdings_staging" on holdings_staging for select using (true);
+create policy "Allow anon insert holdings_staging" on holdings_staging for insert with check (true);
+create policy "Allow anon delete holdings_staging" on holdings_staging for delete using (true);
+
+-- Replace a fund's holdings with a staged load.
+-- p_country_weights / p_sector_weights: [{"country_code"|"sector", "weight_pct"}],
+-- aggregated over the complete file by the loader. Sector weights are left
+-- untouched when null (the file has no sector column).
+create or replace function apply_holdings_load(
+    p_ticker text,
+    p_load_id uuid,
+    p_source text,
+    p_as_of date,
+    p_country_weights jsonb,
+    p_sector_weights jsonb default null
+)
+returns jsonb as $$
+declare
+    v_fund_id uuid;
+    v_holdings_changed integer;
+    v_holdings_count integer;
+begin
+    -- A fund seen only in a file gets a placeholder row; the old updated_at
+    -- makes the next request fill in name and price from yfinance.
+    insert into funds (ticker, name, updated_at)
+    values (p_ticker, p_ticker, 'epoch')
+    on conflict (ticker) do nothing;
+    select id into v_fund_id from funds where ticker = p_ticker;
+
+    with incoming as (
+        select
+            s.ticker,
+            min(s.name) as name,
+            round(sum(s.pct), 4) as pct,
+            min(s.country_code) as country_code
+        from holdings_staging s
+        where s.load_id = p_load_id
+        group by s.ticker
+    ), removed as (
+        delete from holdings t
+        where t.fund_id = v_fund_id
+          and not exists (select 1 from incoming i where i.ticker = t.ticker)
+        returning 1
+    ), written as (
+        insert into holdings (fund_id, ticker, name, pct, country_code, updated_at)
+        select v_fund_id, i.ticker, i.name, i.pct, i.country_code, now() from incoming i
+        on conflict (fund_id, ticker) do update
+            set name = excluded.name, pct = excluded.pct,
+                country_code = excluded.country_code, updated_at = excluded.updated_at
+            where holdings.name is distinct from excluded.name
+               or holdings.pct is distinct from excluded.pct
+               or holdings.country_code is distinct from excluded.country_code
+        returning 1
+    )
+    select (select count(*) from removed) + (select count(*) from written),
+           (select count(*) from incoming)
+    into v_holdings_changed, v_holdings_count;
+
+    delete from country_weights where fund_id = v_fund_id;
+    insert into country_weights (fund_id, country_code, weight_pct, updated_at)
+    select v_fund_id, c->>'country_code', round((c->>'weight_pct')::numeric, 4), now()
+    from jsonb_array_elements(coalesce(p_country_weights, '[]'::jsonb)) c;
+
+    if p_sector_weights is not null then
+        delete from sector_weights where fund_id = v_fund_id;
+        insert into sector_weights (fund_id, sector, weight_pct, updated_at)
+        select v_fund_id, s->>'sector', round((s->>'weight_pct')::numeric, 4), now()
+        from jsonb_array_elements(p_sector_weights) s;
+    end if;
+
+    update funds
+        set holdings_source = p_source,
+            holdings_count = v_holdings_count,
+            holdings_as_of = p_as_of,
+            holdings_loaded_at = now()
+        where id = v_fund_id;
+
+    delete from holdings_staging where load_id = p_load_id;
+
+    return jsonb_build_object(
+        'fund_id', v_fund_id,
+        'holdings_count', v_holdings_count,
+        'holdings_changed', v_holdings_changed
+    );
+end;
+$$ language plpgsql;
+
+-- Same as 04, but funds with file-sourced holdings keep them
+create or replace function upsert_fund_snapshot(p_fund jsonb)
+returns jsonb as $$
+declare
+    v_fund_id uuid;
+    v_source text;
+    v_holdings_changed integer;
+    v_countries_changed integer;
+    v_sectors_changed integer;
+begin
+    insert into funds (ticker, name, price, currency, updated_at)
+    values (
+        p_fund->'fund'->>'ticker',
+        p_fund->'fund'->>'name',
+        (p_fund->'fund'->>'price')::numeric,
+        coalesce(p_fund->'fund'->>'currency', 'USD'),
+        now()
+    )
+    on conflict (ticker) do update
+        set name = excluded.name,
+            price = excluded.price,
+            currency = excluded.currency,
+            updated_at = excluded.updated_at
+    returning id, holdings_source into v_fund_id, v_source;
+
+    -- Holdings loaded from a full constituent file are not replaced by the
+    -- yfinance top-10; only the fund row (name, price) is refreshed.
+    if v_source is distinct from 'yfinance' then
+        return jsonb_build_object(
+            'fund_id', v_fund_id,
+            'holdings_source', v_source,
+            'holdings_changed', 0,
+            'country_weights_changed', 0,
+            'sector_weights_changed', 0
+        );
+    end if;
+
+    -- Holdings
+    with incoming as (
+        select distinct on (h->>'ticker')
+            h->>'ticker' as ticker,
+            h->>'name' as name,
+            round((h->>'pct')::numeric, 4) as pct
+        from jsonb_array_elements(coalesce(p_fund->'holdings', '[]'::jsonb)) h
+        order by h->>'ticker', (h->>'pct')::numeric desc
+    ), removed as (
+        delete from holdings t
+        where t.fund_id = v_fund_id
+          and not exists (select 1 from incoming i where i.ticker = t.ticker)
+        returning 1
+    ), written as (
+        insert into holdings (fund_id, ticker, name, pct, updated_at)
+        select v_fund_id, i.ticker, i.name, i.pct, now() from incoming i
+        on conflict (fund_id, ticker) do update
+            set name = excluded.name, pct = excluded.pct, updated_at = excluded.updated_at
+            where holdings.name is distinct from excluded.name
+               or holdings.pct is distinct from excluded.pct
+        returning 1
+    )
+    select (select count(*) from removed) + (select count(*) from written)
+    into v_holdings_changed;
+
+    -- Country weights
+    with incoming as (
+        select
+            c->>'country_code' as country_code,
+            round(sum((c->>'weight_pct')::numeric), 4) as weight_pct
+        from jsonb_array_elements(coalesce(p_fund->'country_weights', '[]'::jsonb)) c
+        group by c->>'country_code'
+    ), removed as (
+        delete from country_weights t
+        where t.fund_id = v_fund_id
+          and not exists (select 1 from incoming i where i.country_code = t.country_code)
+        returning 1
+    ), written as (
+        insert into country_weights (fund_id, country_code, weight_pct, updated_at)
+        select v_fund_id, i.country_code, i.weight_pct, now() from incoming i
+        on conflict (fund_id, country_code) do update
+            set weight_pct = excluded.weight_pct, updated_at = excluded.updated_at
+            where country_weights.weight_pct is distinct from excluded.weight_pct
+        returning 1
+    )
+    select (select count(*) from removed) + (select count(*) from written)
+    into v_countries_changed;
+
+    -- Sector weights
+    with incoming as (
+        select
+            s->>'sector' as sector,
+            round(sum((s->>'weight_pct')::numeric), 4) as weight_pct
+        from jsonb_array_elements(coalesce(p_fund->'sector_weights', '[]'::jsonb)) s
+        group by s->>'sector'
+    ), removed as (
+        delete from sector_weights t
+        where t.fund_id = v_fund_id
+          and not exists (select 1 from incoming i where i.sector = t.sector)
+        returning 1
+    ), written as (
+        insert into sector_weights (fund_id, sector, weight_pct, updated_at)
+        select v_fund_id, i.sector, i.weight_pct, now() from incoming i
+        on conflict (fund_id, sector) do update
+            set weight_pct = excluded.weight_pct, updated_at = excluded.updated_at
+            where sector_weights.weight_pct is distinct from excluded.weight_pct
+        returning 1
+    )
+    select (select count(*) from removed) + (select count(*) from written)
+    into v_sectors_changed;
+
+    return jsonb_build_object(
+        'fund_id', v_fund_id,
+        'holdings_source', v_source,
+        'holdings_changed', v_holdings_changed,
+        'country_weights_changed', v_countries_changed,
+        'sector_weights_changed', v_sectors_changed
+    );
+end;
+$$ language plpgsql;
@@ -0,0 +1,30 @@
+-- Holding screener
+-- /api/screen filters holdings by ticker and weight. Without an index on
+-- holdings.ticker that is a sequential scan over every fund's holdings.
+-- With (ticker, pct desc) a screen is one index range read, already in
+-- weight order; fund_id is included so the join to funds needs no heap read.
+create index if not exists idx_holdings_ticker_pct on holdings(ticker, pct desc) include (fund_id);
+
+-- Multi-holding screen: funds holding every ticker at or above its minimum weight.
+-- p_criteria: [{"ticker": "NVDA", "min_weight": 5}, {"ticker": "MSFT", "min_weight": 3}]
+-- Ordered by the weight of the first criterion.
+create or replace function screen_holdings(p_criteria jsonb, p_limit integer default 100)
+returns table (fund_ticker text, fund_name text, weights jsonb) as $$
+    with criteria as (
+        select upper(c->>'ticker') as ticker,
+               coalesce((c->>'min_weight')::numeric, 0) as min_weight,
+               ordinality as position
+        from jsonb_array_elements(p_criteria) with ordinality c
+    ), matches as (
+        select h.fund_id, h.ticker, h.pct, c.position
+        from criteria c
+        join holdings h on h.ticker = c.ticker and h.pct >= c.min_weight
+    )
+    select f.ticker, f.name, jsonb_object_agg(m.ticker, m.pct)
+    from matches m
+    join funds f on f.id = m.fund_id
+    group by f.id, f.ticker, f.name
+    having count(distinct m.ticker) = (select count(distinct ticker) from criteria)
+    order by max(m.pct) filter (where m.position = 1) desc
+    limit p_limit;
+$$ language sql stable;
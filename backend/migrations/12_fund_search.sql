@@ -0,0 +1,91 @@
+-- Indexed, ranked fund search
+-- Replaces unindexed ilike '%q%' scans over funds and thai_funds with
+-- trigram (pg_trgm) indexes on one lowercased search column per table, plus
+-- prefix indexes on the fund codes for one- and two-character queries
+-- (too short to form a trigram).
+--
+-- Thai names are indexed too: pg_trgm treats Thai characters as word
+-- characters under a UTF-8 database locale (Supabase default).
+
+create extension if not exists pg_trgm;
+
+-- ─── yfinance funds ────────────────────────────────────────────────
+
+alter table funds add column if not exists search_text text
+    generated always as (lower(ticker || ' ' || coalesce(name, ''))) stored;
+
+create index if not exists idx_funds_search_trgm on funds using gin (search_text gin_trgm_ops);
+create index if not exists idx_funds_ticker_prefix on funds (upper(ticker) text_pattern_ops);
+
+-- ─── Thai funds ────────────────────────────────────────────────────
+
+alter table thai_funds add column if not exists search_text text
+    generated always as (lower(
+        coalesce(proj_abbr_name, '') || ' ' || proj_id || ' ' ||
+        coalesce(proj_name_en, '') || ' ' || coalesce(proj_name_th, '') || ' ' ||
+        coalesce(amc_name_en, '')
+    )) stored;
+
+create index if not exists idx_thai_funds_search_trgm on thai_funds using gin (search_text gin_trgm_ops);
+create index if not exists idx_thai_funds_abbr_prefix on thai_funds (upper(proj_abbr_name) text_pattern_ops);
+
+-- Escape LIKE wildcards in user input
+create or replace function search_like_escape(p_query text)
+returns text as $$
+    select replace(replace(replace(p_query, '\', '\\'), '%', '\%'), '_', '\_');
+$$ language sql immutable;
+
+-- Ranking: exact code match > code prefix > name prefix > substring, then
+-- trigram word similarity. Fuzzy (typo-tolerant) matches come in through the
+-- <% operator for queries of three or more characters.
+create or replace function search_funds_ranked(p_query text, p_limit integer default 10)
+returns table (ticker text, name text, score real) as $$
+    with q as (
+        select lower(trim(p_query)) as text, search_like_escape(lower(trim(p_query))) as pattern
+    )
+    select f.ticker, f.name,
+        (case
+            when lower(f.ticker) = q.text then 4
+            when lower(f.ticker) like q.pattern || '%' then 3
+            when lower(f.name) like q.pattern || '%' then 2
+            when f.search_text like '%' || q.pattern || '%' then 1
+            else 0
+         end + word_similarity(q.text, f.search_text))::real as score
+    from funds f, q
+    where q.text <> ''
+      and (
+        upper(f.ticker) like upper(q.pattern) || '%'
+        or (length(q.text) >= 3 and (f.search_text like '%' || q.pattern || '%' or q.text <% f.search_text))
+      )
+    order by score desc, f.ticker
+    limit p_limit;
+$$ language sql stable;
+
+create or replace function search_thai_funds_ranked(p_query text, p_limit integer default 10)
+returns table (
+    proj_id text, proj_name_th text, proj_name_en text, proj_abbr_name text,
+    is_feeder_fund boolean, feederfund_master_fund text, master_fund_ticker text,
+    amc_name_en text, fund_type text, risk_level text, score real
+) as $$
+    with q as (
+        select lower(trim(p_query)) as text, search_like_escape(lower(trim(p_query))) as pattern
+    )
+    select t.proj_id, t.proj_name_th, t.proj_name_en, t.proj_abbr_name,
+        t.is_feeder_fund, t.feederfund_master_fund, t.master_fund_ticker,
+        t.amc_name_en, t.fund_type, t.risk_level,
+        (case
+            when lower(t.proj_abbr_name) = q.text or lower(t.proj_id) = q.text then 4
+            when lower(t.proj_abbr_name) like q.pattern || '%' then 3
+            when lower(t.proj_name_en) like q.pattern || '%' or lower(t.proj_name_th) like q.pattern || '%' then 2
+            when t.search_text like '%' || q.pattern || '%' then 1
+            else 0
+         end + word_similarity(q.text, t.search_text))::real as score
+    from thai_funds t, q
+    where q.text <> ''
+      and (
+        upper(t.proj_abbr_name) like upper(q.pattern) || '%'
+        or (length(q.text) >= 3 and (t.search_text like '%' || q.pattern || '%' or q.text <% t.search_text))
+      )
+    order by score desc, t.proj_abbr_name
+    limit p_limit;
+$$ language sql stable;
@@ -0,0 +1,80 @@
+-- Unified fund catalog with keyset pagination
+-- /api/search/all browses yfinance funds and Thai funds as one list ordered by
+-- (sort_key, source, fund_key). Filters run in the database and each page
+-- resumes from the last row of the previous one, so page N costs the same as
+-- page 1: each source contributes at most p_limit rows from an index scan
+-- starting at the cursor.
+
+alter table funds add column if not exists sort_key text
+    generated always as (lower(ticker)) stored;
+
+-- SEC profiles store '' rather than null for a missing abbreviation or English
+-- name, so blanks fall back like the Python `or` did
+alter table thai_funds add column if not exists sort_key text
+    generated always as (lower(coalesce(nullif(proj_abbr_name, ''), proj_id))) stored;
+
+alter table thai_funds add column if not exists catalog_type text
+    generated always as (
+        case when upper(coalesce(fund_type, '')) like '%ETF%' then 'ETF' else 'Mutual Fund' end
+    ) stored;
+
+create index if not exists idx_funds_catalog on funds (sort_key, ticker);
+create index if not exists idx_thai_funds_catalog on thai_funds (sort_key, proj_id);
+create index if not exists idx_thai_funds_catalog_type on thai_funds (catalog_type, sort_key, proj_id);
+create index if not exists idx_thai_funds_catalog_amc on thai_funds (amc_name_en, sort_key, proj_id);
+
+-- Page of the catalog after the cursor (p_after_*), null cursor = first page.
+-- Filters: p_query (substring of search_text, see 12_fund_search.sql),
+-- p_type ('ETF' | 'Mutual Fund'), p_source ('yf' | 'sec'), p_issuer (exact
+-- AMC name; yfinance funds have none). Each branch bounds its index scan with
+-- sort_key >= cursor and drops the rows at or before the cursor itself.
+create or replace function search_fund_catalog(
+    p_query text default null,
+    p_type text default null,
+    p_source text default null,
+    p_issuer text default null,
+    p_after_sort text default null,
+    p_after_source text default null,
+    p_after_key text default null,
+    p_limit integer default 20
+)
+returns table (
+    source text, fund_key text, sort_key text, ticker text, name text,
+    proj_id text, fund_type text, amc text, is_feeder_fund boolean
+) as $$
+    select page.* from (
+        (
+            select 'yf'::text as source, f.ticker as fund_key, f.sort_key, f.ticker, f.name,
+                null::text as proj_id, 'ETF'::text as fund_type, null::text as amc,
+                false as is_feeder_fund
+            from funds f
+            where coalesce(p_source, 'yf') = 'yf'
+              and p_issuer is null
+              and coalesce(p_type, 'ETF') = 'ETF'
+              and f.sort_key >= coalesce(p_after_sort, '')
+              and (p_after_sort is null or f.sort_key > p_after_sort
+                   or 'yf' > p_after_source or ('yf' = p_after_source and f.ticker > p_after_key))
+              and (p_query is null or f.search_text like '%' || search_like_escape(lower(p_query)) || '%')
+            order by f.sort_key, f.ticker
+            limit p_limit
+        )
+        union all
+        (
+            select 'sec'::text, t.proj_id, t.sort_key, coalesce(nullif(t.proj_abbr_name, ''), t.proj_id),
+                coalesce(nullif(t.proj_name_en, ''), t.proj_name_th), t.proj_id, t.catalog_type,
+                t.amc_name_en, coalesce(t.is_feeder_fund, false)
+            from thai_funds t
+            where coalesce(p_source, 'sec') = 'sec'
+              and (p_issuer is null or t.amc_name_en = p_issuer)
+              and (p_type is null or t.catalog_type = p_type)
+              and t.sort_key >= coalesce(p_after_sort, '')
+              and (p_after_sort is null or t.sort_key > p_after_sort
+                   or 'sec' > p_after_source or ('sec' = p_after_source and t.proj_id > p_after_key))
+              and (p_query is null or t.search_text like '%' || search_like_escape(lower(p_query)) || '%')
+            order by t.sort_key, t.proj_id
+            limit p_limit
+        )
+    ) page
+    order by page.sort_key, page.source, page.fund_key
+    limit p_limit;
+$$ language sql stable;
@@ -0,0 +1,45 @@
+-- Batched view counters
+-- Workers buffer page views in memory and flush them as one {key: count} map
+-- (services/view_counter.py) instead of one increment_*_view call per view.
+-- Rows are locked in key order so concurrent flushes from several workers
+-- cannot deadlock on the same popular funds.
+
+create or replace function increment_fund_views(p_counts jsonb)
+returns integer as $$
+declare
+    v_updated integer;
+begin
+    perform 1 from funds
+    where ticker in (select jsonb_object_keys(p_counts))
+    order by ticker
+    for update;
+
+    update funds f
+    set view_count = coalesce(f.view_count, 0) + c.value::integer
+    from jsonb_each_text(p_counts) c
+    where f.ticker = c.key;
+
+    get diagnostics v_updated = row_count;
+    return v_updated;
+end;
+$$ language plpgsql;
+
+create or replace function increment_thai_fund_views(p_counts jsonb)
+returns integer as $$
+declare
+    v_updated integer;
+begin
+    perform 1 from thai_funds
+    where proj_id in (select jsonb_object_keys(p_counts))
+    order by proj_id
+    for update;
+
+    update thai_funds t
+    set view_count = coalesce(t.view_count, 0) + c.value::integer
+    from jsonb_each_text(p_counts) c
+    where t.proj_id = c.key;
+
+    get diagnostics v_updated = row_count;
+    return v_updated;
+end;
+$$ language plpgsql;
@@ -0,0 +1,99 @@
+-- Time-windowed trending
+-- fund_view analytics events are counted per fund per hour as they are
+-- inserted, so "most viewed in the last 24h / 7d" sums at most 168 small
+-- buckets per fund instead of scanning analytics_events or sorting funds by
+-- the all-time view_count.
+
+create table if not exists fund_view_rollups (
+    source text not null,          -- 'yf' (ticker) | 'sec' (proj_id)
+    fund_key text not null,
+    bucket timestamptz not null,   -- start of the hour
+    views integer not null default 0,
+    primary key (source, fund_key, bucket)
+);
+
+create index if not exists idx_fund_view_rollups_bucket on fund_view_rollups (source, bucket);
+
+-- Derived from analytics, so not readable with the anon key; the functions
+-- below run as their owner
+alter table fund_view_rollups enable row level security;
+
+create or replace function rollup_fund_view_event()
+returns trigger as $$
+declare
+    v_source text;
+    v_key text;
+begin
+    if new.event_data->>'source' = 'sec' then
+        v_source := 'sec';
+        v_key := new.event_data->>'proj_id';
+    else
+        v_source := 'yf';
+        v_key := upper(new.event_data->>'ticker');
+    end if;
+    if v_key is null or v_key = '' then
+        return new;
+    end if;
+
+    insert into fund_view_rollups (source, fund_key, bucket, views)
+    values (v_source, v_key, date_trunc('hour', coalesce(new.created_at, now())), 1)
+    on conflict (source, fund_key, bucket)
+    do update set views = fund_view_rollups.views + 1;
+    return new;
+end;
+$$ language plpgsql security definer;
+
+drop trigger if exists trg_rollup_fund_view on analytics_events;
+create trigger trg_rollup_fund_view
+    after insert on analytics_events
+    for each row
+    when (new.event_type = 'fund_view')
+    execute function rollup_fund_view_event();
+
+-- Backfill the last week from existing events
+insert into fund_view_rollups (source, fund_key, bucket, views)
+select
+    case when event_data->>'source' = 'sec' then 'sec' else 'yf' end,
+    case when event_data->>'source' = 'sec' then event_data->>'proj_id' else upper(event_data->>'ticker') end,
+    date_trunc('hour', created_at),
+    count(*)
+from analytics_events
+where event_type = 'fund_view'
+  and created_at >= now() - interval '7 days'
+  and coalesce(case when event_data->>'source' = 'sec' then event_data->>'proj_id'
+                    else event_data->>'ticker' end, '') <> ''
+group by 1, 2, 3
+on conflict (source, fund_key, bucket) do nothing;
+
+-- Most viewed yfinance funds over the last p_window_hours (current hour included)
+create or replace function get_trending_funds(p_window_hours integer default 24, p_limit integer default 50)
+returns table (ticker text, name text, price double precision, view_count bigint) as $$
+    select f.ticker, f.name, f.price::double precision, r.views
+    from (
+        select fund_key, sum(views) as views
+        from fund_view_rollups
+        where source = 'yf'
+          and bucket >= date_trunc('hour', now()) - make_interval(hours => p_window_hours - 1)
+        group by fund_key
+        order by views desc
+        limit p_limit
+    ) r
+    join funds f on f.ticker = r.fund_key
+    order by r.views desc, f.ticker;
+$$ language sql stable security definer;
+
+-- Drop buckets older than every window served
+create or replace function prune_fund_view_rollups(p_keep_hours integer default 192)
+returns integer as $$
+declare
+    v_deleted integer;
+begin
+    delete from fund_view_rollups
+    where bucket < date_trunc('hour', now()) - make_interval(hours => p_keep_hours);
+    get diagnostics v_deleted = row_count;
+    return v_deleted;
+end;
+$$ language plpgsql security definer;
+
+-- All-time fallback used until rollups have data
+create index if not exists idx_funds_view_count on funds (view_count desc, updated_at desc);
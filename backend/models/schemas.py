@@ -31,4 +31,6 @@ class FundResponse:
     country_weights: List[CountryWeight]
     sector_weights: List[SectorWeight]
     last_updated: Optional[str] = None
+    stale: bool = False  # Served past its freshness window while a refresh runs
+    partial: bool = False  # Some upstream pieces missed the deadline and came from the last snapshot
 
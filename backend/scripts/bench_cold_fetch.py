@@ -0,0 +1,171 @@
+"""
+Cold Fetch Benchmark
+Compares cold-fetch latency with a new curl_cffi session per fetch (the old
+behaviour: session setup + TLS handshake on every miss) against the shared
+process session in services.yf_session.
+
+Two targets:
+    yahoo   Real fund fetches through yfinance. Hits Yahoo directly, so keep
+            the iteration count small to stay clear of rate limits.
+    local   A local HTTPS server returning a quote-sized JSON body. Isolates
+            the connection cost; --connect-delay-ms adds a simulated network
+            round trip to every new connection (TCP + TLS setup).
+
+Usage:
+    python -m scripts.bench_cold_fetch --target yahoo --tickers VOO,QQQ,SPY --iterations 3
+    python -m scripts.bench_cold_fetch --target local --iterations 200 --connect-delay-ms 40
+"""
+
+import argparse
+import json
+import os
+import random
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from curl_cffi import requests as curl_requests
+
+from services.yf_session import YFSession, IMPERSONATE
+from services.yfinance_service import fetch_fund_with_session, yf_session, USER_AGENTS
+
+QUOTE_BODY = json.dumps({"quoteSummary": {"result": [{"price": {"regularMarketPrice": 512.3}}],
+                                          "padding": "x" * 4000}}).encode()
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def new_session_fetch(fetch):
+    def run(target):
+        session = curl_requests.Session(impersonate=IMPERSONATE)
+        session.headers['User-agent'] = random.choice(USER_AGENTS)
+        try:
+            return fetch(target, session)
+        finally:
+            session.close()
+    return run
+
+
+def shared_session_fetch(fetch, shared: YFSession):
+    def run(target):
+        with shared.session() as session:
+            return fetch(target, session)
+    return run
+
+
+def run(label: str, fn, targets, iterations: int):
+    latencies = []
+    failures = 0
+    for _ in range(iterations):
+        for target in targets:
+            start = time.perf_counter()
+            try:
+                fn(target)
+            except Exception as e:
+                failures += 1
+                print(f"  {label}: {target} failed: {e}")
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    if not latencies:
+        print(f"{label:<15} no successful fetches ({failures} failures)")
+        return
+    print(f"{label:<15} fetches={len(latencies):<4} failures={failures:<3} "
+          f"p50={percentile(latencies, 50):.1f}ms  p99={percentile(latencies, 99):.1f}ms  "
+          f"mean={statistics.mean(latencies):.1f}ms")
+
+
+# ─── Local target ──────────────────────────────────────────────────
+
+class _QuoteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(QUOTE_BODY)))
+        self.end_headers()
+        self.wfile.write(QUOTE_BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class _DelayedTLSServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, context: ssl.SSLContext, connect_delay: float):
+        super().__init__(address, _QuoteHandler)
+        self.context = context
+        self.connect_delay = connect_delay
+
+    def finish_request(self, request, client_address):
+        # One simulated round trip per new connection, before the TLS handshake
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+        tls = self.context.wrap_socket(request, server_side=True)
+        super().finish_request(tls, client_address)
+
+
+def start_local_server(connect_delay_ms: float) -> str:
+    workdir = tempfile.mkdtemp(prefix="bench-tls-")
+    cert, key = os.path.join(workdir, "cert.pem"), os.path.join(workdir, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=127.0.0.1", "-keyout", key, "-out", cert],
+                   check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server = _DelayedTLSServer(("127.0.0.1", 0), context, connect_delay_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"https://127.0.0.1:{server.server_address[1]}/v10/finance/quoteSummary/VOO"
+
+
+def local_fetch(url: str, session):
+    response = session.get(url, verify=False, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark yfinance cold-fetch latency")
+    parser.add_argument("--target", choices=["yahoo", "local"], default="yahoo")
+    parser.add_argument("--tickers", type=str, default="VOO,QQQ,SPY", help="Comma-separated tickers (yahoo)")
+    parser.add_argument("--iterations", type=int, default=3, help="Fetches per ticker")
+    parser.add_argument("--connect-delay-ms", type=float, default=0.0,
+                        help="Simulated round trip per new connection (local)")
+    args = parser.parse_args()
+
+    if args.target == "local":
+        targets = [start_local_server(args.connect_delay_ms)]
+        fetch = local_fetch
+        shared = YFSession(user_agents=USER_AGENTS)
+    else:
+        targets = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+        fetch = fetch_fund_with_session
+        shared = yf_session
+
+    # One shared fetch first so both runs start warm (imports, DNS, first connection)
+    try:
+        shared_session_fetch(fetch, shared)(targets[0])
+    except Exception as e:
+        print(f"Warm-up fetch failed: {e}")
+
+    run("new-session", new_session_fetch(fetch), targets, args.iterations)
+    run("shared-session", shared_session_fetch(fetch, shared), targets, args.iterations)
+    print(f"Session: {shared.stats()}")
+
+
+if __name__ == "__main__":
+    main()
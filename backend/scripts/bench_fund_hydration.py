@@ -0,0 +1,92 @@
+"""
+Fund Hydration Benchmark
+Compares the legacy five-request fund read against the single embedded-select
+read in DBService.get_fund. Counts HTTP round-trips to Supabase per read and
+reports p50/p99 latency. Requires SUPABASE_URL / SUPABASE_KEY and cached funds.
+Note the legacy path still bumps view_count, exactly as it used to.
+
+Usage:
+    python -m scripts.bench_fund_hydration --tickers VOO,QQQ,SPY --iterations 50
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.db_service import db_service
+
+_round_trips = 0
+_original_send = httpx.Client.send
+
+
+def _counting_send(self, *args, **kwargs):
+    global _round_trips
+    _round_trips += 1
+    return _original_send(self, *args, **kwargs)
+
+
+def legacy_get_fund(ticker: str):
+    """The pre-hydration read path: fund row, view RPC, then one query per child table."""
+    supabase = db_service.supabase
+    response = supabase.table("funds").select("*").eq("ticker", ticker).execute()
+    if not response.data:
+        return None
+    fund_id = response.data[0]["id"]
+    supabase.rpc("increment_fund_view", {"p_ticker": ticker}).execute()
+    supabase.table("holdings").select("*").eq("fund_id", fund_id).execute()
+    supabase.table("country_weights").select("*").eq("fund_id", fund_id).execute()
+    supabase.table("sector_weights").select("*").eq("fund_id", fund_id).execute()
+    return response.data[0]
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(label: str, fn, tickers, iterations: int):
+    global _round_trips
+    latencies = []
+    _round_trips = 0
+    for _ in range(iterations):
+        for ticker in tickers:
+            start = time.perf_counter()
+            fn(ticker)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    reads = iterations * len(tickers)
+    print(f"{label:<12} reads={reads:<5} round-trips/read={_round_trips / reads:.2f}  "
+          f"p50={percentile(latencies, 50):.1f}ms  p99={percentile(latencies, 99):.1f}ms  "
+          f"mean={statistics.mean(latencies):.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fund hydration round-trips")
+    parser.add_argument("--tickers", type=str, default="VOO,QQQ,SPY", help="Comma-separated cached tickers")
+    parser.add_argument("--iterations", type=int, default=30, help="Reads per ticker")
+    args = parser.parse_args()
+
+    if not db_service.supabase:
+        print("Supabase credentials not found; set SUPABASE_URL and SUPABASE_KEY.")
+        return
+
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    httpx.Client.send = _counting_send
+
+    # Warm up connections so TLS setup is not attributed to either path
+    for ticker in tickers:
+        db_service.get_fund(ticker)
+
+    run("legacy", legacy_get_fund, tickers, args.iterations)
+    run("hydrated", db_service.get_fund, tickers, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Holdings Normalizer Benchmark
+Times the old row-by-row conversion of a holdings DataFrame (iterrows, per-row
+float() and a Python loop over countries) against the vectorized stage in
+services.holdings_normalizer, on synthetic frames the size of full-holdings ETFs.
+Checks both produce the same holdings and country weights. No network needed.
+
+Usage:
+    python -m scripts.bench_holdings_normalizer --rows 1000,5000,20000 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.schemas import Holding, CountryWeight
+from services.country_mapper import SUFFIX_TO_COUNTRY, get_country_code
+from services.holdings_normalizer import (
+    normalize_holdings, to_holdings, compute_country_weights,
+)
+
+
+def synthetic_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    """yfinance-shaped top_holdings: symbol index, Name and Holding Percent (fraction)."""
+    rng = random.Random(seed)
+    suffixes = [""] * 6 + list(SUFFIX_TO_COUNTRY)
+    symbols = [f"T{i:05d}{rng.choice(suffixes)}" for i in range(rows)]
+    weights = [rng.random() for _ in range(rows)]
+    total = sum(weights)
+    return pd.DataFrame(
+        {"Name": [f"Company {i}" for i in range(rows)],
+         "Holding Percent": [w / total for w in weights]},
+        index=pd.Index(symbols, name="Symbol"),
+    )
+
+
+def legacy_convert(top_holdings: pd.DataFrame):
+    holdings_list = []
+    for index, row in top_holdings.iterrows():
+        pct = 0.0
+        if '% Assets' in row:
+            pct = float(row['% Assets'])
+        elif 'Holding Percent' in row:
+            pct = float(row['Holding Percent'])
+        holdings_list.append(Holding(
+            ticker=str(index),
+            name=str(row['Name']) if 'Name' in row else str(index),
+            pct=pct * 100
+        ))
+
+    if holdings_list:
+        max_pct = max([h.pct for h in holdings_list])
+        if max_pct > 100:
+            for h in holdings_list:
+                h.pct /= 100
+
+    country_map = {}
+    for h in holdings_list:
+        c_code = get_country_code(h.ticker)
+        if c_code not in country_map:
+            country_map[c_code] = 0.0
+        country_map[c_code] += h.pct
+    country_weights = [CountryWeight(country_code=c, weight_pct=w) for c, w in country_map.items()]
+    return holdings_list, country_weights
+
+
+def vectorized_convert(top_holdings: pd.DataFrame):
+    frame = normalize_holdings(top_holdings)
+    return to_holdings(frame), compute_country_weights(frame)
+
+
+def time_it(fn, frame: pd.DataFrame, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(frame)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def check_equal(legacy, vectorized):
+    legacy_holdings, legacy_countries = legacy
+    new_holdings, new_countries = vectorized
+    assert [(h.ticker, h.name) for h in legacy_holdings] == [(h.ticker, h.name) for h in new_holdings]
+    assert all(abs(a.pct - b.pct) < 1e-9 for a, b in zip(legacy_holdings, new_holdings))
+    assert [c.country_code for c in legacy_countries] == [c.country_code for c in new_countries]
+    assert all(abs(a.weight_pct - b.weight_pct) < 1e-6 for a, b in zip(legacy_countries, new_countries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark holdings DataFrame normalization")
+    parser.add_argument("--rows", type=str, default="500,5000,20000", help="Comma-separated frame sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per size (median reported)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>7}  {'iterrows':>10}  {'vectorized':>10}  {'speedup':>8}")
+    for rows in (int(r) for r in args.rows.split(",") if r.strip()):
+        frame = synthetic_frame(rows)
+        legacy_ms, legacy = time_it(legacy_convert, frame, args.repeat)
+        vector_ms, vectorized = time_it(vectorized_convert, frame, args.repeat)
+        check_equal(legacy, vectorized)
+        print(f"{rows:>7}  {legacy_ms:>8.1f}ms  {vector_ms:>8.1f}ms  {legacy_ms / vector_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
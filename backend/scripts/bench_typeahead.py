@@ -0,0 +1,127 @@
+"""
+Typeahead Index Benchmark
+Builds services.typeahead_index over synthetic yfinance and Thai funds and
+reports build time, memory footprint (tracemalloc) and prefix query latency
+for one- to six-character prefixes. Also times incremental upserts and checks
+the precomputed completion lists they maintain against a full range scan.
+No network needed.
+
+Usage:
+    python -m scripts.bench_typeahead --funds 10000,50000 --queries 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.typeahead_index import TypeaheadIndex
+
+WORDS = ["global", "equity", "fund", "asia", "pacific", "technology", "income", "growth",
+         "dividend", "bond", "index", "world", "china", "japan", "healthcare", "energy",
+         "sustainable", "select", "opportunity", "value", "small", "cap", "emerging", "market"]
+AMCS = ["KASSET", "SCBAM", "KTAM", "BBLAM", "ONEAM", "PRINCIPAL", "UOBAM", "TISCO"]
+
+
+def synthetic_rows(funds: int, seed: int = 42):
+    """Roughly one third yfinance ETFs, two thirds Thai funds, Zipf-like view counts."""
+    rng = random.Random(seed)
+    yf_rows, sec_rows = [], []
+    for i in range(funds):
+        views = int(10000 / (1 + rng.random() * 1000))
+        name = " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(2, 5)))
+        if i % 3 == 0:
+            ticker = "".join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(2, 5)))
+            yf_rows.append({"ticker": f"{ticker}{i}", "name": f"{name} ETF", "view_count": views})
+        else:
+            amc = rng.choice(AMCS)
+            sec_rows.append({
+                "proj_id": f"M{i:04d}_{2000 + i % 25}",
+                "proj_abbr_name": f"{amc[:3]}-{name.split()[0][:4].upper()}{i}",
+                "proj_name_en": f"{amc} {name} Fund",
+                "proj_name_th": f"กองทุนเปิด {name}",
+                "is_feeder_fund": i % 4 == 0,
+                "view_count": views,
+            })
+    return yf_rows, sec_rows
+
+
+def build_index(yf_rows, sec_rows) -> TypeaheadIndex:
+    index = TypeaheadIndex()
+    entries = [index._yf_entry(r) for r in yf_rows] + [index._sec_entry(r) for r in sec_rows]
+    index.build(entries)
+    return index
+
+
+def percentiles(samples_us):
+    samples_us = sorted(samples_us)
+    return (statistics.median(samples_us),
+            samples_us[int(len(samples_us) * 0.99) - 1],
+            samples_us[-1])
+
+
+def bench(funds: int, queries: int):
+    yf_rows, sec_rows = synthetic_rows(funds)
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    index = build_index(yf_rows, sec_rows)
+    build_s = time.perf_counter() - started
+    footprint = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    stats = index.stats()
+    print(f"\n{funds} funds: {stats['keys']} keys, built in {build_s:.2f}s, "
+          f"~{footprint / 1024 / 1024:.1f} MiB ({footprint / funds:.0f} B/fund)")
+
+    rng = random.Random(7)
+    sources = [r["ticker"] for r in yf_rows] + [r["proj_abbr_name"] for r in sec_rows] + WORDS
+    print(f"  {'prefix':>6} {'p50':>8} {'p99':>8} {'max':>8} {'hits':>6}  (µs)")
+    for length in range(1, 7):
+        prefixes = [rng.choice(sources)[:length] for _ in range(queries)]
+        samples, hits = [], 0
+        for prefix in prefixes:
+            t0 = time.perf_counter()
+            results = index.search(prefix, 10)
+            samples.append((time.perf_counter() - t0) * 1e6)
+            hits += bool(results)
+        p50, p99, worst = percentiles(samples)
+        print(f"  {length:>6} {p50:>8.1f} {p99:>8.1f} {worst:>8.1f} {hits:>6}")
+
+    samples = []
+    for i in range(min(queries, 1000)):
+        row = dict(rng.choice(sec_rows), proj_name_en=f"Renamed Fund {i}", view_count=rng.randint(0, 20000))
+        t0 = time.perf_counter()
+        index.upsert(*index._sec_entry(row))
+        samples.append((time.perf_counter() - t0) * 1e6)
+    p50, p99, worst = percentiles(samples)
+    print(f"  upsert: p50 {p50:.1f} µs, p99 {p99:.1f} µs, max {worst:.1f} µs")
+
+    # Completion lists maintained by upserts must match a full scan
+    mismatches = 0
+    for prefix in {rng.choice(sources + ["renamed fund"])[:rng.randint(1, 4)].lower() for _ in range(300)}:
+        expected = [index._views[e] for e in index._scan(prefix, 10)]
+        actual = [index._views[e] for e in index._top.get(prefix, [])[:10]]
+        mismatches += expected != actual
+    print(f"  completion lists checked against full scan: {mismatches} mismatches")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the typeahead prefix index")
+    parser.add_argument("--funds", default="10000,50000", help="Comma-separated fund counts")
+    parser.add_argument("--queries", type=int, default=2000, help="Queries per prefix length")
+    args = parser.parse_args()
+
+    for funds in [int(n) for n in args.funds.split(",") if n]:
+        bench(funds, args.queries)
+
+
+if __name__ == "__main__":
+    main()
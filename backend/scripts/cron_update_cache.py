@@ -1,36 +1,133 @@
+"""
+Fund Cache Warmer
+Refreshes the funds users actually look at before they go stale.
+
+Candidates come from the funds table: the most viewed funds (view_count) that
+were not refreshed recently, followed by the least recently updated funds.
+They are refreshed through a worker pool that shares a token-bucket rate
+limit, with exponential backoff when yfinance answers 429.
+
+Usage:
+    python scripts/cron_update_cache.py
+    python scripts/cron_update_cache.py --workers 4 --rate 0.5 --popular 100 --stale 500
+"""
+
 import os
 import sys
 import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add backend dir to pythonpath so we can import services
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from services.yfinance_service import get_fund_data
+from services.db_service import db_service
+from services.rate_limit import TokenBucket
+from services.yfinance_service import refresh_fund
+from services.yf_session import is_blocked_error
 
-# List of popular ETFs taking up the majority of queries
+# Seed list used when the funds table is still empty
 POPULAR_FUNDS = [
     "VOO", "QQQ", "VTI", "SCHD", "SPY", "IVV", "VUG", "IWM", "VNQ", "ARKK"
 ]
 
-def seed_cache():
-    print(f"Starting background cache refresh for {len(POPULAR_FUNDS)} funds...")
-    success_count = 0
-    fail_count = 0
-    
-    for ticker in POPULAR_FUNDS:
-        print(f"[{time.strftime('%H:%M:%S')}] Updating {ticker}...")
+BACKOFF_BASE_SECONDS = 5.0
+
+
+def refresh_with_retry(ticker: str, bucket: TokenBucket, max_retries: int) -> int:
+    """Refresh one fund, backing off on rate limits. Returns the number of attempts used."""
+    attempt = 0
+    while True:
+        attempt += 1
+        bucket.acquire()
         try:
-            # get_fund_data handles the upsert to Supabase if fresh data is found
-            # We use force_refresh=True to ensure we fetch new data regardless of cache
-            get_fund_data(ticker, force_refresh=True)
-            success_count += 1
-            # Rate limit protection: sleep between requests
-            time.sleep(3) 
+            if refresh_fund(ticker, force=True).partial:
+                raise RuntimeError("partial fetch, not persisted")
+            return attempt
         except Exception as e:
-            print(f"Failed to update {ticker}: {e}")
-            fail_count += 1
-            
-    print(f"Cache refresh complete! Success: {success_count}, Failed: {fail_count}")
+            if not is_blocked_error(e) or attempt > max_retries:
+                raise
+            delay = BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            print(f"[{time.strftime('%H:%M:%S')}] {ticker} rate limited, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def warm_cache(popular_limit: int = 50, stale_limit: int = 200, workers: int = 4,
+               rate: float = 0.5, max_retries: int = 3, min_age_hours: float = 12):
+    candidates = db_service.get_refresh_candidates(popular_limit, stale_limit, min_age_hours)
+    tickers = [c['ticker'] for c in candidates]
+    if not tickers and not db_service.get_freshness_coverage().get("total"):
+        tickers = list(POPULAR_FUNDS)
+
+    print(f"Starting cache warm-up for {len(tickers)} funds "
+          f"({workers} workers, {rate} req/s, {max_retries} retries)...")
+
+    bucket = TokenBucket(rate)
+    failures = {}
+    retries = 0
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(refresh_with_retry, t, bucket, max_retries): t for t in tickers}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                attempts = future.result()
+                retries += attempts - 1
+                print(f"[{time.strftime('%H:%M:%S')}] Updated {ticker}")
+            except Exception as e:
+                failures[ticker] = str(e)
+                print(f"[{time.strftime('%H:%M:%S')}] Failed to update {ticker}: {e}")
+
+    elapsed = time.monotonic() - started
+    succeeded = len(tickers) - len(failures)
+    coverage = db_service.get_freshness_coverage()
+
+    print("\n" + "─" * 40)
+    print("Cache warm-up report")
+    print(f"  Funds attempted:   {len(tickers)}")
+    print(f"  Succeeded:         {succeeded}")
+    print(f"  Failed:            {len(failures)}")
+    print(f"  Retries (429):     {retries}")
+    print(f"  Elapsed:           {elapsed:.1f}s")
+    print(f"  Throughput:        {succeeded / elapsed * 60 if elapsed else 0:.1f} funds/min")
+    if coverage:
+        print(f"  Fresh coverage:    {coverage['fresh']}/{coverage['total']} "
+              f"({coverage['coverage'] * 100:.1f}%)")
+    for ticker, reason in sorted(failures.items()):
+        print(f"    ✗ {ticker}: {reason}")
+
+    return {
+        "attempted": len(tickers),
+        "succeeded": succeeded,
+        "failed": failures,
+        "retries": retries,
+        "elapsed_seconds": elapsed,
+        "coverage": coverage,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh popular and stale funds")
+    parser.add_argument("--popular", type=int, default=50, help="Most viewed funds to consider")
+    parser.add_argument("--stale", type=int, default=200, help="Least recently updated funds to consider")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent refreshes")
+    parser.add_argument("--rate", type=float, default=0.5, help="Max yfinance refreshes per second")
+    parser.add_argument("--max-retries", type=int, default=3, help="Retries per fund on HTTP 429")
+    parser.add_argument("--min-age-hours", type=float, default=12,
+                        help="Skip funds refreshed more recently than this")
+    args = parser.parse_args()
+
+    warm_cache(
+        popular_limit=args.popular,
+        stale_limit=args.stale,
+        workers=args.workers,
+        rate=args.rate,
+        max_retries=args.max_retries,
+        min_age_hours=args.min_age_hours,
+    )
+
 
 if __name__ == "__main__":
-    seed_cache()
+    main()
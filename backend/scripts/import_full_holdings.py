@@ -0,0 +1,64 @@
+"""
+Full Holdings Import
+Loads complete fund constituent lists from issuer CSV/XLSX downloads into
+the holdings table, replacing the yfinance top-10 for those funds.
+
+Files live in one directory (default $HOLDINGS_FILES_DIR), one per fund,
+named after the ticker: VTI.csv, IVV.xlsx, ...
+
+Usage:
+    python -m scripts.import_full_holdings --dir ./holdings_files
+    python -m scripts.import_full_holdings --dir ./holdings_files --ticker VTI --dry-run
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.holdings_providers import (
+    IssuerFileProvider, ingest_full_holdings,
+    HOLDINGS_FILES_DIR, HOLDINGS_CHUNK_ROWS, HOLDINGS_STAGE_BATCH_SIZE,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import full fund holdings from issuer files")
+    parser.add_argument("--dir", type=str, default=HOLDINGS_FILES_DIR, help="Directory of <TICKER>.csv/.xlsx files")
+    parser.add_argument("--ticker", type=str, default=None, help="Only import this fund")
+    parser.add_argument("--chunk-rows", type=int, default=HOLDINGS_CHUNK_ROWS, help="Rows parsed per chunk")
+    parser.add_argument("--batch-size", type=int, default=HOLDINGS_STAGE_BATCH_SIZE, help="Rows per staging insert")
+    parser.add_argument("--dry-run", action="store_true", help="Parse files and report without writing")
+    args = parser.parse_args()
+
+    provider = IssuerFileProvider(args.dir)
+    tickers = [args.ticker.upper()] if args.ticker else provider.tickers()
+    if not tickers:
+        print(f"No holdings files found in '{args.dir}'")
+        return
+
+    print("=" * 60)
+    print(f"📥 Importing full holdings for {len(tickers)} funds{' (dry run)' if args.dry_run else ''}")
+    print("=" * 60)
+
+    errors = {}
+    for ticker in tickers:
+        started = time.monotonic()
+        try:
+            summary = ingest_full_holdings(ticker, provider, chunk_rows=args.chunk_rows,
+                                           batch_size=args.batch_size, dry_run=args.dry_run)
+        except Exception as e:
+            errors[ticker] = str(e)
+            print(f"  ❌ {ticker}: {e}")
+            continue
+        elapsed = time.monotonic() - started
+        print(f"  ✅ {ticker}: {summary['rows']} holdings, {summary['countries']} countries, "
+              f"{summary['sectors']} sectors in {elapsed:.1f}s")
+
+    print(f"\n✅ Done: {len(tickers) - len(errors)}/{len(tickers)} funds ({len(errors)} errors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,113 +5,221 @@ Bulk import Thai mutual fund data from SEC Open Data API into Supabase.
 Usage:
     python -m scripts.sec_import --action list_feeders --limit 10
     python -m scripts.sec_import --action sync_all
+    python -m scripts.sec_import --action sync_all --incremental
+    python -m scripts.sec_import --action import_holdings --all --workers 8 --rps 4
+    python -m scripts.sec_import --action import_top5 --workers 8 --rps 4
+    python -m scripts.sec_import --action import_nav --all --workers 8 --rps 4
+    python -m scripts.sec_import --action import_nav --proj-id M0001_2553 --backfill-days 3650
     python -m scripts.sec_import --action import_profiles --max-pages 5
+    python -m scripts.sec_import --action import_profiles --workers 8 --rps 4 --checkpoint profiles.ckpt
 """
 
 import argparse
+import asyncio
 import sys
 import os
+import json
+import time
+import hashlib
 import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from services.sec_service import sec_service, SECService, map_master_fund_to_ticker
-from services.sec_db_service import sec_db_service
-
-
-def import_profiles(max_pages: int = None, dry_run: bool = False):
+from services.sec_service import sec_service, SECService, map_master_fund_to_ticker, SEC_API_MAX_WORKERS
+from services.sec_async_service import AsyncSECService
+from services.sec_db_service import sec_db_service, DEFAULT_BATCH_SIZE
+from services.rate_limit import TokenBucket
+from services.thai_fund_service import thai_fund_service, TOP5_TTL_HOURS, NAV_BACKFILL_DAYS
+
+
+def build_thai_fund_record(fund: dict) -> dict:
+    """Map an SEC fund profile to a thai_funds row (same keys for every fund, so rows batch)."""
+    is_feeder = SECService.is_feeder_fund(fund)
+    master_fund = SECService.extract_master_fund_name(fund) if is_feeder else None
+    ticker = map_master_fund_to_ticker(master_fund) if master_fund else None
+    return {
+        "proj_id": fund.get("proj_id", ""),
+        "proj_name_th": fund.get("proj_name_th", ""),
+        "proj_name_en": fund.get("proj_name_en", ""),
+        "proj_abbr_name": fund.get("proj_abbr_name", ""),
+        "amc_name_th": fund.get("comp_name_th", ""),
+        "amc_name_en": fund.get("comp_name_en", ""),
+        "fund_type": fund.get("policy_desc", ""),
+        "policy_desc": fund.get("investment_policy_desc", ""),
+        "is_feeder_fund": is_feeder,
+        "feederfund_master_fund": master_fund,
+        "feederfund_country": fund.get("feederfund_country", "") if is_feeder else None,
+        "master_fund_ticker": ticker,
+        "risk_level": fund.get("risk_spectrum", ""),
+        "updated_at": datetime.datetime.now(
+            datetime.timezone.utc
+        ).isoformat(),
+    }
+
+
+def build_feeder_mapping(fund: dict, record: dict) -> dict:
+    """Map an SEC feeder fund profile to a feeder_master_mapping row."""
+    ticker = record["master_fund_ticker"]
+    return {
+        "thai_fund_proj_id": record["proj_id"],
+        "master_fund_name": record["feederfund_master_fund"],
+        "master_fund_ticker": ticker,
+        "master_fund_isin": fund.get("feederfund_isin", ""),
+        "confidence": "auto" if ticker else "unmapped",
+    }
+
+
+def fingerprint(record: dict, mapping: dict = None) -> str:
+    """Content hash of a normalized profile (ignores updated_at), used to skip unchanged funds."""
+    content = {k: v for k, v in record.items() if k not in ("updated_at", "content_hash")}
+    content["_mapping"] = mapping
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ProfileBatchWriter:
+    """Buffers thai_funds and feeder mapping rows and writes them in bulk upserts."""
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        # Keyed by proj_id: a fund repeated across pages must not appear twice in one upsert
+        self.funds = {}
+        self.mappings = {}
+        self.funds_written = 0
+        self.mappings_written = 0
+
+    def add(self, record: dict, mapping: dict = None):
+        self.funds[record["proj_id"]] = record
+        if mapping:
+            self.mappings[mapping["thai_fund_proj_id"]] = mapping
+        if len(self.funds) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Hashes are stored last, only for funds whose rows were all written,
+        # so a fund with a failed write is retried by the next incremental sync
+        hashes = {proj_id: record.pop("content_hash", None) for proj_id, record in self.funds.items()}
+        failed = set()
+        # Funds first: feeder mappings reference thai_funds(proj_id)
+        if self.funds:
+            self.funds_written += sec_db_service.upsert_thai_funds(
+                list(self.funds.values()), self.batch_size, failed
+            )
+            self.funds.clear()
+        if self.mappings:
+            self.mappings_written += sec_db_service.upsert_feeder_mappings(
+                list(self.mappings.values()), self.batch_size, failed
+            )
+            self.mappings.clear()
+        hashes = {proj_id: h for proj_id, h in hashes.items() if h and proj_id not in failed}
+        if hashes:
+            sec_db_service.set_thai_fund_hashes(hashes, self.batch_size)
+
+
+def import_profiles(max_pages: int = None, dry_run: bool = False,
+                    workers: int = SEC_API_MAX_WORKERS, rps: float = None,
+                    checkpoint: str = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                    incremental: bool = False) -> dict:
     """
     Import all fund profiles from SEC API into Supabase.
+    Profiles are streamed from a concurrent paginator and written in bulk
+    upserts of batch_size rows; with --checkpoint an interrupted import
+    resumes from the pages it had not finished.
+    In incremental mode only funds whose content hash changed are written.
     """
     print("=" * 60)
-    print("📥 Importing Fund Profiles from SEC Open Data API")
+    print("📥 Importing Fund Profiles from SEC Open Data API"
+          + (" (incremental)" if incremental else ""))
     print("=" * 60)
 
-    funds = sec_service.get_all_fund_profiles(max_pages=max_pages)
-    print(f"\nFound {len(funds)} funds total.")
+    known_hashes = sec_db_service.get_thai_fund_hashes() if incremental else {}
+    if incremental:
+        print(f"  Loaded {len(known_hashes)} stored fingerprints")
+
+    writer = ProfileBatchWriter(batch_size)
+    funds = sec_service.iter_fund_profiles(
+        max_pages=max_pages,
+        max_workers=workers,
+        requests_per_second=rps,
+        checkpoint_path=checkpoint,
+        on_checkpoint=None if dry_run else writer.flush,
+    )
 
     feeder_count = 0
-    imported_count = 0
+    processed_count = 0
+    changed_count = 0
+    started = time.monotonic()
 
     for i, fund in enumerate(funds):
-        proj_id = fund.get("proj_id", "")
-        name_th = fund.get("proj_name_th", "")
-        name_en = fund.get("proj_name_en", "")
-        is_feeder = SECService.is_feeder_fund(fund)
-        master_fund = SECService.extract_master_fund_name(fund)
+        processed_count += 1
+        record = build_thai_fund_record(fund)
 
-        if is_feeder:
+        if record["is_feeder_fund"]:
             feeder_count += 1
-            ticker = map_master_fund_to_ticker(master_fund) if master_fund else None
 
             if dry_run:
+                ticker = record["master_fund_ticker"]
                 status = f"→ {ticker}" if ticker else "⚠ NO TICKER MATCH"
-                print(f"  [{i+1}] {name_en or name_th}")
-                print(f"       Master: {master_fund} {status}")
-            else:
-                # Prepare record for DB
-                record = {
-                    "proj_id": proj_id,
-                    "proj_name_th": name_th,
-                    "proj_name_en": name_en,
-                    "proj_abbr_name": fund.get("proj_abbr_name", ""),
-                    "amc_name_th": fund.get("comp_name_th", ""),
-                    "amc_name_en": fund.get("comp_name_en", ""),
-                    "fund_type": fund.get("policy_desc", ""),
-                    "policy_desc": fund.get("investment_policy_desc", ""),
-                    "is_feeder_fund": is_feeder,
-                    "feederfund_master_fund": master_fund,
-                    "feederfund_country": fund.get("feederfund_country", ""),
-                    "master_fund_ticker": ticker,
-                    "risk_level": fund.get("risk_spectrum", ""),
-                    "updated_at": datetime.datetime.now(
-                        datetime.timezone.utc
-                    ).isoformat(),
-                }
-                sec_db_service.upsert_thai_fund(record)
-                imported_count += 1
-
-                # Also save feeder mapping if applicable
-                if master_fund:
-                    mapping = {
-                        "thai_fund_proj_id": proj_id,
-                        "master_fund_name": master_fund,
-                        "master_fund_ticker": ticker,
-                        "master_fund_isin": fund.get("feederfund_isin", ""),
-                        "confidence": "auto" if ticker else "unmapped",
-                    }
-                    sec_db_service.upsert_feeder_mapping(mapping)
-
-        elif not dry_run:
-            # Save non-feeder funds too
-            record = {
-                "proj_id": proj_id,
-                "proj_name_th": name_th,
-                "proj_name_en": name_en,
-                "proj_abbr_name": fund.get("proj_abbr_name", ""),
-                "amc_name_th": fund.get("comp_name_th", ""),
-                "amc_name_en": fund.get("comp_name_en", ""),
-                "fund_type": fund.get("policy_desc", ""),
-                "policy_desc": fund.get("investment_policy_desc", ""),
-                "is_feeder_fund": False,
-                "risk_level": fund.get("risk_spectrum", ""),
-                "updated_at": datetime.datetime.now(
-                    datetime.timezone.utc
-                ).isoformat(),
-            }
-            sec_db_service.upsert_thai_fund(record)
-            imported_count += 1
+                print(f"  [{i+1}] {record['proj_name_en'] or record['proj_name_th']}")
+                print(f"       Master: {record['feederfund_master_fund']} {status}")
+
+        # Also save feeder mapping if applicable
+        mapping = build_feeder_mapping(fund, record) if record["feederfund_master_fund"] else None
+        record["content_hash"] = fingerprint(record, mapping)
+        if known_hashes.get(record["proj_id"]) != record["content_hash"]:
+            changed_count += 1
+            if not dry_run:
+                writer.add(record, mapping)
 
         # Progress indicator
         if (i + 1) % 50 == 0:
-            print(f"  ... processed {i + 1}/{len(funds)} funds")
+            print(f"  ... processed {i + 1} funds")
+
+    if not dry_run:
+        writer.flush()
+    elapsed = time.monotonic() - started
 
     print(f"\n{'─' * 40}")
-    print(f"✅ Done! Processed {len(funds)} funds")
+    print(f"✅ Done! Processed {processed_count} funds in {elapsed:.1f}s")
     print(f"   Feeder funds: {feeder_count}")
+    if incremental:
+        print(f"   Changed since last sync: {changed_count} "
+              f"({processed_count - changed_count} unchanged, skipped)")
+    rows = writer.funds_written + writer.mappings_written
     if not dry_run:
-        print(f"   Imported to DB: {imported_count}")
+        print(f"   Imported to DB: {writer.funds_written} funds, {writer.mappings_written} feeder mappings")
+        print(f"   Throughput: {rows / elapsed if elapsed else 0:.1f} rows/sec (batch size {batch_size})")
+
+    return {
+        "profiles_seen": processed_count,
+        "profiles_changed": changed_count,
+        "rows_written": rows,
+    }
+
+
+def sync_all(max_pages: int = None, dry_run: bool = False, incremental: bool = False, **import_options):
+    """Full or incremental profile sync, recorded in sec_sync_runs."""
+    mode = "incremental" if incremental else "full"
+    print(f"🚀 Starting {mode} sync...\n")
+
+    last_run = sec_db_service.get_last_sync_run()
+    if last_run:
+        print(f"  Last completed sync: {last_run.get('finished_at')} ({last_run.get('mode')}, "
+              f"{last_run.get('profiles_changed')} changed)\n")
+
+    run_id = None if dry_run else sec_db_service.start_sync_run(mode)
+    try:
+        stats = import_profiles(max_pages=max_pages, dry_run=dry_run,
+                                incremental=incremental, **import_options)
+    except Exception:
+        sec_db_service.finish_sync_run(run_id, "failed", {})
+        raise
+    sec_db_service.finish_sync_run(run_id, "completed", stats)
+
+    print()
+    print(f"✅ {mode.capitalize()} sync complete!")
 
 
 def list_feeders(limit: int = 20):
@@ -143,9 +251,56 @@ def list_feeders(limit: int = 20):
         print()
 
 
-def import_holdings(proj_id: str = None, period: str = None):
+def build_holding_records(proj_id: str, holdings: list, period: str = None) -> dict:
+    """
+    Group raw SEC portfolio rows into thai_fund_holdings records per period.
+    Rows sharing a holding_key within a period (e.g. several lots of one
+    security) are merged by summing value and percent_nav.
     """
-    Import quarterly portfolio holdings for a specific fund or all feeder funds.
+    by_period = {}
+    for h in holdings:
+        record_period = h.get("period", period or "")
+        holding_key = h.get("isin_code") or h.get("issue_code") or h.get("issuer") or ""
+        if not holding_key:
+            continue
+
+        records = by_period.setdefault(record_period, {})
+        existing = records.get(holding_key)
+        if existing:
+            existing["value"] += float(h.get("assetliab_value") or 0)
+            existing["percent_nav"] += float(h.get("percent_nav") or 0)
+            continue
+
+        records[holding_key] = {
+            "thai_fund_proj_id": proj_id,
+            "period": record_period,
+            "holding_key": holding_key,
+            "issuer": h.get("issuer", ""),
+            "issue_code": h.get("issue_code", ""),
+            "isin_code": h.get("isin_code", ""),
+            "asset_type": h.get("asset_type", ""),
+            "value": float(h.get("assetliab_value") or 0),
+            "percent_nav": float(h.get("percent_nav") or 0),
+        }
+    return {p: list(records.values()) for p, records in by_period.items()}
+
+
+def import_fund_holdings(proj_id: str, period: str = None, limiter: TokenBucket = None,
+                         batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Fetch every page of a fund's quarterly portfolio and replace each period's holdings."""
+    holdings = sec_service.get_all_quarterly_portfolio(proj_id, start_period=period, limiter=limiter)
+    written = 0
+    for record_period, records in build_holding_records(proj_id, holdings, period).items():
+        written += sec_db_service.replace_thai_fund_holdings(proj_id, record_period, records, batch_size)
+    return written
+
+
+def import_holdings(proj_id: str = None, period: str = None, all_funds: bool = False,
+                    workers: int = SEC_API_MAX_WORKERS, rps: float = None,
+                    batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Import quarterly portfolio holdings for a specific fund or, with --all,
+    for every fund in the catalog using a bounded pool of workers.
     """
     print("=" * 60)
     print("📊 Importing Fund Holdings")
@@ -153,23 +308,142 @@ def import_holdings(proj_id: str = None, period: str = None):
 
     if proj_id:
         # Import for a single fund
-        holdings = sec_service.get_quarterly_portfolio(proj_id, start_period=period)
-        print(f"  Found {len(holdings)} holdings for {proj_id}")
-        for h in holdings:
-            record = {
-                "thai_fund_proj_id": proj_id,
-                "period": h.get("period", period or ""),
-                "issuer": h.get("issuer", ""),
-                "issue_code": h.get("issue_code", ""),
-                "isin_code": h.get("isin_code", ""),
-                "asset_type": h.get("asset_type", ""),
-                "value": h.get("assetliab_value", 0),
-                "percent_nav": h.get("percent_nav", 0),
-            }
-            sec_db_service.upsert_thai_fund_holding(record)
-        print(f"  ✅ Imported {len(holdings)} holdings")
-    else:
-        print("  Specify --proj-id to import holdings for a specific fund.")
+        written = import_fund_holdings(proj_id, period, batch_size=batch_size)
+        print(f"  ✅ Imported {written} holdings for {proj_id}")
+        return
+
+    if not all_funds:
+        print("  Specify --proj-id to import holdings for a specific fund, or --all for every fund.")
+        return
+
+    proj_ids = sec_db_service.get_all_proj_ids()
+    print(f"  Importing holdings for {len(proj_ids)} funds with {workers} workers...")
+
+    limiter = TokenBucket(rps, capacity=1) if rps else None
+    started = time.monotonic()
+    rows_written = 0
+    funds_done = 0
+    errors = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(import_fund_holdings, pid, period, limiter, batch_size): pid
+            for pid in proj_ids
+        }
+        for future in as_completed(futures):
+            pid = futures[future]
+            try:
+                rows_written += future.result()
+                funds_done += 1
+            except Exception as e:
+                errors[pid] = str(e)
+                print(f"  ❌ {pid}: {e}")
+
+            finished = funds_done + len(errors)
+            if finished % 50 == 0:
+                elapsed = time.monotonic() - started
+                print(f"  ... {finished}/{len(proj_ids)} funds, {rows_written} rows "
+                      f"({finished / elapsed:.1f} funds/sec)")
+
+    elapsed = time.monotonic() - started
+    print(f"\n{'─' * 40}")
+    print(f"✅ Done! {funds_done}/{len(proj_ids)} funds imported in {elapsed:.1f}s")
+    print(f"   Holdings written: {rows_written}")
+    print(f"   Throughput: {funds_done / elapsed if elapsed else 0:.2f} funds/sec, "
+          f"{rows_written / elapsed if elapsed else 0:.1f} rows/sec")
+    print(f"   Errors: {len(errors)}")
+    for pid, reason in list(errors.items())[:20]:
+        print(f"     - {pid}: {reason}")
+
+
+def import_top5(workers: int = SEC_API_MAX_WORKERS, max_age_hours: float = TOP5_TTL_HOURS,
+                rps: float = None):
+    """
+    Refresh the persisted top-5 holdings of every fund whose copy is missing
+    or older than max_age_hours, so /api/thai-fund-info never waits on the SEC API.
+    Fetches fan out over the async SEC client; DB writes run in a worker thread.
+    """
+    print("=" * 60)
+    print("🏆 Refreshing Top 5 Holdings")
+    print("=" * 60)
+
+    proj_ids = sec_db_service.get_stale_top5_proj_ids(max_age_hours)
+    print(f"  {len(proj_ids)} funds need a refresh (older than {max_age_hours:g}h)")
+
+    started = time.monotonic()
+    errors = asyncio.run(_refresh_top5_async(proj_ids, workers, rps))
+
+    elapsed = time.monotonic() - started
+    print(f"\n✅ Refreshed {len(proj_ids) - len(errors)}/{len(proj_ids)} funds in {elapsed:.1f}s "
+          f"({len(errors)} errors)")
+
+
+async def _refresh_top5_async(proj_ids: list, workers: int, rps: float = None) -> dict:
+    errors = {}
+    async with AsyncSECService(requests_per_second=rps, max_connections=workers) as sec:
+        done = 0
+        async for pid, result in sec.map_funds(sec.get_top5_holdings, proj_ids):
+            done += 1
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                await asyncio.to_thread(thai_fund_service.store_top5_holdings, pid, result)
+            except Exception as e:
+                errors[pid] = str(e)
+                print(f"  ❌ {pid}: {e}")
+            if done % 50 == 0:
+                print(f"  ... {done}/{len(proj_ids)} funds")
+    return errors
+
+
+def import_nav(proj_id: str = None, all_funds: bool = False,
+               backfill_days: int = NAV_BACKFILL_DAYS,
+               workers: int = SEC_API_MAX_WORKERS, rps: float = None):
+    """
+    Append daily NAV rows for one fund or, with --all, every fund in the catalog.
+    Funds without history are backfilled; others only fetch days after their
+    latest stored NAV, so the job can run daily.
+    """
+    print("=" * 60)
+    print("📈 Importing Daily NAV")
+    print("=" * 60)
+
+    if proj_id:
+        written = thai_fund_service.ingest_nav(proj_id, backfill_days)
+        print(f"  ✅ Wrote {written} NAV rows for {proj_id}")
+        return
+
+    if not all_funds:
+        print("  Specify --proj-id to import NAV for a specific fund, or --all for every fund.")
+        return
+
+    proj_ids = sec_db_service.get_all_proj_ids()
+    print(f"  Importing NAV for {len(proj_ids)} funds with {workers} workers...")
+
+    limiter = TokenBucket(rps, capacity=1) if rps else None
+    started = time.monotonic()
+    rows_written = 0
+    errors = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(thai_fund_service.ingest_nav, pid, backfill_days, limiter): pid
+            for pid in proj_ids
+        }
+        for i, future in enumerate(as_completed(futures)):
+            pid = futures[future]
+            try:
+                rows_written += future.result()
+            except Exception as e:
+                errors[pid] = str(e)
+                print(f"  ❌ {pid}: {e}")
+            if (i + 1) % 50 == 0:
+                print(f"  ... {i + 1}/{len(proj_ids)} funds, {rows_written} rows")
+
+    elapsed = time.monotonic() - started
+    print(f"\n✅ NAV imported for {len(proj_ids) - len(errors)}/{len(proj_ids)} funds in {elapsed:.1f}s")
+    print(f"   Rows written: {rows_written}")
+    print(f"   Errors: {len(errors)}")
 
 
 def test_connection():
@@ -204,7 +478,7 @@ def main():
     parser = argparse.ArgumentParser(description="SEC Open Data Import Tool")
     parser.add_argument(
         "--action",
-        choices=["test", "list_feeders", "import_profiles", "import_holdings", "sync_all"],
+        choices=["test", "list_feeders", "import_profiles", "import_holdings", "import_top5", "import_nav", "sync_all"],
         required=True,
         help="Action to perform",
     )
@@ -213,6 +487,17 @@ def main():
     parser.add_argument("--proj-id", type=str, default=None, help="Fund project ID")
     parser.add_argument("--period", type=str, default=None, help="Period in YYYYMM format")
     parser.add_argument("--dry-run", action="store_true", help="Preview without saving to DB")
+    parser.add_argument("--workers", type=int, default=SEC_API_MAX_WORKERS, help="Concurrent SEC API requests")
+    parser.add_argument("--rps", type=float, default=None, help="SEC API requests per second budget")
+    parser.add_argument("--checkpoint", type=str, default=None,
+                        help="Checkpoint file for resuming an interrupted profile import")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per bulk upsert")
+    parser.add_argument("--all", action="store_true", dest="all_funds",
+                        help="Process every fund (import_holdings, import_nav)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only write funds whose content changed since the last sync")
+    parser.add_argument("--backfill-days", type=int, default=NAV_BACKFILL_DAYS,
+                        help="Days of NAV history to fetch for funds without any (import_nav)")
 
     args = parser.parse_args()
 
@@ -221,14 +506,21 @@ def main():
     elif args.action == "list_feeders":
         list_feeders(limit=args.limit)
     elif args.action == "import_profiles":
-        import_profiles(max_pages=args.max_pages, dry_run=args.dry_run)
+        import_profiles(max_pages=args.max_pages, dry_run=args.dry_run,
+                        workers=args.workers, rps=args.rps, checkpoint=args.checkpoint,
+                        batch_size=args.batch_size, incremental=args.incremental)
     elif args.action == "import_holdings":
-        import_holdings(proj_id=args.proj_id, period=args.period)
+        import_holdings(proj_id=args.proj_id, period=args.period, all_funds=args.all_funds,
+                        workers=args.workers, rps=args.rps, batch_size=args.batch_size)
+    elif args.action == "import_top5":
+        import_top5(workers=args.workers, rps=args.rps)
+    elif args.action == "import_nav":
+        import_nav(proj_id=args.proj_id, all_funds=args.all_funds, backfill_days=args.backfill_days,
+                   workers=args.workers, rps=args.rps)
     elif args.action == "sync_all":
-        print("🚀 Starting full sync...\n")
-        import_profiles(max_pages=args.max_pages, dry_run=args.dry_run)
-        print()
-        print("✅ Full sync complete!")
+        sync_all(max_pages=args.max_pages, dry_run=args.dry_run, incremental=args.incremental,
+                 workers=args.workers, rps=args.rps, checkpoint=args.checkpoint,
+                 batch_size=args.batch_size)
 
 
 if __name__ == "__main__":
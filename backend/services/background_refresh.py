@@ -0,0 +1,52 @@
+"""
+Background Refresher
+Small worker pool for refreshing cached data off the request path.
+Jobs are deduplicated by key: while a refresh for a key is queued or
+running, further submissions for that key are dropped.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Set
+
+REFRESH_WORKERS = int(os.environ.get("BACKGROUND_REFRESH_WORKERS", "2"))
+
+
+class BackgroundRefresher:
+    """Deduplicating background worker pool."""
+
+    def __init__(self, max_workers: int = REFRESH_WORKERS, name: str = "refresh"):
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+
+    def submit(self, key: str, fn: Callable[[], object]) -> bool:
+        """Queue fn() unless a job for key is already pending. Returns True if queued."""
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+
+        try:
+            self._executor.submit(self._run, key, fn)
+        except RuntimeError:
+            # Executor is shutting down
+            with self._lock:
+                self._pending.discard(key)
+            return False
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _run(self, key: str, fn: Callable[[], object]):
+        try:
+            fn()
+        except Exception as e:
+            print(f"Background {self.name} for {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
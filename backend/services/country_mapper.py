@@ -1,6 +1,10 @@
 # Simple mapper for MVP. In reality, this would be a database or more comprehensive lookup.
 # Maps suffix to ISO 3166-1 numeric code (compatible with world-atlas topojson)
 
+import unicodedata
+
+from services.iso_countries import ISO_3166_1
+
 SUFFIX_TO_COUNTRY = {
     "US": "840", "USA": "840", "": "840", # Default to US
     "JPN": "392", ".T": "392", # Tokyo
@@ -29,3 +33,46 @@ def get_country_code(ticker: str) -> str:
         return SUFFIX_TO_COUNTRY.get(suffix, "840") # Default to US if unknown suffix for now
     
     return "840" # Default to US for no suffix
+
+
+# Issuer holdings files name the country of each position ("Location", "Country")
+# as a country name, alpha-2 or alpha-3 code. Keys are location_key()-normalized.
+UNKNOWN_COUNTRY_CODE = "000"  # A location was given but is not a recognised country
+
+# Names issuers use that differ from the ISO short, official and common names
+LOCATION_ALIASES = {
+    "usa": "840", "united states of america": "840", "us": "840",
+    "uk": "826", "great britain": "826", "england": "826",
+    "korea": "410", "korea (south)": "410", "korea, south": "410", "republic of korea": "410",
+    "hong kong": "156", "hk": "156", "hkg": "156",  # Same as .HK above
+    "russia": "643", "vietnam": "704", "turkey": "792", "iran": "364",
+    "czech republic": "203", "ivory coast": "384", "macau": "446", "laos": "418",
+    "syria": "760", "moldova": "498", "bolivia": "068", "venezuela": "862",
+    "tanzania": "834", "swaziland": "748", "macedonia": "807", "cape verde": "132",
+    "brunei": "096", "palestine": "275", "vatican": "336", "burma": "104",
+    "taiwan": "158", "china (mainland)": "156", "mainland china": "156",
+}
+
+
+def location_key(location: str) -> str:
+    """Lowercase, accent-free, single-spaced form used for location lookups."""
+    text = unicodedata.normalize("NFKD", str(location or ""))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.replace("’", "'").split()).lower()
+
+
+def _build_location_table() -> dict:
+    table = {}
+    for alpha_2, alpha_3, numeric, names in ISO_3166_1:
+        for key in (alpha_2, alpha_3) + names:
+            table[location_key(key)] = numeric
+    table.update(LOCATION_ALIASES)
+    return table
+
+
+LOCATION_TO_COUNTRY = _build_location_table()
+
+
+def get_country_code_for_location(location: str) -> str:
+    """Country code from a country name, alpha-2 or alpha-3 code (None if unknown)."""
+    return LOCATION_TO_COUNTRY.get(location_key(location))
@@ -1,9 +1,13 @@
 import os
+import json
+import base64
+import binascii
 import datetime
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from models.schemas import FundResponse, FundInfo, Holding, CountryWeight, SectorWeight
-from typing import Optional, List
+from services.view_counter import ViewCounterBuffer
+from typing import Optional, List, Dict, Callable, Iterator, Tuple
 from dataclasses import asdict
 
 load_dotenv()
@@ -11,6 +15,47 @@ load_dotenv()
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
 
+# Fund row plus its child collections, embedded via the fund_id foreign keys
+FUND_HYDRATION_SELECT = (
+    "ticker, name, price, currency, updated_at, "
+    "holdings(ticker, name, pct), "
+    "country_weights(country_code, weight_pct), "
+    "sector_weights(sector, weight_pct)"
+)
+
+# Fund data older than this is considered stale and refreshed from yfinance
+CACHE_MAX_AGE_HOURS = 24
+
+# Stale data younger than CACHE_MAX_AGE_HOURS + this grace window is served
+# immediately while a background refresh runs (0 disables stale-while-revalidate)
+CACHE_STALE_GRACE_HOURS = float(os.environ.get("FUND_STALE_GRACE_HOURS", "72"))
+
+def encode_catalog_cursor(row: dict) -> str:
+    """Opaque keyset cursor pointing just after a search_fund_catalog row."""
+    key = json.dumps([row["sort_key"], row["source"], row["fund_key"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+def decode_catalog_cursor(cursor: str) -> Tuple[str, str, str]:
+    """Inverse of encode_catalog_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_key, source, fund_key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not all(isinstance(v, str) for v in (sort_key, source, fund_key)):
+        raise ValueError("Invalid cursor")
+    return sort_key, source, fund_key
+
+def parse_timestamp(iso_timestamp: str) -> datetime.datetime:
+    """Parse an ISO timestamp from Supabase into a timezone-aware datetime (naive = UTC)."""
+    # Parse ISO timestamp (handle Z for UTC)
+    parsed = datetime.datetime.fromisoformat(iso_timestamp.replace('Z', '+00:00'))
+    
+    # Ensure timezone awareness for comparison
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
 class DBService:
     def __init__(self):
         if url and key:
@@ -19,79 +64,112 @@ class DBService:
         else:
             self.supabase = None
             print("Supabase credentials not found, DB disabled")
+        # Called with (ticker, FundResponse or None) after a fund's holdings are written
+        self._upsert_listeners: List[Callable[[str, Optional[FundResponse]], None]] = []
+        # View counts are aggregated in memory and written in batches
+        self.fund_views = ViewCounterBuffer(self._flush_fund_views, name="fund views")
+
+    def add_upsert_listener(self, listener: Callable[[str, Optional[FundResponse]], None]):
+        self._upsert_listeners.append(listener)
+
+    def _notify_upsert(self, ticker: str, data: Optional[FundResponse]):
+        for listener in self._upsert_listeners:
+            try:
+                listener(ticker, data)
+            except Exception as e:
+                print(f"Error in upsert listener for {ticker}: {e}")
 
     def get_fund(self, ticker: str) -> Optional[FundResponse]:
         if not self.supabase:
             return None
             
         try:
-            # 1. Get Fund
-            response = self.supabase.table("funds").select("*").eq("ticker", ticker).execute()
+            # Hydrate the fund and all of its children in a single round-trip
+            # using PostgREST resource embedding over the fund_id foreign keys.
+            response = self.supabase.table("funds") \
+                .select(FUND_HYDRATION_SELECT) \
+                .eq("ticker", ticker) \
+                .order("pct", desc=True, foreign_table="holdings") \
+                .limit(1) \
+                .execute()
             if not response.data:
                 return None
             
-            fund_data = response.data[0]
-            fund_id = fund_data['id']
-            
-            # Increment view count asynchronously (fire and forget basically, but doing it sync here for simplicity)
-            try:
-                self.supabase.rpc('increment_fund_view', {'p_ticker': ticker}).execute()
-            except Exception as e:
-                print(f"Failed to increment view count for {ticker}: {e}")
-            
-            # 2. Get Related Data
-            holdings_res = self.supabase.table("holdings").select("*").eq("fund_id", fund_id).execute()
-            country_res = self.supabase.table("country_weights").select("*").eq("fund_id", fund_id).execute()
-            sector_res = self.supabase.table("sector_weights").select("*").eq("fund_id", fund_id).execute()
-            
-            # 3. Construct objects
-            fund = FundInfo(
-                ticker=fund_data['ticker'],
-                name=fund_data['name'],
-                price=float(fund_data['price']) if fund_data['price'] else None,
-                currency=fund_data['currency']
-            )
-            
-            holdings = [
-                Holding(ticker=h['ticker'], name=h['name'], pct=float(h['pct'])) 
-                for h in holdings_res.data
-            ]
-            
-            country_weights = [
-                CountryWeight(country_code=c['country_code'], weight_pct=float(c['weight_pct']))
-                for c in country_res.data
-            ]
-            
-            sector_weights = [
-                SectorWeight(sector=s['sector'], weight_pct=float(s['weight_pct']))
-                for s in sector_res.data
-            ]
-            
-            return FundResponse(
-                fund=fund,
-                holdings=holdings,
-                country_weights=country_weights,
-                sector_weights=sector_weights,
-                last_updated=fund_data.get('updated_at')
-            )
+            return self._build_fund_response(response.data[0])
 
         except Exception as e:
             print(f"Error fetching from DB: {e}")
             return None
+
+    def get_funds(self, tickers: List[str]) -> Dict[str, FundResponse]:
+        """Hydrate many funds (and their children) in a single round-trip, keyed by ticker."""
+        if not self.supabase or not tickers:
+            return {}
+            
+        try:
+            response = self.supabase.table("funds") \
+                .select(FUND_HYDRATION_SELECT) \
+                .in_("ticker", tickers) \
+                .order("pct", desc=True, foreign_table="holdings") \
+                .execute()
+            
+            return {
+                row['ticker']: self._build_fund_response(row)
+                for row in response.data or []
+            }
+
+        except Exception as e:
+            print(f"Error fetching funds from DB: {e}")
+            return {}
+
+    def _build_fund_response(self, fund_data: dict) -> FundResponse:
+        """Construct a FundResponse from a fund row with embedded children."""
+        fund = FundInfo(
+            ticker=fund_data['ticker'],
+            name=fund_data['name'],
+            price=float(fund_data['price']) if fund_data['price'] else None,
+            currency=fund_data['currency']
+        )
+        
+        holdings = [
+            Holding(ticker=h['ticker'], name=h['name'], pct=float(h['pct'])) 
+            for h in fund_data.get('holdings') or []
+        ]
+        
+        country_weights = [
+            CountryWeight(country_code=c['country_code'], weight_pct=float(c['weight_pct']))
+            for c in fund_data.get('country_weights') or []
+        ]
+        
+        sector_weights = [
+            SectorWeight(sector=s['sector'], weight_pct=float(s['weight_pct']))
+            for s in fund_data.get('sector_weights') or []
+        ]
+        
+        return FundResponse(
+            fund=fund,
+            holdings=holdings,
+            country_weights=country_weights,
+            sector_weights=sector_weights,
+            last_updated=fund_data.get('updated_at')
+        )
+
+    def record_fund_view(self, ticker: str):
+        """Count a fund view; buffered and flushed in batches off the request path."""
+        if not self.supabase:
+            return
+        self.fund_views.record(ticker)
+
+    def _flush_fund_views(self, counts: Dict[str, int]):
+        self.supabase.rpc('increment_fund_views', {'p_counts': counts}).execute()
             
-    def is_cache_fresh(self, last_updated_iso: str, max_age_hours: int = 24) -> bool:
+    def is_cache_fresh(self, last_updated_iso: str, max_age_hours: int = CACHE_MAX_AGE_HOURS) -> bool:
         """Check if the cache is fresh (younger than max_age_hours)."""
         if not last_updated_iso:
             return False
             
         try:
-            # Parse ISO timestamp (handle Z for UTC)
-            last_updated = datetime.datetime.fromisoformat(last_updated_iso.replace('Z', '+00:00'))
-            
-            # Ensure timezone awareness for comparison
-            if last_updated.tzinfo is None:
-                last_updated = last_updated.replace(tzinfo=datetime.timezone.utc)
-                
+            last_updated = parse_timestamp(last_updated_iso)
             now = datetime.datetime.now(datetime.timezone.utc)
             diff = now - last_updated
             
@@ -102,63 +180,74 @@ class DBService:
             print(f"Error checking cache freshness: {e}")
             return False
 
-    def upsert_fund(self, data: FundResponse):
+    def upsert_fund(self, data: FundResponse) -> Optional[dict]:
+        """Persist a yfinance snapshot. Returns the RPC's change summary, or None on failure."""
         if not self.supabase:
-            return
+            return None
             
         try:
             print(f"Upserting {data.fund.ticker} to DB...")
             
-            # 1. Upsert Fund (using ticker as unique key if constraint exists, otherwise we need logic)
-            # The schema has ticker text unique.
-            fund_payload = {
-                "ticker": data.fund.ticker,
-                "name": data.fund.name,
-                "price": data.fund.price,
-                "currency": data.fund.currency,
-                "updated_at": datetime.datetime.now().isoformat()
-            }
-            
-            # Perform Upsert on funds
-            res = self.supabase.table("funds").upsert(fund_payload, on_conflict="ticker").execute()
+            # Single RPC: upserts the fund and diffs holdings/country/sector rows against
+            # what is stored, in one transaction (see migrations/04_upsert_fund_snapshot.sql).
+            # Readers never see a half-written fund and unchanged rows are not rewritten.
+            res = self.supabase.rpc('upsert_fund_snapshot', {'p_fund': asdict(data)}).execute()
             if not res.data:
                 print("Failed to upsert fund")
-                return
-                
-            fund_id = res.data[0]['id']
-            
-            # 2. Clear old relations (Cascade delete is set on FKs, but we need to delete children to replace)
-            # Strategy: Delete all holdings/weights for this fund_id and re-insert
-            self.supabase.table("holdings").delete().eq("fund_id", fund_id).execute()
-            self.supabase.table("country_weights").delete().eq("fund_id", fund_id).execute()
-            self.supabase.table("sector_weights").delete().eq("fund_id", fund_id).execute()
-            
-            # 3. Insert new relations
-            if data.holdings:
-                h_payload = [
-                    {"fund_id": fund_id, "ticker": h.ticker, "name": h.name, "pct": h.pct}
-                    for h in data.holdings
-                ]
-                self.supabase.table("holdings").insert(h_payload).execute()
-                
-            if data.country_weights:
-                c_payload = [
-                    {"fund_id": fund_id, "country_code": c.country_code, "weight_pct": c.weight_pct}
-                    for c in data.country_weights
-                ]
-                self.supabase.table("country_weights").insert(c_payload).execute()
-
-            if data.sector_weights:
-                s_payload = [
-                    {"fund_id": fund_id, "sector": s.sector, "weight_pct": s.weight_pct}
-                    for s in data.sector_weights
-                ]
-                self.supabase.table("sector_weights").insert(s_payload).execute()
+                return None
                 
-            print(f"Successfully saved {data.fund.ticker} to Supabase")
+            changes = res.data
+            print(
+                f"Successfully saved {data.fund.ticker} to Supabase "
+                f"(changed rows: holdings={changes.get('holdings_changed')}, "
+                f"countries={changes.get('country_weights_changed')}, "
+                f"sectors={changes.get('sector_weights_changed')})"
+            )
+            if changes.get('holdings_changed'):
+                self._notify_upsert(data.fund.ticker, data)
+            return changes
 
         except Exception as e:
             print(f"Error saving to DB: {e}")
+            return None
+
+    def stage_holdings(self, load_id: str, rows: List[dict], batch_size: int = 1000) -> int:
+        """Insert a chunk of a full-holdings load into holdings_staging. Raises on failure."""
+        if not self.supabase or not rows:
+            return 0
+        staged = [{**row, "load_id": load_id} for row in rows]
+        for start in range(0, len(staged), batch_size):
+            self.supabase.table("holdings_staging").insert(staged[start:start + batch_size]).execute()
+        return len(staged)
+
+    def apply_holdings_load(self, ticker: str, load_id: str, source: str, as_of: Optional[str],
+                            country_weights: List[dict],
+                            sector_weights: Optional[List[dict]] = None) -> Optional[dict]:
+        """
+        Swap a staged load into holdings in one transaction
+        (see migrations/10_full_holdings.sql). Raises on failure.
+        """
+        if not self.supabase:
+            return None
+        res = self.supabase.rpc('apply_holdings_load', {
+            'p_ticker': ticker,
+            'p_load_id': load_id,
+            'p_source': source,
+            'p_as_of': as_of,
+            'p_country_weights': country_weights,
+            'p_sector_weights': sector_weights,
+        }).execute()
+        self._notify_upsert(ticker, None)
+        return res.data
+
+    def discard_holdings_load(self, load_id: str):
+        """Drop the staged rows of an abandoned load."""
+        if not self.supabase:
+            return
+        try:
+            self.supabase.table("holdings_staging").delete().eq("load_id", load_id).execute()
+        except Exception as e:
+            print(f"Error discarding holdings load {load_id}: {e}")
 
     def screen_funds(self, holding_ticker: str, min_weight: float) -> List[dict]:
         if not self.supabase:
@@ -192,6 +281,111 @@ class DBService:
             print(f"Error screening funds: {e}")
             return []
 
+    def screen_funds_multi(self, criteria: List[Tuple[str, float]], limit: int = 100) -> List[dict]:
+        """
+        Funds holding every (ticker, min_weight) pair, ordered by the first
+        holding's weight (see migrations/11_holdings_screen_index.sql).
+        """
+        if not self.supabase or not criteria:
+            return []
+
+        try:
+            response = self.supabase.rpc('screen_holdings', {
+                'p_criteria': [{'ticker': t.upper(), 'min_weight': w} for t, w in criteria],
+                'p_limit': limit,
+            }).execute()
+            primary = criteria[0][0].upper()
+            return [
+                {
+                    "fund_ticker": row["fund_ticker"],
+                    "fund_name": row["fund_name"],
+                    "holding_ticker": primary,
+                    "weight_pct": float(row["weights"][primary]),
+                    "weights": {t: float(w) for t, w in row["weights"].items()},
+                }
+                for row in response.data or []
+            ]
+        except Exception as e:
+            print(f"Error screening funds: {e}")
+            return []
+
+    def iter_holdings_for_index(self, page_size: int = 1000) -> Iterator[dict]:
+        """Stream every holding with its fund, page by page. Raises on failure."""
+        return self._iter_with_fund("holdings", "ticker, pct", page_size)
+
+    def iter_fund_weights(self, table: str, key_column: str, page_size: int = 1000) -> Iterator[dict]:
+        """Stream every row of country_weights / sector_weights with its fund. Raises on failure."""
+        return self._iter_with_fund(table, f"{key_column}, weight_pct", page_size)
+
+    def _iter_with_fund(self, table: str, columns: str, page_size: int) -> Iterator[dict]:
+        if not self.supabase:
+            return
+        # Keyset paging on id: each page is an index range scan, where OFFSET
+        # would re-read every earlier row
+        last_id = None
+        while True:
+            query = self.supabase.table(table).select(f"id, {columns}, funds!inner(ticker, name)")
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            response = query.order("id").limit(page_size).execute()
+            rows = response.data or []
+            for row in rows:
+                fund = row.pop("funds", None) or {}
+                row["fund_ticker"] = fund.get("ticker")
+                row["fund_name"] = fund.get("name")
+                yield row
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]["id"]
+
+    def iter_funds_for_search(self, since: Optional[str] = None, page_size: int = 1000) -> Iterator[dict]:
+        """
+        Stream ticker, name, view_count and updated_at for every fund, or only
+        funds updated after `since` (ISO timestamp). Raises on failure.
+        """
+        if not self.supabase:
+            return
+        last_ticker = None
+        while True:
+            query = self.supabase.table("funds").select("ticker, name, view_count, updated_at")
+            if since:
+                query = query.gt("updated_at", since)
+            if last_ticker is not None:
+                query = query.gt("ticker", last_ticker)
+            response = query.order("ticker").limit(page_size).execute()
+            rows = response.data or []
+            yield from rows
+            if len(rows) < page_size:
+                return
+            last_ticker = rows[-1]["ticker"]
+
+    def search_catalog(self, query: str = None, fund_type: str = None, source: str = None,
+                       issuer: str = None, cursor: str = None,
+                       limit: int = 20) -> Tuple[List[dict], Optional[str]]:
+        """
+        One page of yfinance and Thai funds (search_fund_catalog RPC) with all
+        filters applied in the database. Returns (rows, next_cursor); the
+        cursor is None on the last page. Raises ValueError for a bad cursor and
+        re-raises database errors.
+        """
+        if not self.supabase:
+            return [], None
+        after = decode_catalog_cursor(cursor) if cursor else (None, None, None)
+        # One extra row tells whether another page exists
+        rows = self.supabase.rpc("search_fund_catalog", {
+            "p_query": query or None,
+            "p_type": fund_type or None,
+            "p_source": source or None,
+            "p_issuer": issuer or None,
+            "p_after_sort": after[0],
+            "p_after_source": after[1],
+            "p_after_key": after[2],
+            "p_limit": limit + 1,
+        }).execute().data or []
+        page = rows[:limit]
+        next_cursor = encode_catalog_cursor(page[-1]) if len(rows) > limit else None
+        return page, next_cursor
+
     def get_trending_funds(self, limit: int = 5) -> List[dict]:
         if not self.supabase:
             return []
@@ -210,19 +404,116 @@ class DBService:
             print(f"Error fetching trending funds: {e}")
             return []
 
-    def search_funds(self, query: str, limit: int = 5) -> List[dict]:
-        if not self.supabase or not query:
+    def get_windowed_trending(self, window_hours: int, limit: int = 50) -> List[dict]:
+        """
+        Most viewed funds over the last window_hours from the hourly view
+        rollups (get_trending_funds RPC). Raises on failure.
+        """
+        if not self.supabase:
+            return []
+        response = self.supabase.rpc("get_trending_funds", {
+            "p_window_hours": window_hours,
+            "p_limit": limit,
+        }).execute()
+        return response.data or []
+
+    def prune_view_rollups(self, keep_hours: int) -> Optional[int]:
+        """Delete hourly view buckets older than keep_hours. Returns rows deleted."""
+        if not self.supabase:
+            return None
+        try:
+            return self.supabase.rpc("prune_fund_view_rollups", {"p_keep_hours": keep_hours}).execute().data
+        except Exception as e:
+            print(f"Error pruning view rollups: {e}")
+            return None
+
+    def get_refresh_candidates(self, popular_limit: int = 50, stale_limit: int = 200,
+                               min_age_hours: float = 12) -> List[dict]:
+        """
+        Funds worth refreshing, most valuable first:
+        popular funds (by view_count) not refreshed in min_age_hours,
+        then the least recently updated funds.
+        """
+        if not self.supabase:
             return []
             
         try:
-            query = query.upper()
-            # Basic ilike search on ticker or name
+            cutoff = (datetime.datetime.now(datetime.timezone.utc)
+                      - datetime.timedelta(hours=min_age_hours)).isoformat()
+            popular = self.supabase.table("funds") \
+                .select("ticker, view_count, updated_at") \
+                .lt("updated_at", cutoff) \
+                .order("view_count", desc=True) \
+                .limit(popular_limit) \
+                .execute()
+            stalest = self.supabase.table("funds") \
+                .select("ticker, view_count, updated_at") \
+                .lt("updated_at", cutoff) \
+                .order("updated_at") \
+                .limit(stale_limit) \
+                .execute()
+            
+            candidates = {}
+            for row in (popular.data or []) + (stalest.data or []):
+                candidates.setdefault(row['ticker'], row)
+            return list(candidates.values())
+        except Exception as e:
+            print(f"Error fetching refresh candidates: {e}")
+            return []
+
+    def get_holdings_loads_since(self, since: str) -> List[dict]:
+        """Tickers whose full holdings were loaded after `since` (ISO timestamp), oldest first."""
+        if not self.supabase:
+            return []
+
+        try:
             response = self.supabase.table("funds") \
-                .select("ticker, name") \
-                .ilike("ticker", f"%{query}%") \
-                .limit(limit) \
+                .select("ticker, holdings_loaded_at") \
+                .gt("holdings_loaded_at", since) \
+                .order("holdings_loaded_at") \
                 .execute()
-                
+            return response.data or []
+        except Exception as e:
+            print(f"Error fetching recent holdings loads: {e}")
+            return []
+
+    def get_freshness_coverage(self, max_age_hours: int = CACHE_MAX_AGE_HOURS) -> dict:
+        """Count how many funds were refreshed within max_age_hours."""
+        if not self.supabase:
+            return {}
+            
+        try:
+            cutoff = (datetime.datetime.now(datetime.timezone.utc)
+                      - datetime.timedelta(hours=max_age_hours)).isoformat()
+            total = self.supabase.table("funds").select("id", count="exact").limit(1).execute()
+            fresh = self.supabase.table("funds").select("id", count="exact") \
+                .gte("updated_at", cutoff).limit(1).execute()
+            
+            total_count = total.count or 0
+            fresh_count = fresh.count or 0
+            return {
+                "total": total_count,
+                "fresh": fresh_count,
+                "coverage": round(fresh_count / total_count, 4) if total_count else 0.0,
+            }
+        except Exception as e:
+            print(f"Error computing freshness coverage: {e}")
+            return {}
+
+    def search_funds(self, query: str, limit: int = 5) -> List[dict]:
+        """
+        Ranked ticker/name search (search_funds_ranked RPC, trigram indexed).
+        Rows are {ticker, name, score}, best match first.
+        """
+        query = (query or "").strip()
+        if not self.supabase or not query:
+            return []
+
+        try:
+            response = self.supabase.rpc("search_funds_ranked", {
+                "p_query": query,
+                "p_limit": limit,
+            }).execute()
             return response.data or []
         except Exception as e:
             print(f"Error searching funds: {e}")
@@ -0,0 +1,174 @@
+"""
+Fund L1 Cache
+Per-process LRU cache of FundResponse objects that sits in front of the
+Supabase lookup. Bounded by entry count and approximate payload size.
+Entries go stale on the same freshness rule as DBService.is_cache_fresh and
+are dropped once they fall outside the stale-while-revalidate grace window.
+
+Full-holdings imports run in another process, so a daemon thread polls
+funds.holdings_loaded_at every FUND_CACHE_INVALIDATION_SECONDS and drops
+the funds loaded since the last poll; the next request reads them from
+the database.
+"""
+
+import os
+import json
+import time
+import datetime
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, replace
+from typing import Optional, Dict, Any, Tuple
+
+from models.schemas import FundResponse
+from services.db_service import db_service, parse_timestamp, CACHE_MAX_AGE_HOURS, CACHE_STALE_GRACE_HOURS
+
+FUND_CACHE_MAX_ENTRIES = int(os.environ.get("FUND_CACHE_MAX_ENTRIES", "512"))
+FUND_CACHE_MAX_BYTES = int(os.environ.get("FUND_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+FUND_CACHE_INVALIDATION_SECONDS = float(os.environ.get("FUND_CACHE_INVALIDATION_SECONDS", "30"))
+
+
+class FundCache:
+    """Thread-safe LRU cache bounded by entry count and approximate bytes."""
+
+    def __init__(self, max_entries: int = FUND_CACHE_MAX_ENTRIES,
+                 max_bytes: int = FUND_CACHE_MAX_BYTES,
+                 max_age_hours: int = CACHE_MAX_AGE_HOURS,
+                 stale_grace_hours: float = CACHE_STALE_GRACE_HOURS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_hours * 3600
+        self.stale_grace_seconds = stale_grace_hours * 3600
+        # ticker -> (data, fresh_until, expires_at epoch seconds, size in bytes)
+        self._entries: "OrderedDict[str, Tuple[FundResponse, float, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._thread: Optional[threading.Thread] = None
+        self._loads_since: Optional[str] = None
+
+    def get(self, ticker: str, allow_stale: bool = False) -> Optional[FundResponse]:
+        """
+        Return the cached fund if present and still fresh.
+        With allow_stale, entries inside the grace window are returned too,
+        as a copy flagged stale=True.
+        """
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            data, fresh_until, expires_at, _ = entry
+            now = time.time()
+            if now >= expires_at:
+                self._remove(ticker)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            if now >= fresh_until:
+                if not allow_stale:
+                    self.misses += 1
+                    return None
+                self._entries.move_to_end(ticker)
+                self.stale_hits += 1
+                return replace(data, stale=True)
+
+            self._entries.move_to_end(ticker)
+            self.hits += 1
+            return data
+
+    def put(self, ticker: str, data: FundResponse):
+        """Cache a fund until its last_updated timestamp falls outside the grace window."""
+        fresh_until = self._fresh_until(data.last_updated)
+        if fresh_until is None:
+            return
+        expires_at = fresh_until + self.stale_grace_seconds
+        if time.time() >= expires_at:
+            return
+        if data.stale:
+            data = replace(data, stale=False)
+
+        size = len(json.dumps(asdict(data), default=str))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if ticker in self._entries:
+                self._remove(ticker)
+            self._entries[ticker] = (data, fresh_until, expires_at, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, ticker: str):
+        with self._lock:
+            if ticker in self._entries:
+                self._remove(ticker)
+                self.invalidations += 1
+
+    def start(self, poll_seconds: float = FUND_CACHE_INVALIDATION_SECONDS):
+        """Poll for full-holdings loads made by other processes in a daemon thread."""
+        if self._thread or not db_service.supabase:
+            return
+        started = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=poll_seconds)
+        self._loads_since = started.isoformat()
+        self._thread = threading.Thread(target=self._run, args=(poll_seconds,),
+                                        name="fund-cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def _run(self, poll_seconds: float):
+        while True:
+            time.sleep(poll_seconds)
+            try:
+                self.poll_holdings_loads()
+            except Exception as e:
+                print(f"Error polling holdings loads: {e}")
+
+    def poll_holdings_loads(self):
+        """Drop cached funds whose holdings were loaded since the previous poll."""
+        for row in db_service.get_holdings_loads_since(self._loads_since):
+            self.invalidate(row["ticker"])
+            self._loads_since = row["holdings_loaded_at"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, ticker: str):
+        _, _, _, size = self._entries.pop(ticker)
+        self._bytes -= size
+
+    def _fresh_until(self, last_updated_iso: Optional[str]) -> Optional[float]:
+        if not last_updated_iso:
+            return None
+        try:
+            return parse_timestamp(last_updated_iso).timestamp() + self.max_age_seconds
+        except ValueError:
+            return None
+
+
+# Module-level singleton
+fund_cache = FundCache()
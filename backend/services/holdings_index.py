@@ -0,0 +1,164 @@
+"""
+Holdings Inverted Index
+Per-process holding -> funds index for the screener. Each holding ticker
+maps to its funds sorted by weight descending, so "funds holding NVDA at
+>= 5%" is a bisect plus a slice instead of a join over the holdings table.
+
+The index has no loader of its own: the screening engine's periodic
+snapshot load (services/screening_engine.py) hands it every fund's holdings,
+so the holdings table is read once per worker. Writes made by this worker
+are applied immediately through DBService upsert listeners. Until the first
+load completes, callers fall back to the database.
+"""
+
+import bisect
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from models.schemas import FundResponse
+from services.db_service import db_service
+
+
+class _Postings:
+    """Funds holding one ticker, sorted by weight descending."""
+
+    __slots__ = ("neg_weights", "funds")
+
+    def __init__(self):
+        self.neg_weights: List[float] = []  # -pct ascending, for bisect
+        self.funds: List[str] = []
+
+    def add(self, fund: str, pct: float):
+        i = bisect.bisect_right(self.neg_weights, -pct)
+        self.neg_weights.insert(i, -pct)
+        self.funds.insert(i, fund)
+
+    def remove(self, fund: str, pct: float):
+        lo = bisect.bisect_left(self.neg_weights, -pct)
+        hi = bisect.bisect_right(self.neg_weights, -pct)
+        for i in range(lo, hi):
+            if self.funds[i] == fund:
+                del self.neg_weights[i]
+                del self.funds[i]
+                return
+
+    def at_least(self, min_weight: float) -> Tuple[List[str], List[float]]:
+        end = bisect.bisect_right(self.neg_weights, -min_weight)
+        return self.funds[:end], [-w for w in self.neg_weights[:end]]
+
+    def count_at_least(self, min_weight: float) -> int:
+        return bisect.bisect_right(self.neg_weights, -min_weight)
+
+
+class HoldingsIndex:
+    """Thread-safe inverted index of fund holdings."""
+
+    def __init__(self):
+        self._postings: Dict[str, _Postings] = {}
+        self._fund_holdings: Dict[str, Dict[str, float]] = {}
+        self._fund_names: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        self._listening = False
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded_at is not None
+
+    def start(self):
+        """Apply this worker's fund writes; the data itself comes from load()."""
+        if self._listening or not db_service.supabase:
+            return
+        db_service.add_upsert_listener(self.on_fund_written)
+        self._listening = True
+
+    def load(self, fund_holdings: Dict[str, Dict[str, float]], fund_names: Dict[str, str]):
+        """
+        Rebuild from fund -> {holding: pct} and swap it in atomically. The
+        holdings dicts are kept as given and must not be mutated afterwards.
+        """
+        started = time.monotonic()
+        postings: Dict[str, _Postings] = {}
+        for fund, holdings in fund_holdings.items():
+            for ticker, pct in holdings.items():
+                postings.setdefault(ticker, _Postings()).add(fund, pct)
+
+        with self._lock:
+            self._postings = postings
+            self._fund_holdings = dict(fund_holdings)
+            self._fund_names = dict(fund_names)
+            self.loaded_at = time.time()
+        print(f"Holdings index built: {len(fund_holdings)} funds, {len(postings)} holdings "
+              f"in {time.monotonic() - started:.1f}s")
+
+    def on_fund_written(self, ticker: str, data: Optional[FundResponse]):
+        """DBService listener: re-index a fund after it is written."""
+        if not self.ready:
+            return
+        if data is None or data.partial:
+            data = db_service.get_fund(ticker)
+        if data is None:
+            return
+        self.update_fund(ticker, data.fund.name, {h.ticker: float(h.pct) for h in data.holdings})
+
+    def update_fund(self, fund: str, name: str, holdings: Dict[str, float]):
+        with self._lock:
+            for ticker, pct in self._fund_holdings.get(fund, {}).items():
+                postings = self._postings.get(ticker)
+                if postings:
+                    postings.remove(fund, pct)
+                    if not postings.funds:
+                        del self._postings[ticker]
+            for ticker, pct in holdings.items():
+                self._postings.setdefault(ticker, _Postings()).add(fund, pct)
+            self._fund_holdings[fund] = dict(holdings)
+            self._fund_names[fund] = name
+
+    def screen(self, criteria: List[Tuple[str, float]], limit: int = None) -> List[dict]:
+        """
+        Funds meeting every (holding_ticker, min_weight) criterion, ordered by
+        the weight of the first criterion. The most selective posting list is
+        scanned and the other criteria are checked against each fund's holdings.
+        """
+        if not criteria:
+            return []
+        with self._lock:
+            primary_ticker = criteria[0][0]
+            postings = [self._postings.get(t) for t, _ in criteria]
+            if any(p is None for p in postings):
+                return []
+
+            driver = min(range(len(criteria)),
+                         key=lambda i: postings[i].count_at_least(criteria[i][1]))
+            candidates, _ = postings[driver].at_least(criteria[driver][1])
+
+            results = []
+            for fund in candidates:
+                holdings = self._fund_holdings[fund]
+                if all(holdings.get(t, -1.0) >= w for t, w in criteria):
+                    results.append({
+                        "fund_ticker": fund,
+                        "fund_name": self._fund_names.get(fund, fund),
+                        "holding_ticker": primary_ticker,
+                        "weight_pct": holdings[primary_ticker],
+                        "weights": {t: holdings[t] for t, _ in criteria},
+                    })
+
+        if driver != 0:
+            results.sort(key=lambda r: r["weight_pct"], reverse=True)
+        return results[:limit] if limit else results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "funds": len(self._fund_holdings),
+                "holdings": len(self._postings),
+                "postings": sum(len(p.funds) for p in self._postings.values()),
+                "loaded_at": self.loaded_at,
+            }
+
+
+# Module-level singleton
+holdings_index = HoldingsIndex()
@@ -0,0 +1,144 @@
+"""
+Holdings Normalizer
+Vectorized conversion of upstream holdings tables into FundResponse models.
+
+Any source that can produce a DataFrame of holdings (yfinance top_holdings,
+SEC quarterly portfolio, ETF issuer files) goes through the same stage:
+columns are resolved once, percentages are scaled as a whole column, and
+country weights come from a single groupby instead of per-row Python loops.
+"""
+
+from typing import Any, Iterable, List, Optional
+
+import pandas as pd
+
+from models.schemas import Holding, CountryWeight, SectorWeight
+from services.country_mapper import SUFFIX_TO_COUNTRY, UNKNOWN_COUNTRY_CODE, get_country_code_for_location
+
+# Column names tried in order when a source does not say which one to use
+PCT_COLUMNS = ("% Assets", "Holding Percent", "pct", "weight")
+NAME_COLUMNS = ("Name", "Holding Name", "name")
+
+DEFAULT_COUNTRY_CODE = "840"  # US, same default as get_country_code
+
+
+def _resolve_column(frame: pd.DataFrame, candidates: Iterable[str]) -> Optional[str]:
+    return next((c for c in candidates if c in frame.columns), None)
+
+
+def normalize_holdings(frame: pd.DataFrame,
+                       ticker_column: str = None,
+                       name_columns: Iterable[str] = NAME_COLUMNS,
+                       pct_columns: Iterable[str] = PCT_COLUMNS,
+                       pct_scale: float = 100.0,
+                       location_columns: Iterable[str] = (),
+                       sector_columns: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    Normalize a holdings table to columns ticker, name, pct (percent of assets)
+    and country_code, plus sector when the source has one.
+
+    Args:
+        frame: Source table, one row per holding
+        ticker_column: Column holding the symbol (None = the index, as in yfinance)
+        name_columns / pct_columns: Candidate column names, first match wins
+        pct_scale: Multiplier applied to the raw weight (100 for fractions)
+        location_columns: Candidate country columns; the ticker suffix is used
+            for rows without a recognised country
+        sector_columns: Candidate sector columns
+
+    If the scaled weights still exceed 100 the source was already in percent,
+    so the column is scaled back down.
+    """
+    if frame is None or frame.empty:
+        return pd.DataFrame({"ticker": pd.Series(dtype=str), "name": pd.Series(dtype=str),
+                             "pct": pd.Series(dtype=float), "country_code": pd.Series(dtype=str)})
+
+    tickers = (frame[ticker_column] if ticker_column else frame.index.to_series()).astype(str)
+    tickers = tickers.reset_index(drop=True)
+
+    name_column = _resolve_column(frame, name_columns)
+    names = frame[name_column].reset_index(drop=True).astype(str) if name_column else tickers
+
+    pct_column = _resolve_column(frame, pct_columns)
+    if pct_column:
+        pct = pd.to_numeric(frame[pct_column], errors="coerce").fillna(0.0).reset_index(drop=True) * pct_scale
+    else:
+        pct = pd.Series(0.0, index=tickers.index)
+
+    if len(pct) and pct.max() > 100:
+        pct = pct / 100
+
+    location_column = _resolve_column(frame, location_columns)
+    locations = frame[location_column].reset_index(drop=True) if location_column else None
+
+    normalized = pd.DataFrame({
+        "ticker": tickers,
+        "name": names,
+        "pct": pct.astype(float),
+        "country_code": country_codes(tickers, locations),
+    })
+
+    sector_column = _resolve_column(frame, sector_columns)
+    if sector_column:
+        normalized["sector"] = frame[sector_column].reset_index(drop=True).astype(str).str.strip()
+    return normalized
+
+
+def holdings_frame(holdings: List[Holding]) -> pd.DataFrame:
+    """Inverse of to_holdings, for model lists that came from elsewhere (e.g. the DB)."""
+    return pd.DataFrame({
+        "ticker": [h.ticker for h in holdings],
+        "name": [h.name for h in holdings],
+        "pct": [float(h.pct) for h in holdings],
+    })
+
+
+def to_holdings(frame: pd.DataFrame) -> List[Holding]:
+    return [
+        Holding(ticker=t, name=n, pct=p)
+        for t, n, p in zip(frame["ticker"].tolist(), frame["name"].tolist(), frame["pct"].tolist())
+    ]
+
+
+def country_codes(tickers: pd.Series, locations: pd.Series = None) -> pd.Series:
+    """
+    Vectorized get_country_code: map the exchange suffix, defaulting to US.
+    A location column (country name or code), when given, takes precedence.
+    Rows with a location that is not a recognised country get
+    UNKNOWN_COUNTRY_CODE rather than the suffix default, so unplaced weight
+    is never attributed to the US.
+    """
+    suffixes = tickers.astype(str).str.extract(r"(\.[^.]*)$", expand=False)
+    codes = suffixes.map(SUFFIX_TO_COUNTRY).fillna(DEFAULT_COUNTRY_CODE)
+    if locations is None:
+        return codes
+    cleaned = locations.astype(str).str.strip()
+    cleaned = cleaned.mask(cleaned.isin(["", "-", "--", "nan", "None", "N/A", "n/a"]))
+    # Few distinct locations per file: resolve each once, then map
+    lookup = {loc: get_country_code_for_location(loc) for loc in cleaned.dropna().unique()}
+    unknown = sorted(loc for loc, code in lookup.items() if code is None)
+    if unknown:
+        print(f"Unrecognised holding locations (recorded as unknown): {', '.join(unknown[:20])}")
+    by_location = cleaned.map({loc: code or UNKNOWN_COUNTRY_CODE for loc, code in lookup.items()})
+    return by_location.fillna(codes)
+
+
+def compute_country_weights(frame: pd.DataFrame) -> List[CountryWeight]:
+    """Sum holding weights per country, in order of first appearance."""
+    if frame.empty:
+        return []
+    codes = frame["country_code"] if "country_code" in frame.columns else country_codes(frame["ticker"])
+    totals = frame["pct"].groupby(codes, sort=False).sum()
+    return [CountryWeight(country_code=code, weight_pct=float(w)) for code, w in totals.items()]
+
+
+def normalize_sector_weights(data: Any, scale: float = 100.0) -> List[SectorWeight]:
+    """Sector weightings from a {sector: weight} dict or a one-column DataFrame."""
+    if isinstance(data, dict):
+        weights = pd.Series(data, dtype=float)
+    elif isinstance(data, pd.DataFrame) and not data.empty and len(data.columns):
+        weights = pd.to_numeric(data.iloc[:, 0], errors="coerce")
+    else:
+        return []
+    weights = (weights.fillna(0.0) * scale).astype(float)
+    return [SectorWeight(sector=str(s), weight_pct=float(w)) for s, w in weights.items()]
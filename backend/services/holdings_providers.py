@@ -0,0 +1,276 @@
+"""
+Holdings Providers
+Sources of complete fund constituent lists, as opposed to the top ~10
+positions yfinance exposes through funds_data.
+
+A provider streams a fund's holdings as normalized DataFrame chunks
+(see holdings_normalizer). ingest_full_holdings() pushes those chunks into
+holdings_staging in batches, keeping only running country/sector totals in
+memory, then swaps the load into holdings in one transaction. Funds loaded
+this way keep their full holdings when yfinance later refreshes the price.
+
+Providers:
+    IssuerFileProvider  CSV/XLSX downloads from ETF issuers in a local
+                        directory, one file per fund named <TICKER>.csv/.xlsx
+"""
+
+import os
+import csv
+import uuid
+import datetime
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from services.db_service import db_service
+from services.fund_cache import fund_cache
+from services.holdings_normalizer import normalize_holdings
+
+HOLDINGS_FILES_DIR = os.environ.get("HOLDINGS_FILES_DIR", "")
+
+# Rows parsed per chunk and rows per staging insert
+HOLDINGS_CHUNK_ROWS = int(os.environ.get("HOLDINGS_CHUNK_ROWS", "2000"))
+HOLDINGS_STAGE_BATCH_SIZE = 1000
+
+# Issuer files start with a few lines of fund metadata; the header row is
+# the first one naming a ticker column within this many lines
+HEADER_SCAN_LINES = 50
+
+TICKER_COLUMNS = ("Ticker", "Symbol", "Holding Ticker", "Ticker Symbol", "Identifier")
+NAME_COLUMNS = ("Name", "Security Name", "Holding Name", "Holdings", "Holding", "Description")
+PCT_COLUMNS = ("Weight (%)", "Weight", "% of Net Assets", "% of Funds", "% of fund", "% Assets",
+               "Market Value Weight", "Percent of Fund")
+LOCATION_COLUMNS = ("Location", "Country", "Location of Risk", "Country of Risk")
+SECTOR_COLUMNS = ("Sector", "GICS Sector")
+
+# Placeholder tickers used by issuers for cash, futures and other non-equity lines
+BLANK_TICKERS = {"", "-", "--", "nan", "n/a", "none"}
+
+
+class HoldingsProvider(ABC):
+    """Interface for full-holdings sources."""
+
+    name = "base"
+
+    @abstractmethod
+    def has_holdings(self, ticker: str) -> bool:
+        """True if the source has a holdings list for this fund."""
+
+    @abstractmethod
+    def iter_holdings(self, ticker: str, chunk_rows: int = HOLDINGS_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """Yield normalized holdings frames (ticker, name, pct, country_code[, sector])."""
+
+    def as_of(self, ticker: str) -> Optional[str]:
+        """Date (YYYY-MM-DD) the holdings refer to, if the source knows it."""
+        return None
+
+
+class IssuerFileProvider(HoldingsProvider):
+    """Reads <directory>/<TICKER>.csv or .xlsx issuer holdings downloads."""
+
+    name = "issuer_file"
+    EXTENSIONS = (".csv", ".xlsx")
+
+    def __init__(self, directory: str = HOLDINGS_FILES_DIR):
+        self.directory = directory
+
+    def tickers(self) -> List[str]:
+        """Every fund with a holdings file in the directory."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        return sorted({
+            os.path.splitext(f)[0].upper()
+            for f in os.listdir(self.directory)
+            if os.path.splitext(f)[1].lower() in self.EXTENSIONS
+        })
+
+    def has_holdings(self, ticker: str) -> bool:
+        return self._find_file(ticker) is not None
+
+    def as_of(self, ticker: str) -> Optional[str]:
+        path = self._find_file(ticker)
+        if not path:
+            return None
+        return datetime.date.fromtimestamp(os.path.getmtime(path)).isoformat()
+
+    def iter_holdings(self, ticker: str, chunk_rows: int = HOLDINGS_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        path = self._find_file(ticker)
+        if not path:
+            raise FileNotFoundError(f"No holdings file for {ticker} in {self.directory}")
+
+        raw_chunks = self._iter_xlsx(path, chunk_rows) if path.lower().endswith(".xlsx") \
+            else self._iter_csv(path, chunk_rows)
+        for raw in raw_chunks:
+            chunk = self._normalize_chunk(raw)
+            if not chunk.empty:
+                yield chunk
+
+    def _find_file(self, ticker: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        for ext in self.EXTENSIONS:
+            for name in (ticker.upper(), ticker.lower()):
+                path = os.path.join(self.directory, name + ext)
+                if os.path.exists(path):
+                    return path
+        return None
+
+    @staticmethod
+    def _is_header(cells: List[str]) -> bool:
+        names = {str(c).strip() for c in cells}
+        return any(c in names for c in TICKER_COLUMNS) and any(c in names for c in PCT_COLUMNS)
+
+    def _iter_csv(self, path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        header_row = 0
+        with open(path, encoding="utf-8-sig", errors="replace") as f:
+            for i, line in enumerate(f):
+                if i >= HEADER_SCAN_LINES:
+                    break
+                if self._is_header(next(csv.reader([line]), [])):
+                    header_row = i
+                    break
+
+        yield from pd.read_csv(
+            path, skiprows=header_row, chunksize=chunk_rows, dtype=str,
+            encoding="utf-8-sig", encoding_errors="replace", on_bad_lines="skip",
+            skip_blank_lines=True,
+        )
+
+    def _iter_xlsx(self, path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise RuntimeError("Reading .xlsx holdings files requires openpyxl (pip install openpyxl)")
+
+        # read_only streams rows from the sheet XML instead of loading the workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = None
+            for i, row in enumerate(rows):
+                if i >= HEADER_SCAN_LINES:
+                    break
+                if self._is_header(list(row)):
+                    header = [str(c).strip() if c is not None else f"col{j}" for j, c in enumerate(row)]
+                    break
+            if header is None:
+                return
+
+            buffer = []
+            for row in rows:
+                buffer.append(row[:len(header)])
+                if len(buffer) >= chunk_rows:
+                    yield pd.DataFrame(buffer, columns=header, dtype=str)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=header, dtype=str)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _normalize_chunk(raw: pd.DataFrame) -> pd.DataFrame:
+        raw = raw.rename(columns=lambda c: str(c).strip())
+        ticker_column = next((c for c in TICKER_COLUMNS if c in raw.columns), None)
+        pct_column = next((c for c in PCT_COLUMNS if c in raw.columns), None)
+        if not ticker_column or not pct_column:
+            return pd.DataFrame()
+
+        # Weights arrive as text such as "6.52", "6.52%" or "1,234.5"; footer
+        # lines (disclaimers, totals) do not parse and are dropped
+        raw[pct_column] = pd.to_numeric(
+            raw[pct_column].astype(str).str.replace(r"[%,\s]", "", regex=True), errors="coerce"
+        )
+        raw = raw[raw[pct_column].notna()].copy()
+
+        # Cash and derivative lines often have no ticker; key them by name
+        tickers = raw[ticker_column].astype(str).str.strip()
+        blank = tickers.str.lower().isin(BLANK_TICKERS)
+        name_column = next((c for c in NAME_COLUMNS if c in raw.columns), None)
+        if name_column:
+            tickers = tickers.mask(blank, raw[name_column].astype(str).str.strip())
+        raw[ticker_column] = tickers
+        raw = raw[~raw[ticker_column].str.lower().isin(BLANK_TICKERS)]
+
+        return normalize_holdings(
+            raw,
+            ticker_column=ticker_column,
+            name_columns=NAME_COLUMNS,
+            pct_columns=(pct_column,),
+            pct_scale=1.0,  # Issuer files publish percentages
+            location_columns=LOCATION_COLUMNS,
+            sector_columns=SECTOR_COLUMNS,
+        )
+
+
+def get_holdings_provider(ticker: str) -> Optional[HoldingsProvider]:
+    """First configured provider that has full holdings for the ticker."""
+    for provider in _providers():
+        if provider.has_holdings(ticker):
+            return provider
+    return None
+
+
+def _providers() -> List[HoldingsProvider]:
+    providers: List[HoldingsProvider] = []
+    if HOLDINGS_FILES_DIR:
+        providers.append(IssuerFileProvider(HOLDINGS_FILES_DIR))
+    return providers
+
+
+def ingest_full_holdings(ticker: str, provider: HoldingsProvider,
+                         chunk_rows: int = HOLDINGS_CHUNK_ROWS,
+                         batch_size: int = HOLDINGS_STAGE_BATCH_SIZE,
+                         dry_run: bool = False) -> Dict[str, object]:
+    """
+    Stream a fund's full holdings from `provider` into the holdings table.
+    Memory stays bounded by one chunk plus the per-country/sector totals.
+    Returns a summary: rows, countries, sectors, and the RPC result.
+    """
+    ticker = ticker.upper()
+    load_id = str(uuid.uuid4())
+    country_totals: Dict[str, float] = defaultdict(float)
+    sector_totals: Dict[str, float] = defaultdict(float)
+    has_sectors = False
+    rows = 0
+
+    try:
+        for chunk in provider.iter_holdings(ticker, chunk_rows=chunk_rows):
+            rows += len(chunk)
+            for code, weight in chunk.groupby("country_code", sort=False)["pct"].sum().items():
+                country_totals[code] += float(weight)
+            if "sector" in chunk.columns:
+                has_sectors = True
+                for sector, weight in chunk.groupby("sector", sort=False)["pct"].sum().items():
+                    if sector and sector.lower() not in BLANK_TICKERS:
+                        sector_totals[sector] += float(weight)
+
+            if not dry_run:
+                records = chunk[["ticker", "name", "pct", "country_code"]].round({"pct": 4})
+                db_service.stage_holdings(load_id, records.to_dict("records"), batch_size)
+
+        summary: Dict[str, object] = {
+            "ticker": ticker,
+            "source": provider.name,
+            "rows": rows,
+            "countries": len(country_totals),
+            "sectors": len(sector_totals),
+        }
+        if dry_run or not rows:
+            return summary
+
+        result = db_service.apply_holdings_load(
+            ticker, load_id, provider.name, provider.as_of(ticker),
+            country_weights=[{"country_code": c, "weight_pct": round(w, 4)} for c, w in country_totals.items()],
+            sector_weights=[{"sector": s, "weight_pct": round(w, 4)} for s, w in sector_totals.items()]
+            if has_sectors else None,
+        )
+        # This process only; web workers notice holdings_loaded_at on their next poll
+        fund_cache.invalidate(ticker)
+        summary["result"] = result
+        return summary
+    except Exception:
+        if not dry_run:
+            db_service.discard_holdings_load(load_id)
+        raise
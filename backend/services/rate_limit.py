@@ -0,0 +1,66 @@
+"""
+Rate Limiting
+Token buckets shared by the workers of a job so that a pool of threads
+(TokenBucket) or coroutines (AsyncTokenBucket) stays inside an upstream
+requests-per-second budget.
+"""
+
+import time
+import asyncio
+import threading
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens are added per second up to `capacity`.
+    acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AsyncTokenBucket:
+    """
+    asyncio counterpart of TokenBucket. acquire() suspends the calling
+    coroutine instead of blocking a thread; waiters are served in order.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0):
+        # Holding the lock while sleeping keeps waiters FIFO
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
@@ -0,0 +1,350 @@
+"""
+Screening Engine
+Compound fund screens over holdings, country and sector exposure, evaluated
+against an in-memory columnar snapshot with numpy.
+
+A screen is a predicate tree:
+
+    {"all": [
+        {"type": "country", "key": "Japan", "min": 20},
+        {"type": "sector", "key": "Technology", "max": 5},
+        {"any": [{"type": "holding", "key": "NVDA", "min": 3},
+                 {"type": "holding", "key": "AMD", "min": 3}]}
+    ]}
+
+Leaves compare a fund's weight (percent, 0 when it has no exposure) against
+min and/or max. A max only matches funds with data for that dimension: a
+fund with no sector rows is unknown, not "0% Technology". Each dimension is
+stored in long format sorted by key, so a leaf becomes one dense weight
+vector over all funds and a vectorized comparison; AND/OR are boolean mask
+operations.
+
+Fund exposures are loaded from Supabase in the background and kept current
+through DBService upsert listeners. The same load feeds the holdings
+inverted index behind /api/screen, so each worker reads the holdings table
+once. After funds change, the arrays are rebuilt in the background (at most
+every SCREEN_REBUILD_MIN_SECONDS) while screens keep reading the previous
+snapshot.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.schemas import FundResponse
+from services.country_mapper import get_country_code_for_location
+from services.db_service import db_service
+from services.holdings_index import holdings_index
+
+SCREEN_SNAPSHOT_REFRESH_SECONDS = float(os.environ.get("SCREEN_SNAPSHOT_REFRESH_SECONDS", "900"))
+SCREEN_REBUILD_MIN_SECONDS = float(os.environ.get("SCREEN_REBUILD_MIN_SECONDS", "5"))
+
+DIMENSIONS = ("holding", "country", "sector")
+MAX_PREDICATE_LEAVES = 20
+MAX_PAGE_SIZE = 100
+
+
+class ScreenError(ValueError):
+    """Invalid screen request (bad predicate, sort or paging)."""
+
+
+class _Dimension:
+    """Long-format (fund, key, weight) rows grouped by key, with key -> row range."""
+
+    def __init__(self, fund_idx: List[int], keys: List[str], weights: List[float], n_funds: int):
+        # Funds with at least one row in this dimension
+        self.present = np.zeros(n_funds, dtype=bool)
+        self.present[np.asarray(fund_idx, dtype=np.int64)] = True
+        codes, uniques = pd.factorize(pd.Series(keys, dtype=object))
+        order = np.argsort(codes, kind="stable")
+        self.fund_idx = np.asarray(fund_idx, dtype=np.int32)[order]
+        self.weights = np.asarray(weights, dtype=np.float64)[order]
+        ends = np.cumsum(np.bincount(codes, minlength=len(uniques)))
+        starts = ends - np.bincount(codes, minlength=len(uniques))
+        self.ranges: Dict[str, Tuple[int, int]] = dict(zip(uniques, zip(starts.tolist(), ends.tolist())))
+
+    def vector(self, key: str, n_funds: int) -> np.ndarray:
+        """Dense weight per fund for one key (0 where the fund has no exposure)."""
+        dense = np.zeros(n_funds, dtype=np.float64)
+        bounds = self.ranges.get(key)
+        if bounds:
+            start, end = bounds
+            dense[self.fund_idx[start:end]] = self.weights[start:end]
+        return dense
+
+
+class ExposureSnapshot:
+    """Immutable columnar view of every fund's exposures."""
+
+    def __init__(self, funds: Dict[str, Dict[str, Any]]):
+        self.tickers = sorted(funds)
+        self.names = [funds[t]["name"] for t in self.tickers]
+        self.n_funds = len(self.tickers)
+        self.dimensions: Dict[str, _Dimension] = {}
+        for dim in DIMENSIONS:
+            fund_idx, keys, weights = [], [], []
+            for i, ticker in enumerate(self.tickers):
+                exposures = funds[ticker][dim]
+                fund_idx.extend([i] * len(exposures))
+                keys.extend(exposures.keys())
+                weights.extend(exposures.values())
+            self.dimensions[dim] = _Dimension(fund_idx, keys, weights, self.n_funds)
+        self.built_at = time.time()
+
+    def evaluate(self, node: Dict[str, Any]) -> np.ndarray:
+        if "all" in node or "any" in node:
+            combine = np.logical_and if "all" in node else np.logical_or
+            children = node.get("all", node.get("any"))
+            mask = np.full(self.n_funds, "all" in node)
+            for child in children:
+                mask = combine(mask, self.evaluate(child))
+            return mask
+
+        dimension = self.dimensions[node["type"]]
+        weights = dimension.vector(node["key"], self.n_funds)
+        mask = np.ones(self.n_funds, dtype=bool)
+        if node.get("min") is not None:
+            mask &= weights >= node["min"]
+        if node.get("max") is not None:
+            mask &= (weights <= node["max"]) & dimension.present
+        return mask
+
+
+class ScreeningEngine:
+    """Maintains the exposure snapshot and runs screens against it."""
+
+    def __init__(self, refresh_seconds: float = SCREEN_SNAPSHOT_REFRESH_SECONDS,
+                 rebuild_min_seconds: float = SCREEN_REBUILD_MIN_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_min_seconds = rebuild_min_seconds
+        self._funds: Dict[str, Dict[str, Any]] = {}
+        self._snapshot: Optional[ExposureSnapshot] = None
+        self._dirty = False
+        self._rebuilding = False
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    def start(self):
+        """Load in a daemon thread and keep reloading every refresh_seconds."""
+        if self._thread or not db_service.supabase:
+            return
+        db_service.add_upsert_listener(self.on_fund_written)
+        self._thread = threading.Thread(target=self._run, name="screening-snapshot", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Error loading screening snapshot: {e}")
+            time.sleep(self.refresh_seconds)
+
+    def reload(self):
+        """Rebuild every fund's exposures from the database."""
+        started = time.monotonic()
+        funds: Dict[str, Dict[str, Any]] = {}
+
+        def fund_entry(row):
+            return funds.setdefault(row["fund_ticker"], {
+                "name": row["fund_name"], "holding": {}, "country": {}, "sector": {},
+            })
+
+        for row in db_service.iter_holdings_for_index():
+            fund_entry(row)["holding"][row["ticker"]] = float(row["pct"])
+        for row in db_service.iter_fund_weights("country_weights", "country_code"):
+            fund_entry(row)["country"][row["country_code"]] = float(row["weight_pct"])
+        for row in db_service.iter_fund_weights("sector_weights", "sector"):
+            fund_entry(row)["sector"][sector_key(row["sector"])] = float(row["weight_pct"])
+
+        snapshot = ExposureSnapshot(funds)
+        with self._lock:
+            self._funds = funds
+            self._snapshot = snapshot
+            self._dirty = False
+        holdings_index.load(
+            {ticker: fund["holding"] for ticker, fund in funds.items()},
+            {ticker: fund["name"] for ticker, fund in funds.items()},
+        )
+        print(f"Screening snapshot loaded: {snapshot.n_funds} funds "
+              f"in {time.monotonic() - started:.1f}s")
+
+    def on_fund_written(self, ticker: str, data: Optional[FundResponse]):
+        """DBService listener: replace one fund's exposures; arrays rebuild lazily."""
+        if not self.ready:
+            return
+        if data is None or data.partial:
+            data = db_service.get_fund(ticker)
+        if data is None:
+            return
+        self.update_fund(ticker, data)
+
+    def update_fund(self, ticker: str, data: FundResponse):
+        with self._lock:
+            self._funds[ticker] = {
+                "name": data.fund.name,
+                "holding": {h.ticker: float(h.pct) for h in data.holdings},
+                "country": {c.country_code: float(c.weight_pct) for c in data.country_weights},
+                "sector": {sector_key(s.sector): float(s.weight_pct) for s in data.sector_weights},
+            }
+            self._dirty = True
+
+    def snapshot(self) -> Optional[ExposureSnapshot]:
+        """Current snapshot; kicks off a background rebuild if funds changed since it was built."""
+        with self._lock:
+            snapshot = self._snapshot
+            if (snapshot is not None and self._dirty and not self._rebuilding
+                    and time.time() - snapshot.built_at >= self.rebuild_min_seconds):
+                self._rebuilding = True
+                threading.Thread(target=self._rebuild, name="screening-rebuild", daemon=True).start()
+            return snapshot
+
+    def _rebuild(self):
+        try:
+            with self._lock:
+                funds = dict(self._funds)
+                self._dirty = False
+            snapshot = ExposureSnapshot(funds)
+            with self._lock:
+                self._snapshot = snapshot
+        except Exception as e:
+            print(f"Error rebuilding screening snapshot: {e}")
+        finally:
+            self._rebuilding = False
+
+    def screen(self, predicate: Dict[str, Any], sort: Dict[str, Any] = None,
+               page: int = 1, page_size: int = 20) -> Dict[str, Any]:
+        """
+        Run a screen. Results are ranked by `sort` ({"type", "key", "order"}),
+        defaulting to the first leaf with a minimum, then by ticker.
+        """
+        snapshot = self.snapshot()
+        if snapshot is None:
+            raise RuntimeError("Screening snapshot is not loaded yet")
+
+        predicate = normalize_predicate(predicate)
+        leaves = _leaves(predicate)
+        if sort:
+            if not isinstance(sort, dict):
+                raise ScreenError("sort must be an object")
+            sort_leaf = normalize_predicate({"type": sort.get("type"), "key": sort.get("key")})
+            sort = {"type": sort_leaf["type"], "key": sort_leaf["key"], "order": sort.get("order", "desc")}
+        else:
+            ranked = next((leaf for leaf in leaves if leaf.get("min") is not None), leaves[0])
+            sort = {"type": ranked["type"], "key": ranked["key"], "order": "desc"}
+        if sort["order"] not in ("asc", "desc"):
+            raise ScreenError("sort.order must be 'asc' or 'desc'")
+        if page < 1 or not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ScreenError(f"page must be >= 1 and page_size between 1 and {MAX_PAGE_SIZE}")
+
+        started = time.perf_counter()
+        mask = snapshot.evaluate(predicate)
+        matched = np.flatnonzero(mask)
+
+        sort_weights = snapshot.dimensions[sort["type"]].vector(sort["key"], snapshot.n_funds)[matched]
+        # Tickers are sorted, so the fund index is the tie-breaker
+        order = np.lexsort((matched, -sort_weights if sort["order"] == "desc" else sort_weights))
+        page_idx = matched[order][(page - 1) * page_size: page * page_size]
+
+        vectors = {
+            (leaf["type"], leaf["key"]): snapshot.dimensions[leaf["type"]].vector(leaf["key"], snapshot.n_funds)
+            for leaf in leaves
+        }
+        results = [
+            {
+                "fund_ticker": snapshot.tickers[i],
+                "fund_name": snapshot.names[i],
+                "exposures": {
+                    f"{dim}:{key}": round(float(vector[i]), 4) for (dim, key), vector in vectors.items()
+                },
+            }
+            for i in page_idx
+        ]
+
+        return {
+            "results": results,
+            "total": int(len(matched)),
+            "page": page,
+            "page_size": page_size,
+            "sort": sort,
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+            "snapshot_funds": snapshot.n_funds,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "ready": snapshot is not None,
+            "funds": snapshot.n_funds if snapshot else 0,
+            "built_at": snapshot.built_at if snapshot else None,
+            "dirty": self._dirty,
+        }
+
+
+def sector_key(sector: str) -> str:
+    """Case/spacing-insensitive sector key ("Real Estate" and "realestate" match yfinance's "realestate")."""
+    return "".join(ch for ch in str(sector).lower() if ch.isalnum())
+
+
+def normalize_predicate(node: Any, _leaves_seen: List[int] = None) -> Dict[str, Any]:
+    """Validate a predicate tree and canonicalize leaf keys. Raises ScreenError."""
+    leaves_seen = _leaves_seen if _leaves_seen is not None else [0]
+    if not isinstance(node, dict):
+        raise ScreenError("Each predicate must be an object")
+
+    for combinator in ("all", "any"):
+        if combinator in node:
+            children = node[combinator]
+            if not isinstance(children, list) or not children:
+                raise ScreenError(f"'{combinator}' needs a non-empty list of predicates")
+            return {combinator: [normalize_predicate(c, leaves_seen) for c in children]}
+
+    leaves_seen[0] += 1
+    if leaves_seen[0] > MAX_PREDICATE_LEAVES:
+        raise ScreenError(f"At most {MAX_PREDICATE_LEAVES} conditions per screen")
+
+    dim = node.get("type")
+    if dim not in DIMENSIONS:
+        raise ScreenError(f"type must be one of {', '.join(DIMENSIONS)}")
+    key = str(node.get("key") or "").strip()
+    if not key:
+        raise ScreenError(f"Missing key for {dim} condition")
+    if dim == "holding":
+        key = key.upper()
+    elif dim == "sector":
+        key = sector_key(key)
+    elif dim == "country" and not key.isdigit():
+        code = get_country_code_for_location(key)
+        if not code:
+            raise ScreenError(f"Unknown country '{key}'")
+        key = code
+
+    bounds = {}
+    for bound in ("min", "max"):
+        value = node.get(bound)
+        if value is None:
+            bounds[bound] = None
+            continue
+        try:
+            bounds[bound] = float(value)
+        except (TypeError, ValueError):
+            raise ScreenError(f"{bound} for {dim} {key} must be a number")
+    return {"type": dim, "key": key, **bounds}
+
+
+def _leaves(node: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if "all" in node or "any" in node:
+        return [leaf for child in node.get("all", node.get("any")) for leaf in _leaves(child)]
+    return [node]
+
+
+# Module-level singleton
+screening_engine = ScreeningEngine()
@@ -0,0 +1,280 @@
+"""
+Async SEC Open Data API Service
+asyncio variant of SECService for fan-out workloads (bulk imports, batch
+refreshes). One pooled httpx.AsyncClient is shared by every call, all
+requests go through a shared AsyncTokenBucket, and 429 / 5xx responses are
+retried with jittered exponential backoff (honouring Retry-After).
+
+The method surface mirrors SECService, with coroutines instead of blocking calls:
+
+    async with AsyncSECService() as sec:
+        profiles = await sec.get_all_fund_profiles()
+        async for proj_id, top5 in sec.map_funds(sec.get_top5_holdings, proj_ids):
+            ...
+"""
+
+import os
+import random
+import asyncio
+from typing import Optional, List, Dict, Any, AsyncIterator, Awaitable, Callable, Iterable, Tuple
+
+import httpx
+
+from services.rate_limit import AsyncTokenBucket
+from services.sec_service import (
+    SECService,
+    SEC_API_BASE_URL,
+    SEC_API_KEY,
+    SEC_API_REQUESTS_PER_SECOND,
+    SEC_API_MAX_WORKERS,
+)
+
+SEC_API_MAX_RETRIES = int(os.environ.get("SEC_API_MAX_RETRIES", "3"))
+SEC_API_TIMEOUT_SECONDS = float(os.environ.get("SEC_API_TIMEOUT_SECONDS", "30"))
+
+# Backoff for retried requests: base * 2^attempt with full jitter, capped
+RETRY_BACKOFF_BASE_SECONDS = 0.5
+RETRY_BACKOFF_MAX_SECONDS = 30.0
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Seconds to wait before retry number `attempt` (0-based)."""
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+    ceiling = min(RETRY_BACKOFF_MAX_SECONDS, RETRY_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+class AsyncSECService:
+    """Pooled asyncio client for the SEC Thailand Open Data API."""
+
+    def __init__(self, api_key: str = None, base_url: str = None,
+                 requests_per_second: float = None,
+                 max_connections: int = SEC_API_MAX_WORKERS,
+                 max_retries: int = SEC_API_MAX_RETRIES):
+        self.api_key = api_key or SEC_API_KEY
+        self.base_url = (base_url or SEC_API_BASE_URL).rstrip("/")
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self._limiter = AsyncTokenBucket(requests_per_second or SEC_API_REQUESTS_PER_SECOND, capacity=1)
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                "Ocp-Apim-Subscription-Key": self.api_key,
+                "Content-Type": "application/json",
+                "Cache-Control": "no-cache",
+            },
+            timeout=SEC_API_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+        )
+
+    async def __aenter__(self) -> "AsyncSECService":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def _get(self, path: str, params: dict = None) -> dict:
+        """Make a rate-limited GET request, retrying 429 / 5xx / transport errors."""
+        for attempt in range(self.max_retries + 1):
+            await self._limiter.acquire()
+            try:
+                resp = await self._client.get(path, params=params)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    print(f"SEC API request error: {e} — URL: {self.base_url}{path}")
+                    raise
+                await asyncio.sleep(retry_delay(attempt))
+                continue
+
+            if resp.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                delay = retry_delay(attempt, resp.headers.get("Retry-After"))
+                print(f"SEC API {resp.status_code} for {path}, retrying in {delay:.1f}s "
+                      f"({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+                continue
+
+            try:
+                resp.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                print(f"SEC API HTTP error: {e} — URL: {resp.url}")
+                raise
+            return resp.json()
+
+    async def _get_items(self, path: str, params: dict = None) -> tuple:
+        """
+        GET and unpack the standard SEC response format.
+        Returns: (items_list, total_pages, total_items)
+        """
+        data = await self._get(path, params)
+        if isinstance(data, dict):
+            items = data.get("items", [])
+            total_pages = data.get("total_pages", 1)
+            total_items = data.get("total_items", len(items))
+            return items, total_pages, total_items
+        return data if isinstance(data, list) else [], 1, 0
+
+    async def _get_all_items(self, path: str, params: dict = None) -> List[Dict[str, Any]]:
+        """Fetch page 1 to learn total_pages, then the remaining pages concurrently."""
+        params = dict(params or {})
+        items, total_pages, _ = await self._get_items(path, {**params, "current_page": 1})
+        if not items or (total_pages or 1) <= 1:
+            return items
+
+        pages = await asyncio.gather(*(
+            self._get_items(path, {**params, "current_page": page})
+            for page in range(2, total_pages + 1)
+        ))
+        for page_items, _, _ in pages:
+            items.extend(page_items)
+        return items
+
+    async def map_funds(self, fetch: Callable[[str], Awaitable[Any]], proj_ids: Iterable[str],
+                        concurrency: int = None) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Run `fetch(proj_id)` for many funds with at most `concurrency` in flight,
+        yielding (proj_id, result) as each completes. A failed fetch yields the
+        exception as its result so one bad fund does not abort the batch.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.max_connections)
+
+        async def run(proj_id: str):
+            async with semaphore:
+                try:
+                    return proj_id, await fetch(proj_id)
+                except Exception as e:
+                    return proj_id, e
+
+        for next_done in asyncio.as_completed([run(pid) for pid in proj_ids]):
+            yield await next_done
+
+    # ─── AMC (Asset Management Companies) ───────────────────────────
+
+    async def get_amc_list(self, page: int = 1) -> List[Dict[str, Any]]:
+        """Get list of all AMCs (บลจ.)."""
+        items, _, _ = await self._get_items("/v1/fund/general-info/amcs", {"current_page": page})
+        return items
+
+    # ─── Fund Profiles ──────────────────────────────────────────────
+
+    async def get_fund_profiles(self, page: int = 1, search: str = None) -> Dict[str, Any]:
+        """Get one page of fund profiles (raw response, including paging fields)."""
+        params = {"current_page": page}
+        if search:
+            params["search"] = search
+        return await self._get("/v1/fund/general-info/profiles", params)
+
+    async def get_all_fund_profiles(self, max_pages: int = None) -> List[Dict[str, Any]]:
+        """Fetch every fund profile, all pages after the first in parallel."""
+        first = await self.get_fund_profiles(page=1)
+        if not isinstance(first, dict):
+            return first if isinstance(first, list) else []
+
+        all_funds = list(first.get("items", []) or [])
+        total_pages = first.get("total_pages", 1) or 1
+        last_page = min(total_pages, max_pages) if max_pages else total_pages
+
+        pages = await asyncio.gather(*(
+            self.get_fund_profiles(page=page) for page in range(2, last_page + 1)
+        ))
+        for data in pages:
+            if isinstance(data, dict):
+                all_funds.extend(data.get("items", []) or [])
+        print(f"  Total funds fetched: {len(all_funds)}")
+        return all_funds
+
+    # ─── Special Fund Types ─────────────────────────────────────────
+
+    async def get_special_fund_types(self, page: int = 1, search: str = None) -> List[Dict[str, Any]]:
+        """Get special fund type flags (feeder, FIF, LTF, RMF, etc.)."""
+        params = {"current_page": page}
+        if search:
+            params["search"] = search
+        items, _, _ = await self._get_items("/v1/fund/general-info/specifications", params)
+        return items
+
+    # ─── Fund Holdings ──────────────────────────────────────────────
+
+    async def get_top5_holdings(self, proj_id: str, start_date: str = None,
+                                end_date: str = None, page: int = 1) -> List[Dict[str, Any]]:
+        """Get top 5 holdings for a fund."""
+        params = {"proj_id": proj_id, "current_page": page}
+        if start_date:
+            params["start_date"] = start_date
+        if end_date:
+            params["end_date"] = end_date
+        items, _, _ = await self._get_items("/v1/fund/factsheet/top5-holdings", params)
+        return items
+
+    async def get_quarterly_portfolio(self, proj_id: str, start_period: str = None,
+                                      end_period: str = None, page: int = 1) -> List[Dict[str, Any]]:
+        """Get one page of quarterly portfolio holdings (periods in YYYYMM format)."""
+        params = {"proj_id": proj_id, "current_page": page}
+        if start_period:
+            params["period_start"] = start_period
+        if end_period:
+            params["period_end"] = end_period
+        items, _, _ = await self._get_items("/v1/fund/outstanding/portfolio", params)
+        return items
+
+    async def get_all_quarterly_portfolio(self, proj_id: str, start_period: str = None,
+                                          end_period: str = None) -> List[Dict[str, Any]]:
+        """Get quarterly portfolio holdings across every page."""
+        params = {"proj_id": proj_id}
+        if start_period:
+            params["period_start"] = start_period
+        if end_period:
+            params["period_end"] = end_period
+        return await self._get_all_items("/v1/fund/outstanding/portfolio", params)
+
+    # ─── NAV Data ───────────────────────────────────────────────────
+
+    async def get_daily_nav(self, proj_id: str, begin_date: str = None,
+                            end_date: str = None, page: int = 1) -> List[Dict[str, Any]]:
+        """Get one page of daily NAV data (dates in YYYY-MM-DD format)."""
+        params = {"proj_id": proj_id, "current_page": page}
+        if begin_date:
+            params["start_date"] = begin_date
+        if end_date:
+            params["end_date"] = end_date
+        items, _, _ = await self._get_items("/v1/fund/daily-info/nav", params)
+        return items
+
+    async def get_all_daily_nav(self, proj_id: str, begin_date: str = None,
+                                end_date: str = None) -> List[Dict[str, Any]]:
+        """Get daily NAV data across every page."""
+        params = {"proj_id": proj_id}
+        if begin_date:
+            params["start_date"] = begin_date
+        if end_date:
+            params["end_date"] = end_date
+        return await self._get_all_items("/v1/fund/daily-info/nav", params)
+
+    # ─── Asset Allocation / Risk ────────────────────────────────────
+
+    async def get_asset_allocation(self, proj_id: str, page: int = 1) -> List[Dict[str, Any]]:
+        """Get monthly asset allocation breakdown."""
+        items, _, _ = await self._get_items(
+            "/v1/fund/factsheet/asset-allocation", {"proj_id": proj_id, "current_page": page}
+        )
+        return items
+
+    async def get_risk_spectrum(self, proj_id: str, page: int = 1) -> List[Dict[str, Any]]:
+        """Get fund risk spectrum data."""
+        items, _, _ = await self._get_items(
+            "/v1/fund/factsheet/risk-spectrum", {"proj_id": proj_id, "current_page": page}
+        )
+        return items
+
+    # ─── Feeder Fund Helpers ────────────────────────────────────────
+
+    is_feeder_fund = staticmethod(SECService.is_feeder_fund)
+    extract_master_fund_name = staticmethod(SECService.extract_master_fund_name)
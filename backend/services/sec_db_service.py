@@ -5,15 +5,23 @@ Handles Supabase CRUD operations for Thai fund data (from SEC Open Data API).
 
 import os
 import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from services.db_service import parse_timestamp
+from services.view_counter import ViewCounterBuffer
 
 load_dotenv()
 
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
 
+# Rows per bulk upsert request
+DEFAULT_BATCH_SIZE = 500
+
+# PostgREST caps a response at 1000 rows; full-table reads page through in chunks of this size
+READ_PAGE_SIZE = 1000
+
 
 class SECDBService:
     """Database operations for Thai fund data."""
@@ -25,6 +33,8 @@ class SECDBService:
         else:
             self.supabase = None
             print("SEC DB Service: Missing Supabase credentials")
+        # View counts are aggregated in memory and written in batches
+        self.fund_views = ViewCounterBuffer(self._flush_fund_views, name="thai fund views")
 
     # ─── Thai Funds ─────────────────────────────────────────────────
 
@@ -41,6 +51,37 @@ class SECDBService:
             print(f"Error upserting thai_fund {record.get('proj_id')}: {e}")
             return False
 
+    def upsert_thai_funds(self, records: List[Dict[str, Any]],
+                          batch_size: int = DEFAULT_BATCH_SIZE,
+                          failed: Optional[Set[str]] = None) -> int:
+        """
+        Bulk insert or update Thai fund records. Returns the number of rows
+        written; proj_ids of rows that could not be written are added to `failed`.
+        """
+        return self._bulk_upsert("thai_funds", records, "proj_id", batch_size, failed)
+
+    def set_thai_fund_hashes(self, hashes: Dict[str, str],
+                             batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """Store content_hash for funds whose profile writes all succeeded."""
+        records = [{"proj_id": proj_id, "content_hash": h} for proj_id, h in hashes.items()]
+        return self._bulk_upsert("thai_funds", records, "proj_id", batch_size)
+
+    def get_thai_fund_hashes(self) -> Dict[str, str]:
+        """Map every proj_id to its stored content_hash (for incremental sync). Raises on failure."""
+        if not self.supabase:
+            return {}
+        hashes = {}
+        for row in self._select_all("thai_funds", "proj_id, content_hash", order="proj_id"):
+            if row.get("content_hash"):
+                hashes[row["proj_id"]] = row["content_hash"]
+        return hashes
+
+    def get_all_proj_ids(self) -> List[str]:
+        """Every Thai fund project ID in the catalog. Raises on failure."""
+        if not self.supabase:
+            return []
+        return [row["proj_id"] for row in self._select_all("thai_funds", "proj_id", order="proj_id")]
+
     def get_thai_fund(self, proj_id: str) -> Optional[Dict[str, Any]]:
         """Get a Thai fund by project ID."""
         if not self.supabase:
@@ -53,17 +94,16 @@ class SECDBService:
                 .execute()
             )
             if result.data and len(result.data) > 0:
-                # Increment view count asynchronously
-                try:
-                    self.supabase.rpc('increment_thai_fund_view', {'p_proj_id': proj_id}).execute()
-                except Exception as e:
-                    print(f"Failed to increment view for thai fund {proj_id}: {e}")
+                self.fund_views.record(proj_id)
                 return result.data[0]
             return None
         except Exception as e:
             print(f"Error getting thai_fund {proj_id}: {e}")
             return None
 
+    def _flush_fund_views(self, counts: Dict[str, int]):
+        self.supabase.rpc("increment_thai_fund_views", {"p_counts": counts}).execute()
+
     def get_feeder_funds(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Get all feeder funds."""
         if not self.supabase:
@@ -83,30 +123,46 @@ class SECDBService:
             return []
 
     def search_thai_funds(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Search Thai funds by name or abbreviation."""
+        """
+        Ranked search over abbreviation, project ID, English/Thai names and AMC
+        (search_thai_funds_ranked RPC, trigram indexed). Best match first;
+        each row carries a relevance score.
+        """
+        query = (query or "").strip()
         if not self.supabase or not query:
             return []
         try:
-            result = (
-                self.supabase.table("thai_funds")
-                .select("proj_id, proj_name_th, proj_name_en, proj_abbr_name, "
-                        "is_feeder_fund, feederfund_master_fund, master_fund_ticker, "
-                        "amc_name_en, fund_type, risk_level")
-                .or_(
-                    f"proj_name_en.ilike.%{query}%,"
-                    f"proj_name_th.ilike.%{query}%,"
-                    f"proj_abbr_name.ilike.%{query}%,"
-                    f"proj_id.ilike.%{query}%,"
-                    f"amc_name_en.ilike.%{query}%"
-                )
-                .limit(limit)
-                .execute()
-            )
+            result = self.supabase.rpc("search_thai_funds_ranked", {
+                "p_query": query,
+                "p_limit": limit,
+            }).execute()
             return result.data or []
         except Exception as e:
             print(f"Error searching thai funds: {e}")
             return []
 
+    def get_thai_funds_for_search(self, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Fields the typeahead index needs for every Thai fund, or only funds
+        updated after `since` (ISO timestamp). Raises on failure.
+        """
+        if not self.supabase:
+            return []
+        rows = []
+        start = 0
+        while True:
+            query = self.supabase.table("thai_funds").select(
+                "proj_id, proj_abbr_name, proj_name_en, proj_name_th, is_feeder_fund, "
+                "feederfund_master_fund, master_fund_ticker, view_count, updated_at"
+            )
+            if since:
+                query = query.gt("updated_at", since)
+            page = query.order("proj_id").range(start, start + READ_PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < READ_PAGE_SIZE:
+                return rows
+            start += READ_PAGE_SIZE
+
     # ─── AMC List ─────────────────────────────────────────────────
 
     def get_distinct_amcs(self) -> List[str]:
@@ -141,19 +197,23 @@ class SECDBService:
         if not self.supabase:
             return False
         try:
-            # Delete existing record first (no unique constraint on table)
-            proj_id = record.get("thai_fund_proj_id")
-            if proj_id:
-                self.supabase.table("feeder_master_mapping").delete().eq(
-                    "thai_fund_proj_id", proj_id
-                ).execute()
-            # Then insert new
-            self.supabase.table("feeder_master_mapping").insert(record).execute()
+            self.supabase.table("feeder_master_mapping").upsert(
+                record, on_conflict="thai_fund_proj_id"
+            ).execute()
             return True
         except Exception as e:
             print(f"Error upserting feeder mapping: {e}")
             return False
 
+    def upsert_feeder_mappings(self, records: List[Dict[str, Any]],
+                               batch_size: int = DEFAULT_BATCH_SIZE,
+                               failed: Optional[Set[str]] = None) -> int:
+        """
+        Bulk insert or update feeder mappings. Returns the number of rows
+        written; proj_ids of rows that could not be written are added to `failed`.
+        """
+        return self._bulk_upsert("feeder_master_mapping", records, "thai_fund_proj_id", batch_size, failed)
+
     def get_feeder_mapping(self, proj_id: str) -> Optional[Dict[str, Any]]:
         """Get the feeder-to-master mapping for a fund."""
         if not self.supabase:
@@ -185,6 +245,36 @@ class SECDBService:
             print(f"Error inserting thai_fund_holding: {e}")
             return False
 
+    def replace_thai_fund_holdings(self, proj_id: str, period: str,
+                                   records: List[Dict[str, Any]],
+                                   batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        Make the stored holdings for (proj_id, period) match records.
+        Rows are upserted on (thai_fund_proj_id, period, holding_key) in
+        batches, then holdings that are no longer reported are deleted,
+        so re-running an import never duplicates rows.
+        Returns the number of rows upserted.
+        """
+        if not self.supabase:
+            return 0
+        written = self._bulk_upsert(
+            "thai_fund_holdings", records, "thai_fund_proj_id,period,holding_key", batch_size
+        )
+        try:
+            query = (
+                self.supabase.table("thai_fund_holdings")
+                .delete()
+                .eq("thai_fund_proj_id", proj_id)
+                .eq("period", period)
+            )
+            keys = [r["holding_key"] for r in records]
+            if keys:
+                query = query.not_.in_("holding_key", keys)
+            query.execute()
+        except Exception as e:
+            print(f"Error pruning thai_fund_holdings {proj_id} {period}: {e}")
+        return written
+
     def get_thai_fund_holdings(
         self, proj_id: str, period: str = None
     ) -> List[Dict[str, Any]]:
@@ -207,5 +297,223 @@ class SECDBService:
             return []
 
 
+    # ─── Thai Fund Top 5 Holdings ───────────────────────────────────
+
+    def get_thai_fund_top5(self, proj_id: str) -> Optional[Dict[str, Any]]:
+        """Get the persisted top-5 holdings row for a fund."""
+        if not self.supabase:
+            return None
+        try:
+            result = (
+                self.supabase.table("thai_fund_top5")
+                .select("proj_id, as_of, holdings, fetched_at")
+                .eq("proj_id", proj_id)
+                .execute()
+            )
+            return result.data[0] if result.data else None
+        except Exception as e:
+            print(f"Error getting thai_fund_top5 {proj_id}: {e}")
+            return None
+
+    def upsert_thai_fund_top5(self, proj_id: str, as_of: Optional[str],
+                              holdings: List[Dict[str, Any]]) -> bool:
+        """Store the latest top-5 holdings for a fund."""
+        if not self.supabase:
+            return False
+        try:
+            self.supabase.table("thai_fund_top5").upsert({
+                "proj_id": proj_id,
+                "as_of": as_of,
+                "holdings": holdings,
+                "fetched_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            }, on_conflict="proj_id").execute()
+            return True
+        except Exception as e:
+            print(f"Error upserting thai_fund_top5 {proj_id}: {e}")
+            return False
+
+    def get_stale_top5_proj_ids(self, max_age_hours: float) -> List[str]:
+        """Funds whose top-5 row is missing or older than max_age_hours. Raises on failure."""
+        if not self.supabase:
+            return []
+        cutoff = (datetime.datetime.now(datetime.timezone.utc)
+                  - datetime.timedelta(hours=max_age_hours))
+        fresh = {
+            row["proj_id"]
+            for row in self._select_all("thai_fund_top5", "proj_id, fetched_at", order="proj_id")
+            if row.get("fetched_at") and parse_timestamp(row["fetched_at"]) >= cutoff
+        }
+        return [pid for pid in self.get_all_proj_ids() if pid not in fresh]
+
+    # ─── Thai Fund NAV ──────────────────────────────────────────────
+
+    def upsert_thai_fund_nav(self, rows: List[Dict[str, Any]],
+                             batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """Bulk insert or update daily NAV rows. Returns the number of rows written."""
+        return self._bulk_upsert("thai_fund_nav", rows, "proj_id,nav_date", batch_size)
+
+    def get_latest_nav_date(self, proj_id: str) -> Optional[str]:
+        """Most recent stored NAV date (YYYY-MM-DD) for a fund."""
+        if not self.supabase:
+            return None
+        try:
+            result = (
+                self.supabase.table("thai_fund_nav")
+                .select("nav_date")
+                .eq("proj_id", proj_id)
+                .order("nav_date", desc=True)
+                .limit(1)
+                .execute()
+            )
+            return result.data[0]["nav_date"] if result.data else None
+        except Exception as e:
+            print(f"Error getting latest NAV date for {proj_id}: {e}")
+            return None
+
+    def get_nav_series(self, proj_id: str, start: str, end: str,
+                       resolution: str) -> List[Dict[str, Any]]:
+        """
+        NAV points between start and end (inclusive), downsampled server-side.
+        PostgREST caps each RPC response at READ_PAGE_SIZE rows, so long daily
+        ranges are read in pages, each starting the day after the last point.
+        """
+        if not self.supabase:
+            return []
+        try:
+            points = []
+            page_start = start
+            while True:
+                page = self.supabase.rpc("get_thai_fund_nav", {
+                    "p_proj_id": proj_id,
+                    "p_from": page_start,
+                    "p_to": end,
+                    "p_resolution": resolution,
+                }).execute().data or []
+                points.extend(page)
+                if len(page) < READ_PAGE_SIZE:
+                    return points
+                # A bucket's point is its last NAV in range, so the next bucket starts after it
+                last = datetime.date.fromisoformat(page[-1]["nav_date"][:10])
+                page_start = (last + datetime.timedelta(days=1)).isoformat()
+        except Exception as e:
+            print(f"Error getting NAV series for {proj_id}: {e}")
+            return []
+
+    def update_thai_fund_latest_nav(self, proj_id: str, nav_per_unit: float,
+                                    total_nav: float) -> bool:
+        """Copy the latest NAV onto the thai_funds row."""
+        if not self.supabase:
+            return False
+        try:
+            self.supabase.table("thai_funds").update({
+                "nav_per_unit": nav_per_unit,
+                "total_nav": total_nav,
+            }).eq("proj_id", proj_id).execute()
+            return True
+        except Exception as e:
+            print(f"Error updating latest NAV for {proj_id}: {e}")
+            return False
+
+    # ─── Sync Runs ──────────────────────────────────────────────────
+
+    def start_sync_run(self, mode: str) -> Optional[str]:
+        """Record the start of a sync run. Returns its id."""
+        if not self.supabase:
+            return None
+        try:
+            result = self.supabase.table("sec_sync_runs").insert({"mode": mode}).execute()
+            return result.data[0]["id"] if result.data else None
+        except Exception as e:
+            print(f"Error recording sync run: {e}")
+            return None
+
+    def finish_sync_run(self, run_id: str, status: str, stats: Dict[str, Any]) -> bool:
+        """Mark a sync run finished with its counters."""
+        if not self.supabase or not run_id:
+            return False
+        try:
+            self.supabase.table("sec_sync_runs").update({
+                "status": status,
+                "finished_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                **stats,
+            }).eq("id", run_id).execute()
+            return True
+        except Exception as e:
+            print(f"Error finishing sync run {run_id}: {e}")
+            return False
+
+    def get_last_sync_run(self) -> Optional[Dict[str, Any]]:
+        """Most recent completed sync run, if any."""
+        if not self.supabase:
+            return None
+        try:
+            result = (
+                self.supabase.table("sec_sync_runs")
+                .select("*")
+                .eq("status", "completed")
+                .order("finished_at", desc=True)
+                .limit(1)
+                .execute()
+            )
+            return result.data[0] if result.data else None
+        except Exception as e:
+            print(f"Error getting last sync run: {e}")
+            return None
+
+    # ─── Bulk Helpers ───────────────────────────────────────────────
+
+    def _select_all(self, table: str, columns: str, order: str) -> List[Dict[str, Any]]:
+        """
+        Read every row of a table, READ_PAGE_SIZE rows per request. Raises on
+        failure: a partial read would look like a complete, smaller table.
+        """
+        rows = []
+        start = 0
+        while True:
+            result = (
+                self.supabase.table(table)
+                .select(columns)
+                .order(order)
+                .range(start, start + READ_PAGE_SIZE - 1)
+                .execute()
+            )
+            page = result.data or []
+            rows.extend(page)
+            if len(page) < READ_PAGE_SIZE:
+                return rows
+            start += READ_PAGE_SIZE
+
+    def _bulk_upsert(self, table: str, records: List[Dict[str, Any]],
+                     conflict_key: str, batch_size: int,
+                     failed: Optional[Set[str]] = None) -> int:
+        """
+        Upsert records in chunks of batch_size, one request per chunk.
+        A chunk that fails is retried row by row so one bad record
+        does not drop the whole batch; keys of rows that still fail are
+        added to `failed` when given.
+        """
+        if not self.supabase or not records:
+            return 0
+
+        written = 0
+        for start in range(0, len(records), batch_size):
+            chunk = records[start:start + batch_size]
+            try:
+                self.supabase.table(table).upsert(chunk, on_conflict=conflict_key).execute()
+                written += len(chunk)
+            except Exception as e:
+                print(f"Batch upsert into {table} failed ({e}); retrying {len(chunk)} rows individually")
+                for record in chunk:
+                    try:
+                        self.supabase.table(table).upsert(record, on_conflict=conflict_key).execute()
+                        written += 1
+                    except Exception as row_error:
+                        key = record.get(conflict_key.split(',')[0])
+                        print(f"Error upserting {table} {key}: {row_error}")
+                        if failed is not None:
+                            failed.add(key)
+        return written
+
+
 # Module-level singleton
 sec_db_service = SECDBService()
@@ -15,11 +15,15 @@ Confirmed API Endpoints (from SEC Open Data portal):
 """
 
 import os
+import json
 import time
 import requests
-from typing import Optional, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, List, Dict, Any, Iterator, Callable
 from dotenv import load_dotenv
 
+from services.rate_limit import TokenBucket
+
 load_dotenv()
 
 SEC_API_BASE_URL = os.environ.get("SEC_API_BASE_URL", "https://api.sec.or.th")
@@ -27,6 +31,16 @@ SEC_API_KEY = os.environ.get("SEC_API_KEY", "")
 
 # Rate limit: pause between requests to respect SEC API limits
 REQUEST_DELAY_SECONDS = 0.5
+SEC_API_REQUESTS_PER_SECOND = float(
+    os.environ.get("SEC_API_REQUESTS_PER_SECOND", str(1 / REQUEST_DELAY_SECONDS))
+)
+
+# Concurrency for paginated bulk fetches
+SEC_API_MAX_WORKERS = int(os.environ.get("SEC_API_MAX_WORKERS", "4"))
+PAGE_RETRIES = 2
+
+# Minimum spacing between checkpoint writes during a paginated import
+CHECKPOINT_INTERVAL_SECONDS = 10
 
 
 class SECService:
@@ -41,18 +55,12 @@ class SECService:
             "Content-Type": "application/json",
             "Cache-Control": "no-cache",
         })
-        self._last_request_time = 0.0
+        # Thread-safe limiter shared by every request made through this client
+        self._limiter = TokenBucket(SEC_API_REQUESTS_PER_SECOND, capacity=1)
 
-    def _throttle(self):
-        """Simple rate limiter to avoid hitting SEC API limits."""
-        elapsed = time.time() - self._last_request_time
-        if elapsed < REQUEST_DELAY_SECONDS:
-            time.sleep(REQUEST_DELAY_SECONDS - elapsed)
-        self._last_request_time = time.time()
-
-    def _get(self, path: str, params: dict = None) -> dict:
+    def _get(self, path: str, params: dict = None, limiter: TokenBucket = None) -> dict:
         """Make a GET request to the SEC API."""
-        self._throttle()
+        (limiter or self._limiter).acquire()
         url = f"{self.base_url}{path}"
         try:
             resp = self.session.get(url, params=params, timeout=30)
@@ -65,7 +73,7 @@ class SECService:
             print(f"SEC API request error: {e} — URL: {url}")
             raise
 
-    def _get_items(self, path: str, params: dict = None) -> tuple:
+    def _get_items(self, path: str, params: dict = None, limiter: TokenBucket = None) -> tuple:
         """
         Make a GET request and extract items from the standard SEC response format.
         Returns: (items_list, total_pages, total_items)
@@ -80,7 +88,7 @@ class SECService:
             "items": [...]
         }
         """
-        data = self._get(path, params)
+        data = self._get(path, params, limiter=limiter)
         if isinstance(data, dict):
             items = data.get("items", [])
             total_pages = data.get("total_pages", 1)
@@ -88,6 +96,20 @@ class SECService:
             return items, total_pages, total_items
         return data if isinstance(data, list) else [], 1, 0
 
+    def _get_all_items(self, path: str, params: dict = None,
+                       limiter: TokenBucket = None) -> List[Dict[str, Any]]:
+        """Follow current_page through total_pages and return every item."""
+        params = dict(params or {})
+        all_items = []
+        page = 1
+        while True:
+            params["current_page"] = page
+            items, total_pages, _ = self._get_items(path, params, limiter=limiter)
+            all_items.extend(items)
+            if not items or page >= (total_pages or 1):
+                return all_items
+            page += 1
+
     # ─── AMC (Asset Management Companies) ───────────────────────────
 
     def get_amc_list(self, page: int = 1) -> List[Dict[str, Any]]:
@@ -101,7 +123,8 @@ class SECService:
     # ─── Fund Profiles ──────────────────────────────────────────────
 
     def get_fund_profiles(self, page: int = 1,
-                          search: str = None) -> Dict[str, Any]:
+                          search: str = None,
+                          limiter: TokenBucket = None) -> Dict[str, Any]:
         """
         Get fund profile list (กองทุนรวมภายใต้การบริหารจัดการของ บลจ.).
         
@@ -116,7 +139,7 @@ class SECService:
         if search:
             params["search"] = search
 
-        return self._get("/v1/fund/general-info/profiles", params=params)
+        return self._get("/v1/fund/general-info/profiles", params=params, limiter=limiter)
 
     def get_all_fund_profiles(self, max_pages: int = None) -> List[Dict[str, Any]]:
         """
@@ -128,39 +151,134 @@ class SECService:
         Returns:
             List of all fund profile dicts
         """
-        all_funds = []
-        page = 1
+        all_funds = list(self.iter_fund_profiles(max_pages=max_pages))
+        print(f"  Total funds fetched: {len(all_funds)}")
+        return all_funds
 
-        while True:
-            print(f"  Fetching fund profiles page {page}...")
-            data = self.get_fund_profiles(page=page)
-
-            # Extract items from response
-            items = []
-            if isinstance(data, dict):
-                items = data.get("items", [])
-                total_pages = data.get("total_pages", 1)
-            elif isinstance(data, list):
-                items = data
-                total_pages = 1
-
-            if not items:
-                print(f"  No items on page {page}, stopping.")
+    def iter_fund_profiles(self, max_pages: int = None,
+                           max_workers: int = SEC_API_MAX_WORKERS,
+                           requests_per_second: float = None,
+                           checkpoint_path: str = None,
+                           on_checkpoint: Callable[[], None] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream fund profiles, fetching pages concurrently.
+        
+        Page 1 is fetched first to learn total_pages; the remaining pages are
+        fanned out over `max_workers` threads under a requests-per-second
+        budget, and items are yielded as each page completes (not in page order).
+        
+        Args:
+            max_pages: Limit number of pages fetched (None = all pages)
+            max_workers: Concurrent page requests
+            requests_per_second: Request budget for this run (None = client default)
+            checkpoint_path: JSON file recording completed pages. If it exists,
+                those pages are skipped so an interrupted run resumes where it
+                stopped. Removed once every page has been fetched.
+            on_checkpoint: Called before each checkpoint write (at most every
+                CHECKPOINT_INTERVAL_SECONDS) so a consumer that buffers items can
+                flush them first; pages are only recorded once consumed.
+        """
+        limiter = TokenBucket(requests_per_second, capacity=1) if requests_per_second else None
+        checkpoint = self._load_checkpoint(checkpoint_path)
+        completed = set(checkpoint.get("completed_pages", []))
+        total_pages = checkpoint.get("total_pages")
+        if completed:
+            print(f"  Resuming from checkpoint: {len(completed)} pages already imported")
+
+        last_saved = [time.monotonic()]
+
+        def save_checkpoint(force: bool = False):
+            if not checkpoint_path:
+                return
+            if not force and time.monotonic() - last_saved[0] < CHECKPOINT_INTERVAL_SECONDS:
+                return
+            if on_checkpoint:
+                on_checkpoint()
+            self._save_checkpoint(checkpoint_path, total_pages, completed)
+            last_saved[0] = time.monotonic()
+
+        if 1 not in completed or not total_pages:
+            print("  Fetching fund profiles page 1...")
+            items, total_pages = self._fetch_profile_page(1, limiter)
+            if 1 not in completed:
+                yield from items
+                completed.add(1)
+                save_checkpoint()
+
+        last_page = min(total_pages, max_pages) if max_pages else total_pages
+        if max_pages and max_pages < total_pages:
+            print(f"  Limiting to {max_pages} of {total_pages} pages")
+
+        pending_pages = iter([p for p in range(2, last_page + 1) if p not in completed])
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            in_flight = {}
+
+            def submit_next():
+                page = next(pending_pages, None)
+                if page is not None:
+                    in_flight[pool.submit(self._fetch_profile_page, page, limiter)] = page
+
+            # Bounded window of outstanding pages keeps memory flat
+            for _ in range(max_workers * 2):
+                submit_next()
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = in_flight.pop(future)
+                    try:
+                        items, _ = future.result()
+                    except Exception:
+                        for other in in_flight:
+                            other.cancel()
+                        save_checkpoint(force=True)
+                        print(f"  Page {page} failed; {len(completed)} pages checkpointed")
+                        raise
+                    yield from items
+                    completed.add(page)
+                    save_checkpoint()
+                    print(f"  Got page {page}/{last_page} ({len(items)} funds, {len(completed)} pages done)")
+                    submit_next()
+
+        if checkpoint_path:
+            if on_checkpoint:
+                on_checkpoint()
+            if os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+
+    def _fetch_profile_page(self, page: int, limiter: TokenBucket = None) -> tuple:
+        """Fetch one profiles page with retries. Returns (items, total_pages)."""
+        for attempt in range(PAGE_RETRIES + 1):
+            try:
+                data = self.get_fund_profiles(page=page, limiter=limiter)
                 break
+            except requests.exceptions.RequestException:
+                if attempt == PAGE_RETRIES:
+                    raise
+                print(f"  Retrying page {page} ({attempt + 1}/{PAGE_RETRIES})...")
+                time.sleep(2 ** attempt)
 
-            all_funds.extend(items)
-            print(f"  Got {len(items)} funds (total so far: {len(all_funds)})")
-
-            if page >= total_pages:
-                break
-            if max_pages and page >= max_pages:
-                print(f"  Reached max_pages limit ({max_pages})")
-                break
+        if isinstance(data, dict):
+            return data.get("items", []) or [], data.get("total_pages", 1) or 1
+        if isinstance(data, list):
+            return data, 1
+        return [], 1
 
-            page += 1
+    @staticmethod
+    def _load_checkpoint(path: str) -> Dict[str, Any]:
+        if not path or not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
 
-        print(f"  Total funds fetched: {len(all_funds)}")
-        return all_funds
+    @staticmethod
+    def _save_checkpoint(path: str, total_pages: int, completed: set):
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"total_pages": total_pages, "completed_pages": sorted(completed)}, f)
+        os.replace(tmp_path, path)
 
     # ─── Special Fund Types ─────────────────────────────────────────
 
@@ -215,6 +333,18 @@ class SECService:
         )
         return items
 
+    def get_all_quarterly_portfolio(self, proj_id: str,
+                                    start_period: str = None,
+                                    end_period: str = None,
+                                    limiter: TokenBucket = None) -> List[Dict[str, Any]]:
+        """Get quarterly portfolio holdings across every page."""
+        params = {"proj_id": proj_id}
+        if start_period:
+            params["period_start"] = start_period
+        if end_period:
+            params["period_end"] = end_period
+        return self._get_all_items("/v1/fund/outstanding/portfolio", params, limiter)
+
     # ─── NAV Data ───────────────────────────────────────────────────
 
     def get_daily_nav(self, proj_id: str,
@@ -240,6 +370,18 @@ class SECService:
         )
         return items
 
+    def get_all_daily_nav(self, proj_id: str,
+                          begin_date: str = None,
+                          end_date: str = None,
+                          limiter: TokenBucket = None) -> List[Dict[str, Any]]:
+        """Get daily NAV data across every page."""
+        params = {"proj_id": proj_id}
+        if begin_date:
+            params["start_date"] = begin_date
+        if end_date:
+            params["end_date"] = end_date
+        return self._get_all_items("/v1/fund/daily-info/nav", params, limiter)
+
     # ─── Asset Allocation ───────────────────────────────────────────
 
     def get_asset_allocation(self, proj_id: str,
@@ -398,5 +540,21 @@ def map_master_fund_to_ticker(master_fund_name: str) -> Optional[str]:
     return None
 
 
+def select_latest_top5(raw_top5: List[Dict[str, Any]]) -> tuple:
+    """
+    The SEC API returns historical top 5 holdings. Keep only the latest period.
+    Returns (as_of_date, holdings sorted by asset_ratio descending).
+    """
+    if not raw_top5:
+        return None, []
+    # Find the maximum date string in either end_date or start_date
+    latest_date = max(item.get("end_date", "") or item.get("start_date", "") for item in raw_top5)
+    # Filter down to just the items that belong to the latest_date
+    top5 = [item for item in raw_top5 if (item.get("end_date") == latest_date or item.get("start_date") == latest_date)]
+    # Sort by asset_ratio descending
+    top5 = sorted(top5, key=lambda x: x.get("asset_ratio", 0), reverse=True)
+    return latest_date or None, top5[:5]
+
+
 # Module-level singleton
 sec_service = SECService()
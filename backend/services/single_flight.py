@@ -0,0 +1,109 @@
+"""
+Single-Flight Request Coalescing
+Ensures only one caller per key does the expensive work while concurrent
+callers for the same key wait for, and share, its result.
+
+SingleFlight coalesces across threads inside a worker. worker_lock adds an
+optional per-key file lock so separate gunicorn workers on the same host
+also take turns instead of fetching the same ticker in parallel.
+"""
+
+import os
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process coalescing only
+    fcntl = None
+
+LOCK_DIR = os.environ.get("FUND_LOCK_DIR", os.path.join(tempfile.gettempdir(), "whattheyhold-locks"))
+LOCK_TIMEOUT_SECONDS = float(os.environ.get("FUND_LOCK_TIMEOUT_SECONDS", "30"))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into a single execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn() once per in-flight key.
+        Returns (result, shared) where shared is True for followers that
+        received the leader's result. Exceptions raised by the leader are
+        re-raised in every caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+        return call.result, False
+
+
+@contextmanager
+def worker_lock(key: str, timeout: float = LOCK_TIMEOUT_SECONDS):
+    """
+    Cross-process lock on a per-key file.
+    Yields True if another process held the lock and we had to wait for it
+    (so the caller should re-check shared state), False otherwise. If the
+    lock cannot be taken within `timeout`, proceeds unlocked rather than
+    failing the request.
+    """
+    if fcntl is None:
+        yield False
+        return
+
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    safe_key = "".join(c if c.isalnum() or c in "-_." else "_" for c in key)
+    with open(os.path.join(LOCK_DIR, f"{safe_key}.lock"), "w") as lock_file:
+        waited = False
+        acquired = False
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+                break
+            except BlockingIOError:
+                waited = True
+                if time.monotonic() >= deadline:
+                    print(f"Timed out waiting for lock {key}, proceeding without it")
+                    break
+                time.sleep(0.1)
+
+        try:
+            yield waited
+        finally:
+            if acquired:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,180 @@
+"""
+Thai Fund Service
+Read paths for Thai fund data that combine the SEC API (sec_service) with
+what is persisted in Supabase (sec_db_service). Request handlers read from
+the database only; SEC API calls happen in background refreshes and jobs.
+"""
+
+import os
+import datetime
+from typing import Optional, List, Dict, Any
+
+from services.sec_service import sec_service, select_latest_top5
+from services.sec_db_service import sec_db_service
+from services.db_service import parse_timestamp
+from services.background_refresh import BackgroundRefresher
+from services.rate_limit import TokenBucket
+
+# Top-5 holdings change at most monthly
+TOP5_TTL_HOURS = float(os.environ.get("TOP5_TTL_HOURS", str(24 * 7)))
+
+# NAV history fetched for a fund seen for the first time, and per SEC request window
+NAV_BACKFILL_DAYS = 365 * 5
+NAV_FETCH_WINDOW_DAYS = 365
+
+NAV_RESOLUTIONS = ("day", "week", "month")
+
+
+class ThaiFundService:
+    """Cached, DB-backed access to Thai fund data."""
+
+    def __init__(self):
+        self._top5_refresher = BackgroundRefresher(max_workers=1, name="top5-refresh")
+
+    # ─── Top 5 Holdings ─────────────────────────────────────────────
+
+    def get_top5_holdings(self, proj_id: str) -> Dict[str, Any]:
+        """
+        Return the persisted top-5 holdings without calling the SEC API.
+        Missing or expired rows are refreshed in the background; until then
+        the last stored holdings (or an empty list) are returned.
+        """
+        row = sec_db_service.get_thai_fund_top5(proj_id)
+        if not row or self._is_expired(row.get("fetched_at")):
+            if self._top5_refresher.submit(proj_id, lambda: self.refresh_top5_holdings(proj_id)):
+                print(f"Queued top-5 refresh for {proj_id}")
+
+        if not row:
+            return {"as_of": None, "holdings": [], "fetched_at": None}
+        return {
+            "as_of": row.get("as_of"),
+            "holdings": row.get("holdings") or [],
+            "fetched_at": row.get("fetched_at"),
+        }
+
+    def refresh_top5_holdings(self, proj_id: str) -> List[Dict[str, Any]]:
+        """Fetch the latest top-5 holdings from the SEC API and persist them."""
+        return self.store_top5_holdings(proj_id, sec_service.get_top5_holdings(proj_id))
+
+    def store_top5_holdings(self, proj_id: str, raw_top5: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Persist the latest period of a raw SEC top-5 response."""
+        as_of, top5 = select_latest_top5(raw_top5)
+        sec_db_service.upsert_thai_fund_top5(proj_id, as_of, top5)
+        return top5
+
+    # ─── Daily NAV ──────────────────────────────────────────────────
+
+    def ingest_nav(self, proj_id: str, backfill_days: int = NAV_BACKFILL_DAYS,
+                   limiter: TokenBucket = None) -> int:
+        """
+        Append daily NAV for a fund: everything after the latest stored date,
+        or the last backfill_days for a fund with no history yet.
+        Returns the number of rows written.
+        """
+        today = datetime.date.today()
+        latest = sec_db_service.get_latest_nav_date(proj_id)
+        if latest:
+            start = datetime.date.fromisoformat(latest) + datetime.timedelta(days=1)
+        else:
+            start = today - datetime.timedelta(days=backfill_days)
+        if start > today:
+            return 0
+
+        items = []
+        window_start = start
+        while window_start <= today:
+            window_end = min(today, window_start + datetime.timedelta(days=NAV_FETCH_WINDOW_DAYS - 1))
+            items.extend(sec_service.get_all_daily_nav(
+                proj_id, window_start.isoformat(), window_end.isoformat(), limiter=limiter
+            ))
+            window_start = window_end + datetime.timedelta(days=1)
+
+        # Multi-class funds report one row per class per date. The series is
+        # one class throughout: the unclassed row if any, else the lowest
+        # class code, so every run and every date picks the same class.
+        if items:
+            nav_class = min(self._nav_class(item) for item in items)
+            items = [item for item in items if self._nav_class(item) == nav_class]
+        rows = {}
+        for item in items:
+            row = self._nav_row(proj_id, item)
+            if row:
+                rows[row["nav_date"]] = row
+
+        if not rows:
+            return 0
+        written = sec_db_service.upsert_thai_fund_nav(sorted(rows.values(), key=lambda r: r["nav_date"]))
+        newest = rows[max(rows)]
+        sec_db_service.update_thai_fund_latest_nav(proj_id, newest["nav_per_unit"], newest["total_nav"])
+        return written
+
+    def get_nav_series(self, proj_id: str, start: Optional[str], end: Optional[str],
+                       resolution: str = "auto") -> Dict[str, Any]:
+        """
+        NAV range for charts. resolution is 'day', 'week', 'month' or 'auto'
+        (daily up to 1 year, weekly up to 5 years, monthly beyond).
+        """
+        end_date = datetime.date.fromisoformat(end) if end else datetime.date.today()
+        start_date = (datetime.date.fromisoformat(start) if start
+                      else end_date - datetime.timedelta(days=365))
+        if start_date > end_date:
+            raise ValueError("'from' must not be after 'to'")
+
+        if resolution == "auto":
+            span_days = (end_date - start_date).days
+            resolution = "day" if span_days <= 366 else "week" if span_days <= 366 * 5 else "month"
+        elif resolution not in NAV_RESOLUTIONS:
+            raise ValueError(f"resolution must be one of {', '.join(NAV_RESOLUTIONS)} or auto")
+
+        points = sec_db_service.get_nav_series(
+            proj_id, start_date.isoformat(), end_date.isoformat(), resolution
+        )
+        return {
+            "proj_id": proj_id,
+            "from": start_date.isoformat(),
+            "to": end_date.isoformat(),
+            "resolution": resolution,
+            "points": [
+                {
+                    "date": p["nav_date"],
+                    "nav": float(p["nav_per_unit"]) if p.get("nav_per_unit") is not None else None,
+                    "total_nav": float(p["total_nav"]) if p.get("total_nav") is not None else None,
+                }
+                for p in points
+            ],
+        }
+
+    @staticmethod
+    def _nav_class(item: Dict[str, Any]) -> str:
+        """Share class of an SEC daily NAV item ('' for single-class funds)."""
+        share_class = str(item.get("class_abbr_name") or "").strip()
+        return "" if share_class == "-" else share_class
+
+    @staticmethod
+    def _nav_row(proj_id: str, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Normalize an SEC daily NAV item to a thai_fund_nav row."""
+        nav_date = str(item.get("nav_date") or "")[:10]
+        nav = item.get("last_val", item.get("nav_per_unit"))
+        if not nav_date or nav in (None, ""):
+            return None
+        total = item.get("net_asset", item.get("total_nav"))
+        return {
+            "proj_id": proj_id,
+            "nav_date": nav_date,
+            "nav_per_unit": float(nav),
+            "total_nav": float(total) if total not in (None, "") else None,
+        }
+
+    @staticmethod
+    def _is_expired(fetched_at: Optional[str]) -> bool:
+        if not fetched_at:
+            return True
+        try:
+            age = datetime.datetime.now(datetime.timezone.utc) - parse_timestamp(fetched_at)
+            return age.total_seconds() >= TOP5_TTL_HOURS * 3600
+        except ValueError:
+            return True
+
+
+# Module-level singleton
+thai_fund_service = ThaiFundService()
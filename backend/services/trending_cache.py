@@ -0,0 +1,97 @@
+"""
+Trending Cache
+Per-process copy of the most viewed funds for each trending window.
+
+fund_view analytics events are rolled up per fund per hour in the database
+(migrations/15_trending_rollups.sql). A daemon thread re-reads the top
+TRENDING_CACHE_SIZE funds of every window each TRENDING_REFRESH_SECONDS, so
+/api/trending is a list slice. While a window has no views yet it serves the
+all-time view_count list instead; until the first refresh completes, that
+list is read from the database.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from services.db_service import db_service
+
+TRENDING_REFRESH_SECONDS = float(os.environ.get("TRENDING_REFRESH_SECONDS", "60"))
+
+# Funds kept per window; requests for more are capped to this
+TRENDING_CACHE_SIZE = 50
+
+# Window name -> hours
+TRENDING_WINDOWS = {"24h": 24, "7d": 168}
+DEFAULT_TRENDING_WINDOW = "24h"
+
+# Rollup buckets are kept a day past the longest window, pruned hourly
+ROLLUP_RETENTION_HOURS = max(TRENDING_WINDOWS.values()) + 24
+ROLLUP_PRUNE_SECONDS = 3600
+
+
+class TrendingCache:
+    """Thread-safe cache of windowed trending lists."""
+
+    def __init__(self, refresh_seconds: float = TRENDING_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._windows: Dict[str, List[dict]] = {}
+        self._all_time: List[dict] = []  # fallback for windows with no views
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._last_prune = 0.0
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded_at is not None
+
+    def start(self):
+        """Refresh in a daemon thread every refresh_seconds."""
+        if self._thread or not db_service.supabase:
+            return
+        self._thread = threading.Thread(target=self._run, name="trending-cache", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing trending funds: {e}")
+            time.sleep(self.refresh_seconds)
+
+    def refresh(self):
+        windows = {
+            name: db_service.get_windowed_trending(hours, TRENDING_CACHE_SIZE)
+            for name, hours in TRENDING_WINDOWS.items()
+        }
+        all_time = db_service.get_trending_funds(TRENDING_CACHE_SIZE) if not all(windows.values()) else []
+        with self._lock:
+            self._windows = windows
+            self._all_time = all_time
+            self.loaded_at = time.time()
+
+        if time.monotonic() - self._last_prune >= ROLLUP_PRUNE_SECONDS:
+            self._last_prune = time.monotonic()
+            db_service.prune_view_rollups(ROLLUP_RETENTION_HOURS)
+
+    def get(self, window: str = DEFAULT_TRENDING_WINDOW, limit: int = 5) -> List[dict]:
+        """Top `limit` funds of a window, falling back to all-time views when it is empty."""
+        with self._lock:
+            if self.ready:
+                return (self._windows.get(window) or self._all_time)[:limit]
+        return db_service.get_trending_funds(limit)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "windows": {name: len(funds) for name, funds in self._windows.items()},
+                "loaded_at": self.loaded_at,
+            }
+
+
+# Module-level singleton
+trending_cache = TrendingCache()
@@ -0,0 +1,300 @@
+"""
+Typeahead Index
+Per-process autocomplete over yfinance tickers, Thai fund abbreviations,
+project IDs and fund names, so /api/search answers a keystroke without a
+database round-trip.
+
+Every searchable key (the code, the full name, and each later word of an
+English name) is lowercased into one sorted array with a parallel array of
+entry IDs; a prefix query is two bisects that bound the matching slice.
+Short prefixes, whose slices are large, instead read a precomputed list of
+their most viewed funds. Results are ranked by view_count, with exact code
+matches first.
+
+The index is loaded in the background at startup. Funds updated since the
+last load are merged in every TYPEAHEAD_REFRESH_SECONDS, a full reload picks
+up view_count drift every TYPEAHEAD_RELOAD_SECONDS, and funds written by this
+worker are applied immediately through DBService upsert listeners. Until the
+first load completes, callers fall back to the search RPCs.
+"""
+
+import os
+import bisect
+import heapq
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models.schemas import FundResponse
+from services.db_service import db_service
+from services.sec_db_service import sec_db_service
+
+TYPEAHEAD_REFRESH_SECONDS = float(os.environ.get("TYPEAHEAD_REFRESH_SECONDS", "60"))
+TYPEAHEAD_RELOAD_SECONDS = float(os.environ.get("TYPEAHEAD_RELOAD_SECONDS", "1800"))
+
+# Prefixes this short match thousands of keys, so their TOP_K most viewed
+# funds are kept precomputed; longer prefixes scan their (small) key range
+TOP_PREFIX_LENGTH = 4
+TOP_K = 20
+
+# A refresh touching more funds than this (e.g. after a full SEC import)
+# rebuilds the index instead of inserting one fund at a time
+REFRESH_REBUILD_THRESHOLD = 1000
+
+_WORD_SPLIT = re.compile(r"[\s\-/(),.&]+")
+_PREFIX_END = "\U0010ffff"
+
+
+def normalize_key(text: str) -> str:
+    return " ".join(str(text or "").split()).casefold()
+
+
+def _search_keys(codes: Iterable[str], names: Iterable[str]) -> List[str]:
+    """Codes and full names, plus each later word of multi-word names."""
+    keys = []
+    for value in list(codes) + list(names):
+        key = normalize_key(value)
+        if key:
+            keys.append(key)
+    for name in names:
+        words = [w for w in _WORD_SPLIT.split(normalize_key(name)) if len(w) >= 2]
+        keys.extend(words[1:])
+    return list(dict.fromkeys(keys))
+
+
+def _top_prefixes(keys: Iterable[str]) -> Set[str]:
+    return {key[:n] for key in keys for n in range(1, min(len(key), TOP_PREFIX_LENGTH) + 1)}
+
+
+class TypeaheadIndex:
+    """Thread-safe sorted-array prefix index ranked by popularity."""
+
+    def __init__(self, refresh_seconds: float = TYPEAHEAD_REFRESH_SECONDS,
+                 reload_seconds: float = TYPEAHEAD_RELOAD_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.reload_seconds = reload_seconds
+        self._keys: List[str] = []
+        self._ids: List[str] = []
+        self._entries: Dict[str, dict] = {}       # entry id -> search result
+        self._entry_keys: Dict[str, List[str]] = {}
+        self._codes: Dict[str, Tuple[str, ...]] = {}
+        self._views: Dict[str, int] = {}
+        self._by_code: Dict[str, List[str]] = {}  # exact code -> entry ids
+        self._top: Dict[str, List[str]] = {}      # short prefix -> most viewed entry ids
+        self._lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+        self._watermarks: Dict[str, Optional[str]] = {"yf": None, "sec": None}
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded_at is not None
+
+    def start(self):
+        """Load in a daemon thread, then keep merging updates."""
+        if self._thread or not db_service.supabase:
+            return
+        db_service.add_upsert_listener(self.on_fund_written)
+        self._thread = threading.Thread(target=self._run, name="typeahead-index", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        last_reload = 0.0
+        while True:
+            try:
+                if time.monotonic() - last_reload >= self.reload_seconds or not self.ready:
+                    self.reload()
+                    last_reload = time.monotonic()
+                else:
+                    self.refresh()
+            except Exception as e:
+                print(f"Error loading typeahead index: {e}")
+            time.sleep(self.refresh_seconds)
+
+    # ─── Loading ──────────────────────────────────────────────────
+
+    def reload(self):
+        """Rebuild from both fund tables and swap it in atomically."""
+        started = time.monotonic()
+        watermarks = {"yf": None, "sec": None}
+        entries = []
+        for row in db_service.iter_funds_for_search():
+            entries.append(self._yf_entry(row))
+            watermarks["yf"] = max(watermarks["yf"] or "", row.get("updated_at") or "") or None
+        for row in sec_db_service.get_thai_funds_for_search():
+            entries.append(self._sec_entry(row))
+            watermarks["sec"] = max(watermarks["sec"] or "", row.get("updated_at") or "") or None
+
+        self.build(entries)
+        self._watermarks = watermarks
+        print(f"Typeahead index loaded: {len(self._entries)} funds, {len(self._keys)} keys "
+              f"in {time.monotonic() - started:.1f}s")
+
+    def refresh(self):
+        """Merge funds updated since the last load or refresh."""
+        yf_rows = list(db_service.iter_funds_for_search(since=self._watermarks["yf"]))
+        sec_rows = sec_db_service.get_thai_funds_for_search(since=self._watermarks["sec"])
+        if len(yf_rows) + len(sec_rows) > REFRESH_REBUILD_THRESHOLD:
+            self.reload()
+            return
+        for source, rows, to_entry in (("yf", yf_rows, self._yf_entry), ("sec", sec_rows, self._sec_entry)):
+            for row in rows:
+                self.upsert(*to_entry(row))
+                self._watermarks[source] = max(self._watermarks[source] or "", row.get("updated_at") or "") or None
+        if yf_rows or sec_rows:
+            print(f"Typeahead index refreshed: {len(yf_rows) + len(sec_rows)} funds updated")
+
+    def build(self, entries: List[Tuple[str, dict, List[str], Tuple[str, ...], int]]):
+        """Replace the index with (entry_id, result, keys, codes, view_count) entries."""
+        pairs = sorted((key, entry_id) for entry_id, _, keys, _, _ in entries for key in keys)
+
+        by_code: Dict[str, List[str]] = {}
+        top: Dict[str, List[str]] = {}
+        for entry_id, _, keys, codes, _ in sorted(entries, key=lambda e: -e[4]):
+            for code in codes:
+                by_code.setdefault(code, []).append(entry_id)
+            for prefix in _top_prefixes(keys):
+                ids = top.setdefault(prefix, [])
+                if len(ids) < TOP_K:
+                    ids.append(entry_id)
+        with self._lock:
+            self._keys = [k for k, _ in pairs]
+            self._ids = [i for _, i in pairs]
+            self._entries = {e[0]: e[1] for e in entries}
+            self._entry_keys = {e[0]: e[2] for e in entries}
+            self._codes = {e[0]: e[3] for e in entries}
+            self._views = {e[0]: e[4] for e in entries}
+            self._by_code = by_code
+            self._top = top
+            self.loaded_at = time.time()
+
+    @staticmethod
+    def _yf_entry(row: dict):
+        ticker = row["ticker"]
+        result = {"ticker": ticker, "name": row.get("name") or ticker, "source": "yf"}
+        return (f"yf:{ticker}", result, _search_keys([ticker], [row.get("name")]),
+                (normalize_key(ticker),), int(row.get("view_count") or 0))
+
+    @staticmethod
+    def _sec_entry(row: dict):
+        proj_id = row["proj_id"]
+        abbr = row.get("proj_abbr_name")
+        result = {
+            "ticker": abbr or proj_id,
+            "name": row.get("proj_name_en") or row.get("proj_name_th", ""),
+            "proj_id": proj_id,
+            "source": "sec",
+            "is_feeder_fund": row.get("is_feeder_fund", False),
+            "master_fund": row.get("feederfund_master_fund"),
+            "master_ticker": row.get("master_fund_ticker"),
+        }
+        keys = _search_keys([abbr, proj_id], [row.get("proj_name_en"), row.get("proj_name_th")])
+        codes = tuple(normalize_key(c) for c in (abbr, proj_id) if c)
+        return f"sec:{proj_id}", result, keys, codes, int(row.get("view_count") or 0)
+
+    # ─── Incremental updates ──────────────────────────────────────
+
+    def on_fund_written(self, ticker: str, data: Optional[FundResponse]):
+        """DBService listener: index a yfinance fund as soon as it is written."""
+        if not self.ready:
+            return
+        entry_id = f"yf:{ticker}"
+        name = data.fund.name if data is not None else self._entries.get(entry_id, {}).get("name", ticker)
+        views = self._views.get(entry_id, 0)
+        self.upsert(*self._yf_entry({"ticker": ticker, "name": name, "view_count": views}))
+
+    def upsert(self, entry_id: str, result: dict, keys: List[str],
+               codes: Tuple[str, ...], view_count: int):
+        with self._lock:
+            old_keys = self._entry_keys.get(entry_id, [])
+            for key in old_keys:
+                lo = bisect.bisect_left(self._keys, key)
+                hi = bisect.bisect_right(self._keys, key, lo)
+                for i in range(lo, hi):
+                    if self._ids[i] == entry_id:
+                        del self._keys[i]
+                        del self._ids[i]
+                        break
+            for key in keys:
+                i = bisect.bisect_left(self._keys, key)
+                self._keys.insert(i, key)
+                self._ids.insert(i, entry_id)
+
+            for code in self._codes.get(entry_id, ()):
+                matches = self._by_code.get(code, [])
+                if entry_id in matches:
+                    matches.remove(entry_id)
+                if not matches:
+                    self._by_code.pop(code, None)
+            for code in codes:
+                self._by_code.setdefault(code, []).append(entry_id)
+
+            self._entries[entry_id] = result
+            self._entry_keys[entry_id] = keys
+            self._codes[entry_id] = codes
+            self._views[entry_id] = view_count
+
+            new_prefixes = _top_prefixes(keys)
+            for prefix in _top_prefixes(old_keys) | new_prefixes:
+                self._update_top(prefix, entry_id, prefix in new_prefixes)
+
+    def _update_top(self, prefix: str, entry_id: str, matches: bool):
+        """Move entry_id to its place in one completion list, or drop it."""
+        top = self._top.get(prefix, [])
+        was_full = len(top) >= TOP_K
+        was_listed = entry_id in top
+        if was_listed:
+            top.remove(entry_id)
+        if matches:
+            views = self._views
+            view_count = views[entry_id]
+            i = next((i for i, e in enumerate(top) if views[e] < view_count), len(top))
+            if i < TOP_K:
+                top.insert(i, entry_id)
+                del top[TOP_K:]
+        if was_full and (len(top) < TOP_K or (was_listed and top[-1] == entry_id)):
+            # An entry left a full list, or fell to its last slot: a match
+            # outside the list may now rank above it
+            top = self._scan(prefix, TOP_K)
+        if top:
+            self._top[prefix] = top
+        else:
+            self._top.pop(prefix, None)
+
+    # ─── Queries ──────────────────────────────────────────────────
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Funds with a key starting with `query`: exact code matches, then by view_count."""
+        prefix = normalize_key(query)
+        if not prefix or limit <= 0:
+            return []
+        with self._lock:
+            exact = sorted(self._by_code.get(prefix, ()), key=self._views.__getitem__, reverse=True)
+            if len(prefix) <= TOP_PREFIX_LENGTH and limit <= TOP_K:
+                ranked = self._top.get(prefix, [])
+            else:
+                ranked = self._scan(prefix, limit + len(exact))
+            ids = list(dict.fromkeys(exact + ranked))[:limit]
+            return [self._entries[e] for e in ids]
+
+    def _scan(self, prefix: str, limit: int) -> List[str]:
+        """Top entries by view_count among every key in the prefix range."""
+        lo = bisect.bisect_left(self._keys, prefix)
+        hi = bisect.bisect_left(self._keys, prefix + _PREFIX_END, lo)
+        candidates = dict.fromkeys(self._ids[lo:hi])  # dedupe, keep key order for ties
+        return heapq.nlargest(limit, candidates, key=self._views.__getitem__)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "funds": len(self._entries),
+                "keys": len(self._keys),
+                "completion_lists": len(self._top),
+                "loaded_at": self.loaded_at,
+            }
+
+
+# Module-level singleton
+typeahead_index = TypeaheadIndex()
@@ -0,0 +1,90 @@
+"""
+View Counter Buffer
+Write-behind aggregation of fund view counts.
+
+Page loads call record(key), which only bumps an in-memory counter. A daemon
+thread flushes the accumulated {key: count} map every flush_seconds (or as
+soon as max_keys distinct keys are pending) through one batched RPC, so a
+popular fund costs one row update per flush instead of one per view. Pending
+counts are flushed again at interpreter exit. A failed flush keeps its counts
+and retries them on the next cycle.
+"""
+
+import os
+import atexit
+import threading
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+VIEW_FLUSH_SECONDS = float(os.environ.get("VIEW_FLUSH_SECONDS", "10"))
+VIEW_FLUSH_MAX_KEYS = int(os.environ.get("VIEW_FLUSH_MAX_KEYS", "500"))
+
+
+class ViewCounterBuffer:
+    """Aggregates increments per key and writes them in batches."""
+
+    def __init__(self, flush_fn: Callable[[Dict[str, int]], None], name: str = "views",
+                 flush_seconds: float = VIEW_FLUSH_SECONDS, max_keys: int = VIEW_FLUSH_MAX_KEYS):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.flush_seconds = flush_seconds
+        self.max_keys = max_keys
+        self._pending: Counter = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushed_views = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def record(self, key: str, count: int = 1):
+        """Count a view. Never blocks on the database."""
+        with self._lock:
+            self._pending[key] += count
+            if self._thread is None:
+                self._start()
+            if len(self._pending) >= self.max_keys:
+                self._wake.set()
+
+    def _start(self):
+        # Started on first use so scripts that never record views spawn no thread
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-flush", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write every pending count now. Returns the number of views written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, Counter()
+            if not batch:
+                return 0
+            try:
+                self.flush_fn(dict(batch))
+            except Exception as e:
+                print(f"Failed to flush {sum(batch.values())} {self.name} ({len(batch)} keys): {e}")
+                self.failed_flushes += 1
+                with self._lock:
+                    self._pending.update(batch)
+                return 0
+            written = sum(batch.values())
+            self.flushed_views += written
+            self.flushes += 1
+            return written
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending_keys": len(self._pending),
+                "pending_views": sum(self._pending.values()),
+                "flushed_views": self.flushed_views,
+                "flushes": self.flushes,
+                "failed_flushes": self.failed_flushes,
+            }
@@ -0,0 +1,119 @@
+"""
+yfinance Session
+Keeps one browser-impersonating curl_cffi session alive per process so cold
+fund fetches reuse warm keep-alive connections instead of paying session
+setup and a TLS handshake on every miss.
+
+Why one and not a pool: yfinance 0.2.x sends every request through a
+process-wide YfData singleton, and each yf.Ticker(..., session=s) swaps that
+singleton's session. Separate sessions per fetch cannot be kept apart inside
+one process, so every fetch gets the same session. curl_cffi keeps a curl
+handle per thread, so concurrent fetches still run in parallel over it.
+
+When responses keep coming back 403/429, the session is rotated: a fresh one
+(new connection pool, new user agent) becomes current for later fetches.
+The old session is never closed here, since fetches already in flight may
+still be using it through the singleton; it is released once unreferenced.
+"""
+
+import os
+import random
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+
+from curl_cffi import requests as curl_requests
+
+# Consecutive blocked responses before the session is rotated
+YF_SESSION_MAX_STRIKES = int(os.environ.get("YF_SESSION_MAX_STRIKES", "2"))
+
+IMPERSONATE = "chrome"
+
+
+def is_blocked_error(error: Exception) -> bool:
+    """True for errors that mean Yahoo is refusing this client (HTTP 403 / 429)."""
+    message = str(error)
+    return (
+        "429" in message
+        or "403" in message
+        or "Too Many Requests" in message
+        or "Forbidden" in message
+        or "RateLimit" in type(error).__name__
+    )
+
+
+class YFSession:
+    """Process-wide impersonated session with ban tracking and rotation."""
+
+    def __init__(self, user_agents: List[str] = None, max_strikes: int = YF_SESSION_MAX_STRIKES):
+        self.user_agents = list(user_agents or [])
+        self.max_strikes = max_strikes
+        self._lock = threading.Lock()
+        self._session: Optional[curl_requests.Session] = None
+        self._user_agent = ""
+        self._generation = 0
+        self._strikes = 0
+        self._uses = 0
+        self._rotations = 0
+        self._blocked = 0
+
+    @contextmanager
+    def session(self) -> Iterator[curl_requests.Session]:
+        """
+        The current session, for the duration of one fetch. Errors that look
+        like a 403/429 count against it; enough in a row rotate it. Outcomes of
+        fetches that started on an already rotated session are ignored.
+        """
+        session, generation = self._current()
+        try:
+            yield session
+        except Exception as e:
+            if is_blocked_error(e):
+                self._strike(generation)
+            raise
+        else:
+            with self._lock:
+                if generation == self._generation:
+                    self._strikes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "active": self._session is not None,
+                "generation": self._generation,
+                "uses": self._uses,
+                "strikes": self._strikes,
+                "rotations": self._rotations,
+                "blocked_responses": self._blocked,
+            }
+
+    def _current(self):
+        with self._lock:
+            if self._session is None:
+                # Created lazily; a failure here leaves no state behind
+                self._session, self._user_agent = self._new_session(exclude=self._user_agent)
+            self._uses += 1
+            return self._session, self._generation
+
+    def _strike(self, generation: int):
+        with self._lock:
+            self._blocked += 1
+            if generation != self._generation:
+                return
+            self._strikes += 1
+            if self._strikes < self.max_strikes:
+                return
+            print(f"Rotating yfinance session after {self._strikes} blocked responses")
+            # Dropped, not closed: in-flight fetches may still hold it
+            self._session = None
+            self._generation += 1
+            self._strikes = 0
+            self._rotations += 1
+
+    def _new_session(self, exclude: str = None):
+        choices = [ua for ua in self.user_agents if ua != exclude] or self.user_agents
+        user_agent = random.choice(choices) if choices else ""
+        session = curl_requests.Session(impersonate=IMPERSONATE)
+        if user_agent:
+            session.headers["User-agent"] = user_agent
+        return session, user_agent
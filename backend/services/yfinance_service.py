@@ -1,18 +1,48 @@
 import yfinance as yf
 import pandas as pd
+import os
 import datetime
-from typing import List, Dict, Any
-from models.schemas import FundResponse, FundInfo, Holding, CountryWeight, SectorWeight
-from services.country_mapper import get_country_code
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Tuple
+from models.schemas import FundResponse, FundInfo, Holding, SectorWeight
+from services.holdings_normalizer import (
+    normalize_holdings, normalize_sector_weights, to_holdings, holdings_frame, compute_country_weights,
+)
 from dataclasses import dataclass
 
-# In-memory cache for MVP (Global dict)
-FUND_CACHE = {}
+# Upper bound on concurrent yfinance fetches for batch requests
+MAX_CONCURRENT_FETCHES = int(os.environ.get("YF_MAX_CONCURRENT_FETCHES", "4"))
 
+# Running time allowed to each sub-fetch of a refresh before the stored copy
+# fills in for it. Counted from when the sub-fetch starts, not from submit.
+FETCH_DEADLINE_SECONDS = float(os.environ.get("YF_FETCH_DEADLINE_SECONDS", "15"))
 
+# Hard cap on one refresh, queueing included. Also bounds cold misses, which
+# have no stored copy to fall back on and so wait past the deadline.
+FETCH_MAX_WAIT_SECONDS = float(os.environ.get("YF_FETCH_MAX_WAIT_SECONDS", "60"))
 
-import random
-from services.db_service import db_service
+# Poll interval while a sub-fetch is still queued behind other refreshes
+_QUEUED_POLL_SECONDS = 0.1
+
+# Runs the holdings and info sub-fetches of each refresh side by side
+_subfetch_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES * 2,
+                                        thread_name_prefix="yf-subfetch")
+
+
+
+from dataclasses import replace
+from services.db_service import db_service, CACHE_MAX_AGE_HOURS, CACHE_STALE_GRACE_HOURS
+from services.fund_cache import fund_cache
+from services.single_flight import SingleFlight, worker_lock
+from services.background_refresh import BackgroundRefresher
+from services.yf_session import YFSession, is_blocked_error
+
+# Coalesces concurrent yfinance refreshes of the same ticker within this worker
+_fund_flight = SingleFlight()
+
+# Refreshes stale funds off the request path (stale-while-revalidate)
+_fund_refresher = BackgroundRefresher(name="fund-refresh")
 
 # Common user agents to rotate and prevent 403 blocks
 USER_AGENTS = [
@@ -23,135 +53,332 @@ USER_AGENTS = [
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:90.0) Gecko/20100101 Firefox/90.0'
 ]
 
+# Warm impersonated session shared by every fetch in this process
+yf_session = YFSession(user_agents=USER_AGENTS)
+
 def get_fund_data(ticker: str, force_refresh: bool = False) -> FundResponse:
-    # 1. Check DB Cache
+    ticker = ticker.upper()
+
+    # 1. Check In-Memory L1 Cache
+    if not force_refresh:
+        cached = _get_from_memory(ticker)
+        if cached:
+            print(f"Serving {ticker} from memory cache{' (stale)' if cached.stale else ''}")
+            return cached
+
+    # 2. Check DB Cache
     db_data = db_service.get_fund(ticker)
-    
+    return _resolve_fund(ticker, db_data, force_refresh)
+
+
+def get_funds_data(tickers: List[str]) -> Dict[str, FundResponse]:
+    """
+    Batch variant of get_fund_data.
+    All tickers are looked up in one DB query; stale or missing funds are then
+    resolved concurrently, at most MAX_CONCURRENT_FETCHES at a time.
+    """
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+
+    results: Dict[str, FundResponse] = {}
+    for ticker in tickers:
+        cached = _get_from_memory(ticker)
+        if cached:
+            results[ticker] = cached
+
+    db_funds = db_service.get_funds([t for t in tickers if t not in results])
+
+    misses: List[str] = []
+    for ticker in tickers:
+        if ticker in results:
+            continue
+        db_data = db_funds.get(ticker)
+        if db_data and db_data.last_updated and db_service.is_cache_fresh(db_data.last_updated):
+            fund_cache.put(ticker, db_data)
+            results[ticker] = db_data
+        else:
+            misses.append(ticker)
+
+    if misses:
+        print(f"Batch: {len(results)} fresh, resolving {len(misses)} stale or missing...")
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_FETCHES, len(misses))) as pool:
+            fetched = pool.map(lambda t: _resolve_fund(t, db_funds.get(t), False), misses)
+            for ticker, data in zip(misses, fetched):
+                if data:
+                    results[ticker] = data
+
+    return results
+
+
+def _resolve_fund(ticker: str, db_data: Optional[FundResponse], force_refresh: bool) -> Optional[FundResponse]:
+    """Serve db_data if fresh, otherwise refresh from yfinance (falling back to stale data)."""
     # Check if DB data exists AND is fresh
     if not force_refresh and db_data and db_data.last_updated:
         if db_service.is_cache_fresh(db_data.last_updated):
             print(f"Serving {ticker} from Supabase DB (Fresh)")
+            fund_cache.put(ticker, db_data)
             return db_data
+        elif _is_within_grace(db_data.last_updated):
+            print(f"DB cache for {ticker} is stale but within grace window. Refreshing in background...")
+            fund_cache.put(ticker, db_data)
+            _schedule_refresh(ticker)
+            return replace(db_data, stale=True)
         else:
              print(f"DB cache for {ticker} is stale (Last updated: {db_data.last_updated}). Refreshing...")
     elif db_data and not force_refresh:
          print(f"DB cache for {ticker} exists but no timestamp. Refreshing...")
 
-    # 2. Check In-Memory Cache (Fallback)
-    ticker = ticker.upper()
-    if not force_refresh and ticker in FUND_CACHE:
-        print(f"Serving {ticker} from cache")
-        return FUND_CACHE[ticker]
-
-    print(f"Fetching {ticker} from yfinance...")
-    
-    # Simple anti-blocking: Setup yfinance session with rotating user agent
-    from curl_cffi import requests
-    session = requests.Session(impersonate="chrome")
-    session.headers['User-agent'] = random.choice(USER_AGENTS)
-
     try:
-        # USER SUGGESTION IMPLEMENTATION
-        # Create Ticker Object
-        y_ticker = yf.Ticker(ticker, session=session)
-        
-        # Try to get funds_data
-        funds_data = y_ticker.funds_data
-        
-        holdings_list: List[Holding] = []
-        sector_weights_list: List[SectorWeight] = []
-        
-        # 1. Holdings
-        if hasattr(funds_data, 'top_holdings'):
-            top_holdings = funds_data.top_holdings
-            if isinstance(top_holdings, pd.DataFrame):
-                for index, row in top_holdings.iterrows():
-                     pct = 0.0
-                     if '% Assets' in row:
-                         pct = float(row['% Assets'])
-                     elif 'Holding Percent' in row:
-                         pct = float(row['Holding Percent'])
-                     
-                     holdings_list.append(Holding(
-                         ticker=str(index),
-                         name=str(row['Name']) if 'Name' in row else str(index),
-                         pct=pct * 100 
-                     ))
-        
-        # 2. Sector Weightings
-        if hasattr(funds_data, 'sector_weightings'):
-             sector_data = funds_data.sector_weightings
-             if isinstance(sector_data, dict):
-                 for sector, weight in sector_data.items():
-                     sector_weights_list.append(SectorWeight(sector=sector, weight_pct=float(weight) * 100))
-             elif isinstance(sector_data, pd.DataFrame):
-                 for index, row in sector_data.iterrows():
-                     val = row.iloc[0] if not row.empty else 0
-                     sector_weights_list.append(SectorWeight(sector=str(index), weight_pct=float(val) * 100))
-
-        # Basic Info fallback
-        info = y_ticker.info
-        fund_info = FundInfo(
-            ticker=ticker,
-            name=info.get("longName", info.get("shortName", ticker)),
-            price=info.get("previousClose", 0.0),
-            currency=info.get("currency", "USD")
-        )
-
-        # Normalize Holdings Pct
-        if holdings_list:
-             max_pct = max([h.pct for h in holdings_list])
-             if max_pct > 100:
-                 for h in holdings_list:
-                     h.pct /= 100
-
-        # Create Country Weights
-        country_weights: List[CountryWeight] = []
-        country_map = {}
-        for h in holdings_list:
-            c_code = get_country_code(h.ticker)
-            if c_code not in country_map:
-                country_map[c_code] = 0.0
-            country_map[c_code] += h.pct
-            
-        for code, weight in country_map.items():
-            country_weights.append(CountryWeight(country_code=code, weight_pct=weight))
-            
-        # If no holdings found, mock some US exposure for MVP reliability
-        # But for DB test, let's allow saving if at least basic info is there
-        if not holdings_list and not fund_info.price:
-             raise ValueError("No data found")
-             
-        # But if we have info but no holdings (rare for VOO), maybe fine to return what we have?
-        # Let's keep existing logic to fail over to mock if strictly empty
-
-        if not holdings_list: 
-             # Only use mock fallback if absolutely no data
-             # But wait, if we fallback to mock, should we save mock to DB?
-             # Probably NOT, or "Mock Data" title will show up. 
-             # Let's fallback to Mock in the Exception block.
-             raise ValueError("No holdings found")
-
-        response = FundResponse(
-            fund=fund_info,
-            holdings=holdings_list,
-            country_weights=country_weights,
-            sector_weights=sector_weights_list,
-            last_updated=datetime.datetime.now(datetime.timezone.utc).isoformat()
-        )
-        
-        # Save to Caches
-        FUND_CACHE[ticker] = response
-        db_service.upsert_fund(response)
-        
-        return response
+        return refresh_fund(ticker, force=force_refresh)
 
     except Exception as e:
         print(f"Error fetching {ticker}: {e}")
         # Fallback to Stale DB Data if available
         if db_data:
             print(f"yfinance failed. Serving stale data for {ticker} from DB.")
-            return db_data
+            return replace(db_data, stale=True)
 
         print("No DB data available. Returning None.")
         return None
+
+
+def _get_from_memory(ticker: str) -> Optional[FundResponse]:
+    """L1 lookup; stale entries inside the grace window are served and refreshed in the background."""
+    cached = fund_cache.get(ticker, allow_stale=CACHE_STALE_GRACE_HOURS > 0)
+    if cached and cached.stale:
+        _schedule_refresh(ticker)
+    return cached
+
+
+def _is_within_grace(last_updated_iso: str) -> bool:
+    if CACHE_STALE_GRACE_HOURS <= 0:
+        return False
+    return db_service.is_cache_fresh(last_updated_iso, max_age_hours=CACHE_MAX_AGE_HOURS + CACHE_STALE_GRACE_HOURS)
+
+
+def _schedule_refresh(ticker: str):
+    if _fund_refresher.submit(ticker, lambda: refresh_fund(ticker)):
+        print(f"Queued background refresh of {ticker}")
+
+
+def refresh_fund(ticker: str, force: bool = False) -> FundResponse:
+    """
+    Fetch a fund from yfinance and persist it. Raises on failure.
+    Concurrent refreshes of the same ticker are coalesced: one leader fetches
+    and upserts while the other threads wait for its result.
+    """
+    response, shared = _fund_flight.do(ticker, lambda: _refresh_fund_leader(ticker, force))
+    if shared:
+        print(f"Shared in-flight refresh of {ticker}")
+    return response
+
+
+def _refresh_fund_leader(ticker: str, force: bool) -> FundResponse:
+    with worker_lock(f"fund-{ticker}") as waited:
+        # Another worker refreshed this ticker while we waited for the lock
+        if waited and not force:
+            db_data = db_service.get_fund(ticker)
+            if db_data and db_data.last_updated and db_service.is_cache_fresh(db_data.last_updated):
+                print(f"{ticker} was refreshed by another worker")
+                fund_cache.put(ticker, db_data)
+                return db_data
+
+        response = fetch_fund_from_yfinance(ticker)
+        if response.partial:
+            # Patched from the previous snapshot; serve it but do not persist it
+            print(f"Partial refresh of {ticker}; not caching")
+            return response
+
+        changes = db_service.upsert_fund(response)
+        if changes and changes.get('holdings_source', 'yfinance') != 'yfinance':
+            # Holdings come from a full constituent file; serve those, not yfinance's top 10
+            stored = db_service.get_fund(ticker)
+            if stored:
+                response = stored
+
+        fund_cache.put(ticker, response)
+        return response
+
+
+def fetch_fund_from_yfinance(ticker: str, deadline: float = FETCH_DEADLINE_SECONDS,
+                             max_wait: float = FETCH_MAX_WAIT_SECONDS) -> FundResponse:
+    """
+    Fetch a fund straight from yfinance. Raises if no usable data comes back,
+    or if Yahoo blocks or rate-limits either request.
+
+    Holdings/sectors (funds_data) and quote info are independent upstream
+    calls, so they run concurrently over the shared session. Each gets
+    `deadline` seconds of running time; time spent queued behind other
+    refreshes does not count. A piece that overruns is filled from the last
+    stored copy and the result is marked partial. Without a stored copy to
+    fall back on, the fetch waits up to `max_wait` instead.
+    """
+    print(f"Fetching {ticker} from yfinance...")
+    hard_stop = time.monotonic() + max_wait
+    started: Dict[str, float] = {}
+    futures = {
+        "holdings": _subfetch_executor.submit(_run_subfetch, started, "holdings", _fetch_holdings, ticker),
+        "info": _subfetch_executor.submit(_run_subfetch, started, "info", _fetch_info, ticker),
+    }
+
+    try:
+        _wait_subfetches(futures, started, deadline, hard_stop)
+        previous = None
+        if not all(f.done() for f in futures.values()):
+            previous = db_service.get_fund(ticker)
+            if not previous or not previous.holdings:
+                # Nothing to fill in with: a partial result would fail outright
+                print(f"{ticker}: no stored copy, waiting past the deadline")
+                _wait_subfetches(futures, started, None, hard_stop)
+    finally:
+        for piece, future in futures.items():
+            # Drop work that never started; running fetches cannot be interrupted
+            if future.cancel():
+                print(f"{ticker}: {piece} fetch cancelled before it started")
+
+    holdings_part = _subfetch_result(ticker, "holdings", futures["holdings"])
+    fund_info = _subfetch_result(ticker, "info", futures["info"])
+
+    if holdings_part and fund_info:
+        holdings_list, sector_weights_list = holdings_part
+        return build_fund_response(ticker, fund_info, holdings_list, sector_weights_list)
+
+    # Partial fetch: fill in whatever is missing from the previous snapshot
+    if previous is None:
+        previous = db_service.get_fund(ticker)
+    if holdings_part is None:
+        if not previous or not previous.holdings:
+            raise ValueError("No holdings found")
+        holdings_list, sector_weights_list = previous.holdings, previous.sector_weights
+    else:
+        holdings_list, sector_weights_list = holdings_part
+    if fund_info is None:
+        fund_info = previous.fund if previous else FundInfo(ticker=ticker, name=ticker, price=0.0)
+
+    response = build_fund_response(ticker, fund_info, holdings_list, sector_weights_list)
+    return replace(response, partial=True)
+
+
+def _run_subfetch(started: Dict[str, float], piece: str, fetch, ticker: str):
+    started[piece] = time.monotonic()
+    return _with_shared_session(fetch, ticker)
+
+
+def _wait_subfetches(futures: Dict[str, Future], started: Dict[str, float],
+                     deadline: Optional[float], hard_stop: float):
+    """
+    Block until every sub-fetch is done, or every unfinished one has run for
+    `deadline` seconds since it started (None = no deadline), or hard_stop.
+    """
+    while True:
+        pending = {piece: f for piece, f in futures.items() if not f.done()}
+        now = time.monotonic()
+        if not pending or now >= hard_stop:
+            return
+        timeout = hard_stop - now
+        if deadline is not None:
+            expiries = [started[p] + deadline for p in pending if p in started]
+            if len(expiries) == len(pending) and max(expiries) <= now:
+                return
+            remaining = [e - now for e in expiries if e > now]
+            if len(expiries) < len(pending):
+                remaining.append(_QUEUED_POLL_SECONDS)
+            timeout = min([timeout] + remaining)
+        wait(list(pending.values()), timeout=timeout, return_when=FIRST_COMPLETED)
+
+
+def fetch_fund_with_session(ticker: str, session) -> FundResponse:
+    """Fetch a fund from yfinance sequentially over a single (curl_cffi) session."""
+    holdings_list, sector_weights_list = _fetch_holdings(ticker, session)
+    fund_info = _fetch_info(ticker, session)
+    return build_fund_response(ticker, fund_info, holdings_list, sector_weights_list)
+
+
+def _with_shared_session(fetch, ticker: str):
+    with yf_session.session() as session:
+        return fetch(ticker, session)
+
+
+def _subfetch_result(ticker: str, piece: str, future: Future):
+    """
+    Result of a finished sub-fetch, or None if it failed or missed the
+    deadline. A 403/429 is re-raised: patching around a block would hide it
+    from callers that back off and retry (scripts/cron_update_cache.py).
+    """
+    if future.cancelled():
+        return None
+    if not future.done():
+        # Cannot interrupt the thread; it finishes in the background and is discarded
+        print(f"{ticker}: {piece} fetch missed the deadline")
+        return None
+    try:
+        return future.result()
+    except Exception as e:
+        if is_blocked_error(e):
+            raise
+        print(f"{ticker}: {piece} fetch failed: {e}")
+        return None
+
+
+def _fetch_holdings(ticker: str, session) -> Tuple[List[Holding], List[SectorWeight]]:
+    """Top holdings and sector weightings (one funds_data request upstream)."""
+    # USER SUGGESTION IMPLEMENTATION
+    # Create Ticker Object
+    y_ticker = yf.Ticker(ticker, session=session)
+    
+    # Try to get funds_data
+    funds_data = y_ticker.funds_data
+
+    holdings_list: List[Holding] = []
+
+    # 1. Holdings
+    top_holdings = getattr(funds_data, 'top_holdings', None)
+    if isinstance(top_holdings, pd.DataFrame):
+        holdings_list = to_holdings(normalize_holdings(top_holdings))
+
+    # 2. Sector Weightings
+    sector_weights_list = normalize_sector_weights(getattr(funds_data, 'sector_weightings', None))
+
+    return holdings_list, sector_weights_list
+
+
+def _fetch_info(ticker: str, session) -> FundInfo:
+    """Name, price and currency from the quote summary."""
+    y_ticker = yf.Ticker(ticker, session=session)
+    # Basic Info fallback
+    info = y_ticker.info
+    fund_info = FundInfo(
+        ticker=ticker,
+        name=info.get("longName", info.get("shortName", ticker)),
+        price=info.get("previousClose", 0.0),
+        currency=info.get("currency", "USD")
+    )
+    return fund_info
+
+
+def build_fund_response(ticker: str, fund_info: FundInfo, holdings_list: List[Holding],
+                        sector_weights_list: List[SectorWeight]) -> FundResponse:
+    """Assemble a FundResponse, deriving country weights from the holdings."""
+    country_weights = compute_country_weights(holdings_frame(holdings_list))
+
+    # If no holdings found, mock some US exposure for MVP reliability
+    # But for DB test, let's allow saving if at least basic info is there
+    if not holdings_list and not fund_info.price:
+         raise ValueError("No data found")
+         
+    # But if we have info but no holdings (rare for VOO), maybe fine to return what we have?
+    # Let's keep existing logic to fail over to mock if strictly empty
+
+    if not holdings_list: 
+         # Only use mock fallback if absolutely no data
+         # But wait, if we fallback to mock, should we save mock to DB?
+         # Probably NOT, or "Mock Data" title will show up. 
+         # Let's fallback to Mock in the Exception block.
+         raise ValueError("No holdings found")
+
+    return FundResponse(
+        fund=fund_info,
+        holdings=holdings_list,
+        country_weights=country_weights,
+        sector_weights=sector_weights_list,
+        last_updated=datetime.datetime.now(datetime.timezone.utc).isoformat()
+    )
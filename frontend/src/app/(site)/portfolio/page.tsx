@@ -3,7 +3,7 @@
 import { useState } from "react";
 import { Header } from "@/components/layout/Header";
 import { Plus, Trash2, PieChart, RefreshCw } from "lucide-react";
-import { getFundData } from "@/lib/api";
+import { getFundsData } from "@/lib/api";
 import { motion } from "framer-motion";
 import { toast } from "sonner";
 import { WorldMap } from "@/components/dashboard/WorldMap";
@@ -75,26 +75,32 @@ export default function PortfolioPage() {
         const holdingMap = new Map<string, { name: string, pct: number }>();
 
         try {
+            // One batch request for the whole portfolio instead of one per fund
+            const res = await getFundsData(items.map(item => item.ticker));
+            if (res.status !== 'ok') {
+                throw new Error(res.message);
+            }
+
             for (const item of items) {
                 // Normalize weight to 1 (100%)
                 const normalizedWeight = item.weight / totalWeight;
-                const res = await getFundData(item.ticker);
+                const fund = res.data[item.ticker.toUpperCase()];
 
-                if (res.status === 'ok') {
+                if (fund) {
                     // Aggregate Countries
-                    res.data.country_weights?.forEach(c => {
+                    fund.country_weights?.forEach(c => {
                         const current = countryMap.get(c.country_code) || 0;
                         countryMap.set(c.country_code, current + (c.weight_pct * normalizedWeight));
                     });
 
                     // Aggregate Sectors
-                    res.data.sector_weights?.forEach(s => {
+                    fund.sector_weights?.forEach(s => {
                         const current = sectorMap.get(s.sector) || 0;
                         sectorMap.set(s.sector, current + (s.weight_pct * normalizedWeight));
                     });
 
                     // Aggregate Holdings
-                    res.data.holdings?.forEach(h => {
+                    fund.holdings?.forEach(h => {
                         const current = holdingMap.get(h.ticker) || { name: h.name, pct: 0 };
                         current.pct += (h.pct * normalizedWeight);
                         holdingMap.set(h.ticker, current);
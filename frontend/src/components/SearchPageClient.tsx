@@ -33,6 +33,8 @@ export function SearchPageClient({ initialQuery }: { initialQuery: string }) {
     const [results, setResults] = useState<SearchResult[]>([]);
     const [isLoading, setIsLoading] = useState(true);
     const [hasMore, setHasMore] = useState(false);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
 
     // For mobile filters
     const [showFilters, setShowFilters] = useState(false);
@@ -49,27 +51,50 @@ export function SearchPageClient({ initialQuery }: { initialQuery: string }) {
         return () => clearTimeout(handler);
     }, [query, router, searchParams]);
 
+    const buildParams = useCallback((cursor?: string) => {
+        const params = new URLSearchParams();
+        if (debouncedQuery) params.set("q", debouncedQuery);
+        if (fundType) params.set("type", fundType);
+        if (source) params.set("source", source);
+        if (cursor) params.set("cursor", cursor);
+        params.set("limit", "50");
+        return params;
+    }, [debouncedQuery, fundType, source]);
+
     const fetchResults = useCallback(async () => {
         setIsLoading(true);
         try {
-            const params = new URLSearchParams();
-            if (debouncedQuery) params.set("q", debouncedQuery);
-            if (fundType) params.set("type", fundType);
-            if (source) params.set("source", source);
-            params.set("limit", "50");
-
-            const res = await fetch(`${API_BASE_URL}/api/search/all?${params.toString()}`);
+            const res = await fetch(`${API_BASE_URL}/api/search/all?${buildParams().toString()}`);
             if (res.ok) {
                 const data = await res.json();
                 setResults(data.results || []);
                 setHasMore(data.has_more || false);
+                setNextCursor(data.next_cursor || null);
             }
         } catch (error) {
             console.error("Failed to fetch search results", error);
         } finally {
             setIsLoading(false);
         }
-    }, [debouncedQuery, fundType, source]);
+    }, [buildParams]);
+
+    const loadMore = useCallback(async () => {
+        if (!nextCursor) return;
+        setIsLoadingMore(true);
+        try {
+            const res = await fetch(`${API_BASE_URL}/api/search/all?${buildParams(nextCursor).toString()}`);
+            if (res.ok) {
+                const data = await res.json();
+                setResults(prev => [...prev, ...(data.results || [])]);
+                setHasMore(data.has_more || false);
+                setNextCursor(data.next_cursor || null);
+            }
+        } catch (error) {
+            console.error("Failed to load more search results", error);
+        } finally {
+            setIsLoadingMore(false);
+        }
+    }, [buildParams, nextCursor]);
 
     useEffect(() => {
         fetchResults();
@@ -244,6 +269,17 @@ export function SearchPageClient({ initialQuery }: { initialQuery: string }) {
                                 ))}
                             </div>
                         )}
+                        {!isLoading && hasMore && (
+                            <div className="flex justify-center mt-6">
+                                <button
+                                    onClick={loadMore}
+                                    disabled={isLoadingMore}
+                                    className="px-6 py-2 rounded-xl text-sm font-semibold bg-white dark:bg-slate-800 border border-slate-200 dark:border-slate-700 shadow-sm hover:border-primary/30 transition-all disabled:opacity-50"
+                                >
+                                    {t.search.loadMore}
+                                </button>
+                            </div>
+                        )}
                     </div>
                 </div>
 
@@ -40,6 +40,29 @@ export async function getFundData(ticker: string): Promise<FundResult> {
     }
 }
 
+export type FundsBatchResult =
+    | { status: 'ok'; data: Record<string, FundResponse>; notFound: string[] }
+    | { status: 'error'; message: string };
+
+export async function getFundsData(tickers: string[]): Promise<FundsBatchResult> {
+    try {
+        const res = await fetch(`${API_BASE_URL}/api/funds`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ tickers }),
+            cache: "no-store",
+        });
+
+        if (!res.ok) return { status: 'error', message: res.statusText };
+
+        const data = await res.json();
+        return { status: 'ok', data: data.results, notFound: data.not_found || [] };
+    } catch (error) {
+        console.error("API Error:", error);
+        return { status: 'error', message: String(error) };
+    }
+}
+
 export async function screenFunds(holding: string, minWeight: number = 0) {
     try {
         const res = await fetch(`${API_BASE_URL}/api/screen?holding=${holding}&min_weight=${minWeight}`, {
@@ -56,11 +79,60 @@ export async function screenFunds(holding: string, minWeight: number = 0) {
     }
 }
 
-export async function getTrendingFunds(limit: number = 5) {
+// Funds holding every ticker at or above its minimum weight, e.g. { NVDA: 5, MSFT: 3 }
+export async function screenFundsMulti(criteria: Record<string, number>, limit: number = 100) {
+    try {
+        const holdings = Object.entries(criteria).map(([ticker, weight]) => `${ticker}:${weight}`).join(",");
+        const res = await fetch(`${API_BASE_URL}/api/screen?holdings=${encodeURIComponent(holdings)}&limit=${limit}`, {
+            cache: "no-store",
+        });
+
+        if (!res.ok) return { status: 'error', message: res.statusText };
+
+        const data = await res.json();
+        return { status: 'ok', data: data.results };
+    } catch (error) {
+        console.error("API Error:", error);
+        return { status: 'error', message: String(error) };
+    }
+}
+
+export type ScreenCondition = {
+    type: 'holding' | 'country' | 'sector';
+    key: string;
+    min?: number;
+    max?: number;
+};
+export type ScreenPredicate = ScreenCondition | { all: ScreenPredicate[] } | { any: ScreenPredicate[] };
+
+// Compound screen over holdings, country and sector exposure, ranked and paginated server-side
+export async function screenFundsQuery(
+    where: ScreenPredicate,
+    options: { sort?: { type: ScreenCondition['type']; key: string; order?: 'asc' | 'desc' }; page?: number; pageSize?: number } = {}
+) {
+    try {
+        const res = await fetch(`${API_BASE_URL}/api/screen/query`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ where, sort: options.sort, page: options.page ?? 1, page_size: options.pageSize ?? 20 }),
+            cache: "no-store",
+        });
+
+        if (!res.ok) return { status: 'error', message: res.statusText };
+
+        const data = await res.json();
+        return { status: 'ok', data: data.results, total: data.total, page: data.page };
+    } catch (error) {
+        console.error("API Error:", error);
+        return { status: 'error', message: String(error) };
+    }
+}
+
+export async function getTrendingFunds(limit: number = 5, window: "24h" | "7d" = "24h") {
     try {
-        const res = await fetch(`${API_BASE_URL}/api/trending?limit=${limit}`, {
-            // Revalidate every hour
-            next: { revalidate: 3600 }
+        const res = await fetch(`${API_BASE_URL}/api/trending?limit=${limit}&window=${window}`, {
+            // Trending is windowed and refreshed server-side every minute
+            next: { revalidate: 300 }
         });
 
         if (!res.ok) return { status: 'error', message: res.statusText };
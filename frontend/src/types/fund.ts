@@ -29,4 +29,6 @@ export interface FundResponse {
     country_weights: CountryWeight[];
     sector_weights: SectorWeight[];
     last_updated?: string;
+    stale?: boolean;     // served past its freshness window while a refresh runs
+    partial?: boolean;   // some upstream pieces timed out; filled from the last snapshot
 }